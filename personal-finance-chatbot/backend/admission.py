@@ -0,0 +1,340 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import deque
+
+# =========================
+# 🔹 Admission Settings
+# =========================
+UPSTREAM_RPM = float(os.getenv("UPSTREAM_RPM", "60"))          # requests per minute, 0 = unlimited
+UPSTREAM_TPM = float(os.getenv("UPSTREAM_TPM", "100000"))      # tokens per minute, 0 = unlimited
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "15"))  # seconds a request may queue
+ADMISSION_STATS_WINDOW = int(os.getenv("ADMISSION_STATS_WINDOW", "500"))
+# "sqlite" shares the rpm/tpm budget between worker processes on one host
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory").lower()  # memory | sqlite
+ADMISSION_DB_PATH = os.getenv("ADMISSION_DB_PATH", "admission.sqlite3")
+ADMISSION_DB_BUSY_RETRY = 0.01  # seconds before retrying when another worker holds the bucket lock
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_INSIGHT = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_INSIGHT: "insight", PRIORITY_BATCH: "batch"}
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed instead of queued for the upstream."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server is busy ({reason}); retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` units per second up to one minute's worth.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` units are available (0 if they are now).
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        # A single request larger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class LocalLimiter:
+    """
+    Requests/min and tokens/min buckets for a single process.
+    """
+
+    def __init__(self, rpm: float = UPSTREAM_RPM, tpm: float = UPSTREAM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.rpm, self.tpm = rpm, tpm
+
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Take one request and `tokens` tokens if both are available; otherwise return
+        the seconds to wait before trying again.
+        """
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        return 0.0
+
+    def refund(self, tokens: int):
+        self.tokens.refund(tokens)
+
+
+class SQLiteLimiter:
+    """
+    The same two buckets kept in SQLite, so every worker process on the host draws
+    from one budget. Each acquire is a single IMMEDIATE transaction.
+
+    These run on the event loop, so they never wait for the database lock: while another
+    worker holds it, try_acquire asks to be retried after ADMISSION_DB_BUSY_RETRY and a
+    refund is held back until the next transaction that gets the lock.
+    """
+
+    def __init__(self, rpm: float = UPSTREAM_RPM, tpm: float = UPSTREAM_TPM, path: str = ADMISSION_DB_PATH):
+        self.rpm, self.tpm = rpm, tpm
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        now = time.time()
+        self._conn.execute("INSERT OR IGNORE INTO buckets VALUES ('requests', ?, ?), ('tokens', ?, ?)",
+                           (rpm, now, tpm, now))
+        # Setup above may wait for other workers; admission decisions below must not
+        self._conn.execute("PRAGMA busy_timeout = 0")
+        self._pending_refund = 0
+
+    @staticmethod
+    def _refill(level: float, updated: float, per_minute: float, now: float) -> float:
+        return min(per_minute, level + max(0.0, now - updated) * per_minute / 60.0)
+
+    def _transact(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(time.time())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _levels(self, now: float) -> dict:
+        rows = dict((name, (level, updated)) for name, level, updated in
+                    self._conn.execute("SELECT name, level, updated FROM buckets"))
+        limits = {"requests": self.rpm, "tokens": self.tpm}
+        levels = {name: self._refill(*rows[name], limits[name], now) for name in limits}
+        levels["tokens"] = min(self.tpm, levels["tokens"] + self._pending_refund)
+        return levels
+
+    @staticmethod
+    def _busy(error: sqlite3.OperationalError) -> bool:
+        return "locked" in str(error) or "busy" in str(error)
+
+    def _store(self, levels: dict, now: float):
+        # Any refund held back while the lock was busy is included in `levels` now
+        self._pending_refund = 0
+        self._conn.executemany("UPDATE buckets SET level = ?, updated = ? WHERE name = ?",
+                               [(level, now, name) for name, level in levels.items()])
+
+    def try_acquire(self, tokens: int) -> float:
+        def acquire(now):
+            levels = self._levels(now)
+            waits = [0.0]
+            for name, per_minute, amount in (("requests", self.rpm, 1), ("tokens", self.tpm, tokens)):
+                if per_minute > 0:
+                    waits.append(max(0.0, (min(amount, per_minute) - levels[name]) / (per_minute / 60.0)))
+            if max(waits) > 0:
+                if self._pending_refund:
+                    self._store(levels, now)
+                return max(waits)
+            if self.rpm > 0:
+                levels["requests"] -= 1
+            if self.tpm > 0:
+                levels["tokens"] -= min(tokens, self.tpm)
+            self._store(levels, now)
+            return 0.0
+
+        try:
+            return self._transact(acquire)
+        except sqlite3.OperationalError as e:
+            if not self._busy(e):
+                raise
+            return ADMISSION_DB_BUSY_RETRY
+
+    def refund(self, tokens: int):
+        if self.tpm <= 0:
+            return
+        with self._lock:
+            self._pending_refund += tokens
+        try:
+            self._transact(lambda now: self._store(self._levels(now), now))
+        except sqlite3.OperationalError as e:
+            if not self._busy(e):
+                raise
+
+
+def build_limiter():
+    if ADMISSION_BACKEND == "sqlite":
+        logger.info(f"🚦 Upstream rate limits shared via sqlite ({ADMISSION_DB_PATH})")
+        return SQLiteLimiter()
+    return LocalLimiter()
+
+
+class AdmissionController:
+    """
+    Admits upstream LLM calls under requests/min and tokens/min budgets.
+
+    Waiting calls form a priority queue (interactive chat ahead of insights ahead of
+    batch work, FIFO within a priority). When the queue is full a new call is shed
+    with a 503, unless it outranks the lowest-priority waiter, which is shed instead.
+    """
+
+    def __init__(self, limiter=None, max_queue: int = ADMISSION_MAX_QUEUE, max_wait: float = ADMISSION_MAX_WAIT):
+        self.limiter = limiter or LocalLimiter()
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._queue = []
+        self._seq = 0
+        self._timer = None
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.rejected = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.waits = {name: deque(maxlen=ADMISSION_STATS_WINDOW) for name in PRIORITY_NAMES.values()}
+
+    def _retry_after(self) -> float:
+        # Roughly how long until everything queued ahead has been admitted
+        interval = 60.0 / self.limiter.rpm if self.limiter.rpm > 0 else 0.0
+        return max(1.0, (len(self._queue) + 1) * interval)
+
+    def _reject(self, priority: int, reason: str) -> AdmissionRejectedError:
+        self.rejected[PRIORITY_NAMES[priority]] += 1
+        logger.warning(f"🚦 Shedding {PRIORITY_NAMES[priority]} request: {reason}")
+        return AdmissionRejectedError(reason, self._retry_after())
+
+    def check(self, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Shed up front if a call of this priority could not even be queued, so streaming
+        endpoints can answer 503 before their response has started.
+        """
+        if len(self._queue) >= self.max_queue and max(self._queue)[0] <= priority:
+            raise self._reject(priority, "queue full")
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Wait until the call may go upstream; returns the time spent queued (seconds).
+        """
+        started = time.monotonic()
+        if not self._queue and self.limiter.try_acquire(tokens) == 0:
+            self.admitted[PRIORITY_NAMES[priority]] += 1
+            self.waits[PRIORITY_NAMES[priority]].append(0.0)
+            return 0.0
+
+        if len(self._queue) >= self.max_queue:
+            self.check(priority)
+            worst = max(self._queue)
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            if not worst[3].done():
+                worst[3].set_exception(self._reject(worst[0], "displaced by higher-priority work"))
+
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        entry = (priority, self._seq, tokens, future)
+        heapq.heappush(self._queue, entry)
+        self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            raise self._reject(priority, f"queued longer than {self.max_wait:.0f}s")
+        except BaseException:
+            self._discard(entry)
+            raise
+        waited = time.monotonic() - started
+        self.waits[PRIORITY_NAMES[priority]].append(waited)
+        return waited
+
+    def release(self, estimated: int, actual: int):
+        """
+        Return over-reserved tokens once the real usage is known.
+        """
+        if actual is not None and actual < estimated:
+            self.limiter.refund(estimated - actual)
+            if self._queue:
+                self._pump()
+
+    def _discard(self, entry):
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._pump()
+
+    def _pump(self):
+        """
+        Admit queued calls in priority order while both buckets allow it.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            priority, _, tokens, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = self.limiter.try_acquire(tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self.admitted[PRIORITY_NAMES[priority]] += 1
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        def percentile(values, q):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1)
+
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "rpm": self.limiter.rpm or None,
+            "tpm": self.limiter.tpm or None,
+            "shared": isinstance(self.limiter, SQLiteLimiter),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "queue_wait_ms": {
+                name: {"p50": percentile(waits, 0.5), "p95": percentile(waits, 0.95), "max": percentile(waits, 1.0)}
+                for name, waits in self.waits.items()
+            },
+        }
+
+
+upstream_admission = AdmissionController(build_limiter())
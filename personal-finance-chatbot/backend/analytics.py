@@ -0,0 +1,177 @@
+import re
+import math
+from datetime import date, datetime
+import numpy as np
+
+# =========================
+# 🔹 Deterministic Budget Analytics
+# =========================
+# Everything the prompts used to ask the LLM to work out (totals, shares,
+# savings gap, goal feasibility) is computed here instead, so the numbers are
+# exact and available without an upstream call.
+
+TOP_CATEGORIES = 3
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(day|week|month|year)s?\s*$", re.IGNORECASE)
+_MONTHS_PER_UNIT = {"day": 12 / 365.25, "week": 12 / 52.18, "month": 1.0, "year": 12.0}
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%m/%d/%Y", "%Y-%m")
+
+
+def _round(value):
+    return None if value is None else round(float(value), 2)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_deadline_months(deadline, today: date = None):
+    """
+    Convert a goal deadline ("6 months", "1 year", "2025-12-31") to months from today.
+    Returns None when the deadline is missing or unparseable.
+    """
+    if deadline is None or str(deadline).strip() == "":
+        return None
+    text = str(deadline).strip()
+
+    match = _DURATION.match(text)
+    if match:
+        return float(match.group(1)) * _MONTHS_PER_UNIT[match.group(2).lower()]
+
+    today = today or date.today()
+    for fmt in _DATE_FORMATS:
+        try:
+            target = datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+        return max((target - today).days, 0) * 12 / 365.25
+    return None
+
+
+def _breakdowns(income: np.ndarray, matrix: np.ndarray, position: np.ndarray, names: list) -> list:
+    """
+    `expense_breakdown` for every row of a (records x categories) expense matrix in one
+    vectorized pass. `position` is where each category appears in its record (-1 = not listed);
+    equal amounts keep that order.
+    """
+    # fsum is exact, so a total does not depend on the column layout (single vs batch)
+    totals = np.array([math.fsum(row) for row in matrix], dtype=float)
+    surplus = income - totals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.where(totals[:, None] > 0, matrix / totals[:, None], 0.0) * 100
+        income_shares = np.where(income[:, None] > 0, matrix / income[:, None], 0.0) * 100
+        savings_rate = np.where(income > 0, surplus / income * 100, np.nan)
+    order = np.lexsort((position, -matrix), axis=1)
+
+    results = []
+    for row in range(len(matrix)):
+        categories = [
+            {
+                "name": names[i],
+                "amount": _round(matrix[row, i]),
+                "share_of_expenses": _round(shares[row, i]),
+                "share_of_income": _round(income_shares[row, i]),
+            }
+            for i in order[row] if position[row, i] >= 0
+        ]
+        results.append({
+            "income": _round(income[row]),
+            "total_expenses": _round(totals[row]),
+            "surplus": _round(surplus[row]),
+            "status": "surplus" if surplus[row] >= 0 else "deficit",
+            "savings_rate": None if np.isnan(savings_rate[row]) else _round(savings_rate[row]),
+            "categories": categories,
+            "top_categories": [c["name"] for c in categories[:TOP_CATEGORIES] if c["amount"] > 0],
+        })
+    return results
+
+
+def expense_breakdown(income: float, expenses: dict) -> dict:
+    """
+    Totals, per-category shares (largest first) and surplus for one month.
+    """
+    names = list(expenses.keys())
+    matrix = np.array([[_to_float(v) for v in expenses.values()]], dtype=float).reshape(1, len(names))
+    return _breakdowns(np.array([_to_float(income)]), matrix, np.arange(len(names)).reshape(1, -1), names)[0]
+
+
+def _with_savings_goal(metrics: dict, savings_goal) -> dict:
+    savings_goal = _to_float(savings_goal)
+    gap = savings_goal - metrics["surplus"]
+    metrics.update({
+        "savings_goal": _round(savings_goal),
+        "savings_gap": _round(max(gap, 0.0)),
+        "savings_goal_met": gap <= 0,
+    })
+    return metrics
+
+
+def budget_metrics(budget_data: dict) -> dict:
+    """
+    Budget summary figures: breakdown plus the gap to the monthly savings goal.
+    """
+    metrics = expense_breakdown(budget_data.get("income", 0), budget_data.get("expenses", {}))
+    return _with_savings_goal(metrics, budget_data.get("savings_goal", 0))
+
+
+def budget_metrics_batch(records: list) -> list:
+    """
+    `budget_metrics` for many records in one vectorized pass.
+    Expenses are laid out as a (records x categories) matrix over the union of category names.
+    """
+    if not records:
+        return []
+    names = list(dict.fromkeys(name for r in records for name in (r.get("expenses") or {})))
+    column = {name: i for i, name in enumerate(names)}
+    matrix = np.zeros((len(records), len(names)), dtype=float)
+    position = np.full((len(records), len(names)), -1)
+    for row, record in enumerate(records):
+        for i, (name, value) in enumerate((record.get("expenses") or {}).items()):
+            matrix[row, column[name]] = _to_float(value)
+            position[row, column[name]] = i
+
+    income = np.array([_to_float(r.get("income", 0)) for r in records], dtype=float)
+    return [_with_savings_goal(metrics, record.get("savings_goal", 0))
+            for metrics, record in zip(_breakdowns(income, matrix, position, names), records)]
+
+
+def spending_metrics(spending_data: dict, today: date = None) -> dict:
+    """
+    Spending insight figures: breakdown plus months-to-goal and deadline feasibility per goal.
+    Goals are assumed to be funded from the monthly surplus.
+    """
+    metrics = expense_breakdown(spending_data.get("income", 0), spending_data.get("expenses", {}))
+    goals = spending_data.get("goals", []) or []
+    surplus = max(metrics["surplus"], 0.0)
+
+    amounts = np.array([_to_float(g.get("amount")) for g in goals], dtype=float)
+    deadlines = np.array(
+        [parse_deadline_months(g.get("deadline"), today) for g in goals], dtype=float
+    )  # None -> nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        months_to_goal = amounts / surplus if surplus > 0 else np.full(amounts.shape, np.inf)
+        required_monthly = np.where(deadlines > 0, amounts / deadlines, np.nan)
+    feasible = months_to_goal <= deadlines
+
+    goal_rows = []
+    for i, goal in enumerate(goals):
+        has_deadline = not np.isnan(deadlines[i])
+        goal_rows.append({
+            "name": goal.get("name"),
+            "amount": _round(amounts[i]),
+            "months_to_goal": _round(months_to_goal[i]) if np.isfinite(months_to_goal[i]) else None,
+            "deadline_months": _round(deadlines[i]) if has_deadline else None,
+            "required_monthly": _round(required_monthly[i]) if np.isfinite(required_monthly[i]) else None,
+            "feasible": bool(feasible[i]) if has_deadline else None,
+        })
+
+    combined = float(np.nansum(required_monthly)) if goals else 0.0
+    metrics.update({
+        "goals": goal_rows,
+        "total_goal_amount": _round(amounts.sum()) if goals else 0.0,
+        "combined_required_monthly": _round(combined),
+        "all_goals_feasible": combined <= surplus if goals else None,
+    })
+    return metrics
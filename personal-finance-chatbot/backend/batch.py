@@ -0,0 +1,112 @@
+import io
+import os
+import csv
+import json
+import asyncio
+import logging
+from analytics import budget_metrics_batch
+from openrouter_api import generate_response
+from admission import PRIORITY_BATCH
+from utils import build_budget_prompt
+
+# =========================
+# 🔹 Batch Settings
+# =========================
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "10000"))
+
+logger = logging.getLogger(__name__)
+
+# Columns with a fixed meaning in uploaded tables; every other column is an expense category
+_RESERVED_COLUMNS = {"id", "income", "savings_goal", "currency", "persona"}
+
+
+def _record_from_row(row: dict, index: int) -> dict:
+    expenses = {}
+    for column, value in row.items():
+        if column is None or column in _RESERVED_COLUMNS or value in (None, ""):
+            continue
+        try:
+            expenses[column] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {index}: expense '{column}' is not a number: {value!r}")
+    try:
+        income = float(row.get("income") or 0)
+        savings_goal = float(row.get("savings_goal") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Row {index}: income and savings_goal must be numbers")
+    return {
+        "id": str(row["id"]) if row.get("id") not in (None, "") else str(index),
+        "income": income,
+        "savings_goal": savings_goal,
+        "expenses": expenses,
+        "currency": row.get("currency") or "$",
+        "persona": row.get("persona") or "student",
+    }
+
+
+def parse_budget_table(filename: str, content: bytes) -> list:
+    """
+    Parse a wide CSV/Parquet table (one row per user/period) into budget records.
+    Columns: id, income, savings_goal, optional currency/persona, then one column per category.
+    """
+    name = (filename or "").lower()
+    if name.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ValueError("Parquet uploads require pandas and pyarrow to be installed")
+        frame = pd.read_parquet(io.BytesIO(content))
+        rows = frame.where(frame.notna(), None).to_dict(orient="records")
+    elif name.endswith(".csv") or not name:
+        rows = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    else:
+        raise ValueError("Unsupported file type; upload a .csv or .parquet file")
+
+    records = []
+    for index, row in enumerate(rows):
+        if index >= BATCH_MAX_RECORDS:
+            raise ValueError(f"Too many rows; the limit is {BATCH_MAX_RECORDS}")
+        records.append(_record_from_row(row, index))
+    return records
+
+
+async def run_budget_batch(records: list, llm: bool = True, use_cache: bool = True,
+                           concurrency: int = BATCH_CONCURRENCY):
+    """
+    Yield one NDJSON line per record as soon as its result is ready.
+    Analytics for all records are computed in a single vectorized pass; narrative
+    LLM calls then run concurrently, at most `concurrency` at a time.
+    """
+    metrics = budget_metrics_batch(records)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def summarize(index: int, record: dict, record_metrics: dict):
+        line = {"index": index, "id": record.get("id", str(index)), "analytics": record_metrics}
+        if not llm:
+            return line
+        persona = record.get("persona") or "student"
+        prompt = build_budget_prompt(record, persona, record_metrics)
+        async with semaphore:
+            try:
+                line["summary"] = await generate_response(
+                    [{"role": "user", "content": prompt}], use_cache=use_cache, route="budget",
+                    priority=PRIORITY_BATCH, persona=persona
+                )
+            except Exception as e:
+                logger.error(f"❌ Batch item {index} failed: {e}")
+                line["error"] = str(e) or type(e).__name__
+        return line
+
+    tasks = [
+        asyncio.ensure_future(summarize(i, record, record_metrics))
+        for i, (record, record_metrics) in enumerate(zip(records, metrics))
+    ]
+    logger.info(f"📦 Budget batch started: {len(tasks)} records, concurrency={concurrency}")
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield json.dumps(await finished) + "\n"
+    finally:
+        # Client went away or the stream finished; drop anything still pending
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import logging
+from semantic_cache import normalize_question
+from prompt_compiler import TEMPLATES
+
+# =========================
+# 🔹 FAQ Settings
+# =========================
+FAQ_CATALOG_PATH = os.getenv("FAQ_CATALOG_PATH", "faq_catalog.json")  # persona -> common questions
+FAQ_ARTIFACT_PATH = os.getenv("FAQ_ARTIFACT_PATH", "faq_answers.json")  # written by faq_generate.py
+FAQ_ARTIFACT_VERSION = 1  # artifact format; bump when the layout changes
+
+logger = logging.getLogger(__name__)
+
+
+def faq_key(question: str) -> str:
+    # Case, spacing and trailing punctuation do not change the question
+    return normalize_question(question).rstrip(" ?!.")
+
+
+def prompt_fingerprint() -> str:
+    """
+    Hash of the chat prompt template; answers generated from another template are stale.
+    """
+    return hashlib.sha256(TEMPLATES["chat"].text.encode("utf-8")).hexdigest()[:16]
+
+
+def load_catalog(path: str = FAQ_CATALOG_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f)
+    if not isinstance(catalog, dict) or not all(isinstance(q, list) for q in catalog.values()):
+        raise ValueError(f"{path}: expected {{persona: [question, ...]}}")
+    return catalog
+
+
+class FAQIndex:
+    """
+    Pre-generated answers to the catalog questions, keyed on (persona, normalized question)
+    for O(1) lookup. Loaded once at startup from the artifact written by faq_generate.py.
+    """
+
+    def __init__(self):
+        self._answers = {}
+        self.info = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._answers)
+
+    def load(self, path: str = FAQ_ARTIFACT_PATH) -> int:
+        """
+        Replace the index with the artifact's answers; a missing artifact leaves it empty.
+        """
+        if not os.path.exists(path):
+            logger.info(f"📚 No FAQ artifact at {path}; run faq_generate.py to pre-generate answers")
+            return 0
+        with open(path, encoding="utf-8") as f:
+            artifact = json.load(f)
+        if artifact.get("version") != FAQ_ARTIFACT_VERSION:
+            raise ValueError(f"{path}: artifact version {artifact.get('version')} is not {FAQ_ARTIFACT_VERSION}; "
+                             "regenerate it with faq_generate.py")
+        answers = {}
+        for persona, entries in artifact["answers"].items():
+            for entry in entries:
+                answers[(persona, faq_key(entry["question"]))] = {"persona": persona, **entry}
+        self._answers = answers
+        self.info = {name: artifact.get(name) for name in ("revision", "generated_at", "model", "prompt_hash")}
+        if artifact.get("prompt_hash") != prompt_fingerprint():
+            logger.warning(f"⚠️ FAQ answers in {path} were generated from an older chat prompt; regenerate them")
+        logger.info(f"📚 Loaded {len(answers)} FAQ answers (revision {self.info['revision']}) from {path}")
+        return len(answers)
+
+    def lookup(self, persona: str, question: str):
+        entry = self._answers.get((persona, faq_key(question)))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def entries(self):
+        return list(self._answers.values())
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._answers), **self.info, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+
+faq_index = FAQIndex()
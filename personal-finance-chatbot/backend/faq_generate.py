@@ -0,0 +1,156 @@
+"""
+Pre-generate answers to the persona FAQ catalog and write them to a versioned artifact.
+
+    # Answer every catalog question, 4 at a time and at most 30 upstream calls a minute
+    python faq_generate.py --catalog faq_catalog.json --output faq_answers.json --concurrency 4 --rpm 30
+
+    # Regenerate everything instead of reusing unchanged answers from the previous artifact
+    python faq_generate.py --force
+
+The API loads the artifact at startup (FAQ_ARTIFACT_PATH) and answers these questions on
+/generate without an upstream call. Prompts are built exactly as /generate builds them.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from faq import FAQ_CATALOG_PATH, FAQ_ARTIFACT_PATH, FAQ_ARTIFACT_VERSION, faq_key, prompt_fingerprint, load_catalog
+from nlu_engine import nlu_engine, NEUTRAL_RESULT
+from openrouter_api import generate_response
+from model_router import model_router
+from admission import PRIORITY_BATCH
+from features import is_enabled
+from http_client import close_client
+from utils import build_prompt_with_nlu
+
+
+class Pacer:
+    """
+    Space call starts at least 60/rpm seconds apart (0 = no limit).
+    """
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self.interval
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _previous_answers(path: str, model: str) -> tuple:
+    """
+    Reusable answers from an earlier artifact: same version, prompt and model only.
+    Returns ({(persona, key): entry}, previous revision).
+    """
+    if not os.path.exists(path):
+        return {}, 0
+    with open(path, encoding="utf-8") as f:
+        artifact = json.load(f)
+    revision = artifact.get("revision", 0)
+    if (artifact.get("version"), artifact.get("prompt_hash"), artifact.get("model")) != \
+            (FAQ_ARTIFACT_VERSION, prompt_fingerprint(), model):
+        return {}, revision
+    return {(persona, faq_key(entry["question"])): entry
+            for persona, entries in artifact["answers"].items() for entry in entries}, revision
+
+
+async def generate(catalog: dict, output: str, concurrency: int, rpm: float, force: bool) -> int:
+    """
+    Answer every catalog question and write the artifact; returns the number of failures.
+    """
+    model = model_router.primary("chat")
+    previous, revision = _previous_answers(output, model)
+    if force:
+        previous = {}
+    use_nlu = is_enabled("nlu")
+    if use_nlu:
+        await nlu_engine.start()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pacer = Pacer(rpm)
+    failures = []
+
+    async def answer(persona: str, question: str):
+        reused = previous.get((persona, faq_key(question)))
+        if reused is not None:
+            return {**reused, "question": question}
+        async with semaphore:
+            await pacer.wait()
+            try:
+                nlu_data = await nlu_engine.analyze(question) if use_nlu else \
+                    {**NEUTRAL_RESULT, "entities": [], "keywords": []}
+                prompt = build_prompt_with_nlu(question, nlu_data, persona)
+                text = await generate_response([{"role": "user", "content": prompt}], use_cache=False,
+                                               priority=PRIORITY_BATCH, persona=persona)
+            except Exception as e:
+                failures.append((persona, question, str(e) or type(e).__name__))
+                print(f"  ❌ [{persona}] {question}: {str(e) or type(e).__name__}")
+                return None
+        print(f"  ✅ [{persona}] {question}")
+        return {"question": question, "answer": text, "nlu": nlu_data}
+
+    started = time.perf_counter()
+    questions = [(persona, question) for persona, persona_questions in catalog.items() for question in persona_questions]
+    try:
+        results = await asyncio.gather(*(answer(persona, question) for persona, question in questions))
+    finally:
+        await nlu_engine.stop()
+        await close_client()
+
+    answers = {persona: [] for persona in catalog}
+    for (persona, _), entry in zip(questions, results):
+        if entry is not None:
+            answers[persona].append(entry)
+    artifact = {
+        "version": FAQ_ARTIFACT_VERSION,
+        "revision": revision + 1,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model": model,
+        "prompt_hash": prompt_fingerprint(),
+        "answers": answers,
+    }
+    # Write then rename, so a running server never reads a half-written artifact
+    with open(output + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2, ensure_ascii=False)
+    os.replace(output + ".tmp", output)
+
+    total = sum(len(entries) for entries in answers.values())
+    reused = sum(1 for (persona, question), entry in zip(questions, results)
+                 if entry is not None and (persona, faq_key(question)) in previous)
+    print(f"📚 Wrote {total} answers ({reused} reused) to {output}, revision {revision + 1}, "
+          f"in {time.perf_counter() - started:.1f}s")
+    return len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", default=FAQ_CATALOG_PATH)
+    parser.add_argument("--output", default=FAQ_ARTIFACT_PATH)
+    parser.add_argument("--concurrency", type=int, default=4, help="upstream calls in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="max upstream calls per minute (0 = no limit)")
+    parser.add_argument("--force", action="store_true", help="regenerate answers that could be reused")
+    args = parser.parse_args()
+
+    try:
+        catalog = load_catalog(args.catalog)
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+    failed = asyncio.run(generate(catalog, args.output, args.concurrency, args.rpm, args.force))
+    if failed:
+        print(f"❌ {failed} questions failed; rerun to retry them")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
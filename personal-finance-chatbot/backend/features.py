@@ -0,0 +1,37 @@
+import os
+import logging
+
+# =========================
+# 🔹 Feature Flags
+# =========================
+# Each feature can be switched off per deployment with FEATURE_<NAME>=false,
+# or per app with create_app(<name>=False).
+FEATURES = ("nlu", "cache", "streaming", "semantic_cache", "jobs", "faq")
+# Features that stay off unless switched on
+OFF_BY_DEFAULT = ("semantic_cache",)
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+logger = logging.getLogger(__name__)
+
+_enabled = {name: os.getenv(f"FEATURE_{name.upper()}", str(name not in OFF_BY_DEFAULT)).lower() == "true"
+            for name in FEATURES}
+
+
+def is_enabled(name: str) -> bool:
+    return _enabled[name]
+
+
+def configure(**overrides):
+    """
+    Override feature flags; `None` values keep the environment setting.
+    """
+    for name, value in overrides.items():
+        if name not in _enabled:
+            raise ValueError(f"Unknown feature '{name}'; expected one of {', '.join(FEATURES)}")
+        if value is not None:
+            _enabled[name] = bool(value)
+    logger.info("🚩 Features: " + ", ".join(f"{n}={'on' if on else 'off'}" for n, on in _enabled.items()))
+
+
+def snapshot() -> dict:
+    return dict(_enabled)
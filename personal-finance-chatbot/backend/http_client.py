@@ -0,0 +1,55 @@
+import os
+import logging
+import httpx
+
+# =========================
+# 🔹 Connection Pool Settings
+# =========================
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", os.getenv("OPENROUTER_TIMEOUT", "30")))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per process; httpx caps connections per client, and every
+# upstream we talk to is a single host, so this doubles as the per-host limit.
+_client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared keep-alive AsyncClient, creating it on first use.
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        timeout = httpx.Timeout(
+            HTTP_READ_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+        )
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        logger.info(
+            f"🔌 Opening HTTP pool (max={HTTP_MAX_CONNECTIONS}, keepalive={HTTP_MAX_KEEPALIVE}, "
+            f"connect={HTTP_CONNECT_TIMEOUT}s, read={HTTP_READ_TIMEOUT}s)"
+        )
+        _client = httpx.AsyncClient(timeout=timeout, limits=limits)
+    return _client
+
+
+async def close_client():
+    """
+    Close the shared client and release pooled connections.
+    """
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("🔌 HTTP pool closed")
+    _client = None
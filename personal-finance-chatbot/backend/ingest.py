@@ -0,0 +1,247 @@
+import re
+import os
+import csv
+import codecs
+import logging
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+
+# =========================
+# 🔹 Ingestion Settings
+# =========================
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", str(64 * 1024)))
+
+logger = logging.getLogger(__name__)
+
+# Keyword -> category index. Descriptions are tokenized and each token is looked up
+# in a dict, so categorizing a row costs O(tokens) regardless of how many rules exist.
+CATEGORY_KEYWORDS = {
+    "Rent": ["rent", "landlord", "lease", "mortgage", "apartment", "property"],
+    "Food": ["grocery", "groceries", "supermarket", "restaurant", "cafe", "coffee", "starbucks",
+             "mcdonalds", "pizza", "doordash", "ubereats", "grubhub", "bakery", "walmart", "kroger",
+             "safeway", "aldi", "lidl", "tesco", "foods", "swiggy", "zomato"],
+    "Transportation": ["uber", "lyft", "taxi", "fuel", "gas", "shell", "chevron", "exxon", "bp",
+                       "parking", "transit", "metro", "train", "bus", "toll", "airline", "ola"],
+    "Utilities": ["electric", "electricity", "water", "utility", "utilities", "internet", "comcast",
+                  "verizon", "at&t", "att", "t-mobile", "phone", "mobile", "broadband", "energy"],
+    "Entertainment": ["netflix", "spotify", "hulu", "disney", "cinema", "movie", "theatre", "theater",
+                      "steam", "playstation", "xbox", "concert", "ticketmaster"],
+    "Shopping": ["amazon", "target", "ebay", "etsy", "ikea", "mall", "store", "shop", "flipkart"],
+    "Healthcare": ["pharmacy", "cvs", "walgreens", "doctor", "dental", "dentist", "hospital",
+                   "clinic", "medical", "health", "insurance"],
+    "Education": ["tuition", "university", "college", "school", "course", "udemy", "coursera",
+                  "books", "textbook"],
+}
+DEFAULT_CATEGORY = "Other"
+_KEYWORD_INDEX = {kw: category for category, kws in CATEGORY_KEYWORDS.items() for kw in kws}
+_TOKEN = re.compile(r"[a-z0-9&\-]+")
+
+# Header aliases seen in common bank CSV exports
+_DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date", "value date")
+_DESCRIPTION_COLUMNS = ("description", "memo", "payee", "narration", "details", "name", "merchant")
+_AMOUNT_COLUMNS = ("amount", "transaction amount", "value")
+_DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "money out")
+_CREDIT_COLUMNS = ("credit", "deposit", "deposits", "money in")
+_CATEGORY_COLUMNS = ("category",)
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%m-%d-%Y", "%Y%m%d", "%d %b %Y")
+
+_NON_NUMERIC = re.compile(r"[^0-9.\-]")
+_OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+
+
+def categorize(description: str) -> str:
+    """
+    Map a transaction description to a category via the keyword index.
+    """
+    for token in _TOKEN.findall(description.lower()):
+        category = _KEYWORD_INDEX.get(token)
+        if category:
+            return category
+    return DEFAULT_CATEGORY
+
+
+@lru_cache(maxsize=8192)
+def _parse_month(value: str):
+    """
+    Return the "YYYY-MM" bucket for a transaction date, or None if unparseable.
+    Exports repeat the same few hundred dates, so results are memoized.
+    """
+    value = (value or "").strip()
+    # OFX dates look like 20240131120000[-5:EST]
+    if len(value) >= 8 and value[:8].isdigit():
+        value = value[:8]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    # Slow path for "$1,234.50", "(12.00)", "-45.00 USD" and similar
+    text = str(value or "").strip().replace(",", "")
+    negative = text.startswith("(") and text.endswith(")")
+    text = _NON_NUMERIC.sub("", text)
+    if not text or text in ("-", "."):
+        return 0.0
+    amount = float(text)
+    return -abs(amount) if negative else amount
+
+
+class SpendingAggregator:
+    """
+    Constant-memory accumulator of spending per (month, category).
+    Only debits count as spending; credits are summed as income.
+    """
+
+    def __init__(self):
+        self.spending = defaultdict(lambda: defaultdict(float))
+        self.income = defaultdict(float)
+        self.rows = 0
+        self.skipped = 0
+
+    def add(self, month: str, description: str, amount: float, category: str = None):
+        if month is None:
+            self.skipped += 1
+            return
+        self.rows += 1
+        if amount < 0:
+            self.spending[month][category or categorize(description)] += -amount
+        else:
+            self.income[month] += amount
+
+    def result(self) -> dict:
+        months = sorted(set(self.spending) | set(self.income))
+        by_month = {
+            month: {
+                "income": round(self.income.get(month, 0.0), 2),
+                "expenses": {k: round(v, 2) for k, v in sorted(self.spending[month].items())},
+            }
+            for month in months
+        }
+        # Monthly averages over the export period feed straight into the prompt builders
+        totals = defaultdict(float)
+        for month in months:
+            for category, amount in self.spending[month].items():
+                totals[category] += amount
+        n = max(len(months), 1)
+        return {
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "months": by_month,
+            "income": round(sum(self.income.values()) / n, 2),
+            "expenses": {k: round(v / n, 2) for k, v in sorted(totals.items())},
+        }
+
+
+def _iter_lines(stream, encoding: str = "utf-8-sig"):
+    """
+    Read a binary file object in fixed-size chunks and yield decoded lines.
+    Only one chunk plus a partial line is held in memory at a time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read(INGEST_CHUNK_BYTES)
+        if not chunk:
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                yield pending
+            return
+        lines = (pending + decoder.decode(chunk)).splitlines(keepends=True)
+        # The last piece may be an incomplete line; carry it into the next chunk
+        pending = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        yield from lines
+
+
+def _pick(header: dict, candidates) -> str:
+    for name in candidates:
+        if name in header:
+            return header[name]
+    return None
+
+
+def parse_csv(stream, aggregator: SpendingAggregator):
+    """
+    Stream-parse a bank CSV export row by row into the aggregator.
+    Amounts are signed (negative = spending) or split into debit/credit columns.
+    """
+    reader = csv.reader(_iter_lines(stream))
+    fields = next(reader, None)
+    if not fields:
+        raise ValueError("CSV file is empty")
+    header = {name.strip().lower(): i for i, name in enumerate(fields)}
+    date_i = _pick(header, _DATE_COLUMNS)
+    desc_i = _pick(header, _DESCRIPTION_COLUMNS)
+    amount_i = _pick(header, _AMOUNT_COLUMNS)
+    debit_i = _pick(header, _DEBIT_COLUMNS)
+    credit_i = _pick(header, _CREDIT_COLUMNS)
+    category_i = _pick(header, _CATEGORY_COLUMNS)
+    if date_i is None or (amount_i is None and debit_i is None):
+        raise ValueError("CSV needs a date column and an amount (or debit/credit) column")
+
+    for row in reader:
+        if not row:
+            continue
+        try:
+            if amount_i is not None:
+                amount = _parse_amount(row[amount_i])
+            else:
+                amount = _parse_amount(row[credit_i]) if credit_i is not None else 0.0
+                amount -= abs(_parse_amount(row[debit_i]))
+        except (IndexError, ValueError):
+            aggregator.skipped += 1
+            continue
+        description = row[desc_i] if desc_i is not None and desc_i < len(row) else ""
+        category = row[category_i].strip() if category_i is not None and category_i < len(row) else None
+        aggregator.add(_parse_month(row[date_i] if date_i < len(row) else ""), description, amount,
+                       category or None)
+
+
+def parse_ofx(stream, aggregator: SpendingAggregator):
+    """
+    Stream-parse an OFX/QFX export, one <STMTTRN> block at a time.
+    Handles both SGML (unclosed tags) and XML flavours.
+    """
+    current = None
+    for line in _iter_lines(stream, encoding="latin-1"):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    try:
+                        amount = _parse_amount(current.get("TRNAMT"))
+                    except ValueError:
+                        aggregator.skipped += 1
+                    else:
+                        description = " ".join(filter(None, (current.get("NAME"), current.get("MEMO"))))
+                        aggregator.add(_parse_month(current.get("DTPOSTED")), description, amount)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def ingest_transactions(stream, filename: str = "") -> dict:
+    """
+    Aggregate a CSV or OFX/QFX export into per-month, per-category spending.
+    """
+    aggregator = SpendingAggregator()
+    name = (filename or "").lower()
+    if name.endswith((".ofx", ".qfx")):
+        parse_ofx(stream, aggregator)
+    elif name.endswith(".csv") or not name:
+        parse_csv(stream, aggregator)
+    else:
+        raise ValueError("Unsupported file type; upload a .csv, .ofx or .qfx export")
+    result = aggregator.result()
+    logger.info(f"🧾 Ingested {result['rows']} transactions across {len(result['months'])} months "
+                f"({result['skipped']} skipped)")
+    return result
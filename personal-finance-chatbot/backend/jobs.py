@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from metrics import registry, Counter
+
+# =========================
+# 🔹 Job Queue Settings
+# =========================
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # concurrent jobs per process
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "120"))  # seconds per job
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "1000"))  # queued jobs before submissions get 503
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "86400"))  # finished jobs (and their keys) kept this long
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))  # longest long-poll on GET /jobs/{id}?wait=
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))  # idle workers check the store this often
+JOB_MAX_ATTEMPTS = 2  # a job interrupted by a restart runs once more, then fails
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+logger = logging.getLogger(__name__)
+
+job_outcomes = registry.register(Counter(
+    "finbot_jobs_total", "Finished background jobs by kind and status.", ("kind", "status")))
+
+
+class JobQueueFullError(Exception):
+    """
+    Too many jobs are already waiting; retry after `retry_after` seconds.
+    """
+
+    def __init__(self, queued: int, retry_after: float = 5.0):
+        super().__init__(f"Job queue is full ({queued} jobs waiting)")
+        self.retry_after = retry_after
+
+
+class IdempotencyConflictError(ValueError):
+    """
+    An idempotency key was reused for a different request.
+    """
+
+
+# =========================
+# 🔹 SQLite Job Store
+# =========================
+class JobStore:
+    """
+    Jobs and their results in SQLite. Workers in every process on the host claim jobs
+    from the same table, one IMMEDIATE transaction per claim.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "idempotency_key TEXT UNIQUE, result TEXT, error TEXT, status_code INTEGER, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        return self._conn
+
+    def _transact(self, fn):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn, time.time())
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _job(row) -> dict:
+        if row is None:
+            return None
+        job = {"id": row["id"], "kind": row["kind"], "status": row["status"],
+               "created_at": row["created_at"], "started_at": row["started_at"], "finished_at": row["finished_at"]}
+        if row["status"] == SUCCEEDED:
+            job["result"] = json.loads(row["result"])
+        elif row["status"] == FAILED:
+            job["error"] = {"status_code": row["status_code"], "detail": row["error"]}
+        return job
+
+    def submit(self, kind: str, payload: dict, idempotency_key: str = None, max_queued: int = JOB_MAX_QUEUE):
+        """
+        Insert a queued job; returns (job, created). A known idempotency key returns the
+        existing job instead.
+        """
+        body = json.dumps(payload, sort_keys=True)
+
+        def submit(conn, now):
+            if idempotency_key is not None:
+                row = conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                if row is not None:
+                    if row["kind"] != kind or row["payload"] != body:
+                        raise IdempotencyConflictError(
+                            f"Idempotency key '{idempotency_key}' was already used for a different request")
+                    return self._job(row), False
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if max_queued and queued >= max_queued:
+                raise JobQueueFullError(queued)
+            job_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO jobs (id, kind, payload, status, idempotency_key, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (job_id, kind, body, QUEUED, idempotency_key, now))
+            return self._job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()), True
+
+        return self._transact(submit)
+
+    def claim(self):
+        """
+        Mark the oldest queued job running and return (id, kind, payload), or None.
+        """
+        def claim(conn, now):
+            row = conn.execute("SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                               (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                         (RUNNING, now, row["id"]))
+            return row["id"], row["kind"], json.loads(row["payload"])
+
+        return self._transact(claim)
+
+    def finish(self, job_id: str, result: dict = None, error: str = None, status_code: int = None):
+        status = FAILED if error is not None else SUCCEEDED
+        self._transact(lambda conn, now: conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, finished_at = ? WHERE id = ?",
+            (status, None if result is None else json.dumps(result), error, status_code, now, job_id)))
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._job(self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def recover(self, stale_after: float):
+        """
+        Requeue jobs left running by a process that died; fail them after JOB_MAX_ATTEMPTS.
+        Returns the number of jobs touched.
+        """
+        def recover(conn, now):
+            cutoff = now - stale_after
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Interrupted by a restart', status_code = 500, finished_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, cutoff, JOB_MAX_ATTEMPTS)).rowcount
+            requeued = conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?",
+                                    (QUEUED, RUNNING, cutoff)).rowcount
+            return failed + requeued
+
+        return self._transact(recover)
+
+    def purge(self, older_than: float) -> int:
+        return self._transact(lambda conn, now: conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, now - older_than)).rowcount)
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)} | {status: n for status, n in rows}
+
+
+# =========================
+# 🔹 Worker Pool
+# =========================
+class JobQueue:
+    """
+    Bounded pool of async workers running registered job kinds from a JobStore.
+
+    Submitting wakes a local worker at once; idle workers also poll the store, so jobs
+    submitted through another worker process are picked up too. Each job runs under
+    JOB_TIMEOUT. Store calls run in a worker thread.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, timeout: float = JOB_TIMEOUT):
+        self.store = store
+        self.workers = workers
+        self.timeout = timeout
+        self.handlers = {}
+        self._tasks = []
+        self._wakeup = None
+        self.completed = 0
+
+    def register(self, kind: str, handler):
+        """
+        `handler(payload) -> dict` is awaited for each job of this kind. Exceptions with a
+        `status_code` (like HTTPException) keep it; anything else fails the job with 500.
+        """
+        self.handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: dict, idempotency_key: str = None):
+        job, created = await asyncio.to_thread(self.store.submit, kind, payload, idempotency_key)
+        if created:
+            logger.info(f"📥 Job {job['id']} queued ({kind})")
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return job, created
+
+    async def get(self, job_id: str):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float):
+        """
+        Return the job once it has finished, or as it is when `timeout` runs out.
+        """
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+        while job is not None and job["status"] not in FINISHED and time.monotonic() < deadline:
+            await asyncio.sleep(min(JOB_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            job = await self.get(job_id)
+        return job
+
+    async def watch(self, job_id: str):
+        """
+        Yield the job each time its status changes, ending with the finished job.
+        """
+        last = None
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if job["status"] != last:
+                last = job["status"]
+                yield job
+            if last in FINISHED:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    async def _finish(self, job_id: str, result: dict = None, error: str = None, status_code: int = None):
+        """
+        Store a job's outcome; returns the status stored, or None if nothing could be.
+        A result that cannot be stored fails the job instead.
+        """
+        try:
+            await asyncio.to_thread(self.store.finish, job_id, result, error, status_code)
+            return FAILED if error is not None else SUCCEEDED
+        except Exception as e:
+            logger.error(f"❌ Could not store the outcome of job {job_id}: {e}")
+            if error is None:
+                error, status_code = f"Could not store the job result: {e}", 500
+        try:
+            await asyncio.to_thread(self.store.finish, job_id, None, error, status_code)
+            return FAILED
+        except Exception as e:
+            # Still marked running; housekeeping requeues it once it goes stale
+            logger.error(f"❌ Could not mark job {job_id} failed: {e}")
+            return None
+
+    async def _run(self, job_id: str, kind: str, payload: dict):
+        started = time.perf_counter()
+        result = error = status_code = None
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{kind}'")
+            result = await asyncio.wait_for(handler(payload), self.timeout)
+        except asyncio.TimeoutError:
+            error, status_code = f"Job timed out after {self.timeout:g}s", 504
+            logger.error(f"⏳ Job {job_id} timed out after {self.timeout:g}s")
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e) or type(e).__name__
+            status_code = getattr(e, "status_code", 500)
+            logger.error(f"❌ Job {job_id} failed: {error}")
+        status = await self._finish(job_id, result, error, status_code)
+        if status is not None:
+            job_outcomes.inc(kind, status)
+        if status == SUCCEEDED:
+            logger.info(f"✅ Job {job_id} done in {time.perf_counter() - started:.2f}s")
+        self.completed += 1
+
+    async def _worker(self):
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.store.claim)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job store unavailable: {e}")
+                claimed = None
+            if claimed is not None:
+                try:
+                    await self._run(*claimed)
+                except Exception as e:
+                    # One bad job must not take a worker out of the pool
+                    logger.error(f"❌ Job worker error on job {claimed[0]}: {e}")
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _housekeeping(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.store.recover, self.timeout * 2)
+                purged = await asyncio.to_thread(self.store.purge, JOB_RESULT_TTL)
+                if purged:
+                    logger.info(f"🧹 Purged {purged} finished jobs")
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job housekeeping failed: {e}")
+            await asyncio.sleep(max(60.0, self.timeout))
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+        logger.info(f"🧵 Job queue: {self.workers} workers, {self.timeout:g}s timeout ({self.store.path})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "timeout": self.timeout, "max_queue": JOB_MAX_QUEUE,
+                "jobs": self.store.counts()}
+
+
+job_queue = JobQueue(JobStore())
+
@@ -0,0 +1,254 @@
+import time
+import uuid
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+# =========================
+# 🔹 Request Context
+# =========================
+REQUEST_ID_HEADER = "X-Request-ID"
+request_id_var = ContextVar("request_id", default="-")
+_scope_var = ContextVar("http_scope", default=None)
+
+# Upper bounds in seconds; covers sub-millisecond cache hits up to slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def current_route() -> str:
+    """
+    Route template of the request being handled (e.g. "/sessions/{session_id}"), "-"
+    outside a request, or "unmatched" when no route matched.
+    """
+    scope = _scope_var.get()
+    if scope is None:
+        return "-"
+    # Never fall back to the raw path: 404 scans and IDs would each become a new series
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class CallbackCounter(Counter):
+    """
+    Counter read at scrape time from a component that already keeps its own totals.
+    `fn` returns {label_values_tuple: value}.
+    """
+
+    def __init__(self, name: str, help: str, labelnames, fn):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self) -> list:
+        self._values = dict(self.fn())
+        return super().render()
+
+
+class Gauge(Counter):
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list:
+        return [line.replace(" counter", " gauge") if line.startswith("# TYPE") else line
+                for line in super().render()]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# =========================
+# 🔹 Metrics
+# =========================
+registry = Registry()
+http_requests = registry.register(Counter(
+    "finbot_http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")))
+http_latency = registry.register(Histogram(
+    "finbot_http_request_duration_seconds", "Full request duration including streamed bodies.", ("route", "method")))
+stage_latency = registry.register(Histogram(
+    "finbot_stage_duration_seconds",
+    "Time spent per processing stage (nlu, model_load, analytics, prompt_build, queue_wait, upstream, ttft).",
+    ("route", "stage")))
+upstream_tokens = registry.register(Counter(
+    "finbot_upstream_tokens_total", "Tokens reported by the upstream usage field.", ("model", "direction")))
+errors = registry.register(Counter(
+    "finbot_errors_total", "Errors by route and exception type.", ("route", "type")))
+nlu_paths = registry.register(Counter(
+    "finbot_nlu_analyses_total", "NLU analyses answered by the rule fast path or the models.", ("path",)))
+startup = registry.register(Gauge(
+    "finbot_startup_seconds", "Seconds from importing the app module to each startup phase.", ("phase",)))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def observe_stage(stage: str, seconds: float):
+    stage_latency.observe(seconds, current_route(), stage)
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Record the duration of the enclosed block as a stage of the current request.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def record_usage(model: str, usage: dict):
+    if not usage:
+        return
+    upstream_tokens.inc(model, "in", amount=usage.get("prompt_tokens") or 0)
+    upstream_tokens.inc(model, "out", amount=usage.get("completion_tokens") or 0)
+
+
+def record_error(exc: Exception):
+    errors.inc(current_route(), type(exc).__name__)
+
+
+def render() -> str:
+    return registry.render()
+
+
+# =========================
+# 🔹 Request IDs in Logs
+# =========================
+LOG_FORMAT = "%(levelname)s:%(name)s:[%(request_id)s] %(message)s"
+
+
+def install_request_logging():
+    """
+    Stamp every log record with the current request id and show it in the root handlers.
+    """
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "_with_request_id", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        record.request_id = request_id_var.get()
+        return record
+
+    record_factory._with_request_id = True
+    logging.setLogRecordFactory(record_factory)
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=logging.INFO)
+    for handler in root.handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: assigns a request id (honouring an incoming X-Request-ID), echoes it
+    in the response, and records request counts and durations per route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.lower().encode())
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex[:16]
+        id_token = request_id_var.set(request_id)
+        scope_token = _scope_var.set(scope)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": list(message.get("headers", []))
+                           + [(REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        except Exception as e:
+            record_error(e)
+            raise
+        finally:
+            route = current_route()
+            http_requests.inc(route, scope["method"], str(status[0]))
+            http_latency.observe(time.perf_counter() - started, route, scope["method"])
+            _scope_var.reset(scope_token)
+            request_id_var.reset(id_token)
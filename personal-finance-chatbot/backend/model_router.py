@@ -0,0 +1,213 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from resilience import CircuitBreaker, DeadlineExceededError, UPSTREAM_DEADLINE
+
+# =========================
+# 🔹 Router Settings
+# =========================
+DEFAULT_MODEL = os.getenv("OPENROUTER_MODEL", "gpt-4o-mini")
+ROUTES = ("chat", "budget", "spending")
+MODEL_STATS_WINDOW = int(os.getenv("MODEL_STATS_WINDOW", "200"))
+MODEL_HEDGE = os.getenv("MODEL_HEDGE", "false").lower() == "true"
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+MODEL_MAX_ERROR_RATE = float(os.getenv("MODEL_MAX_ERROR_RATE", "0.5"))
+# Only recent outcomes count towards the error rate, so a demoted model gets another chance
+MODEL_ERROR_WINDOW = float(os.getenv("MODEL_ERROR_WINDOW", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def _models_for(route: str) -> list:
+    # e.g. OPENROUTER_MODELS_CHAT="openai/gpt-4o-mini,anthropic/claude-3-haiku"
+    value = os.getenv(f"OPENROUTER_MODELS_{route.upper()}", "")
+    models = [m.strip() for m in value.split(",") if m.strip()]
+    return models or [DEFAULT_MODEL]
+
+
+class ModelStats:
+    """
+    Rolling latency and error-rate window for one model.
+    """
+
+    def __init__(self, window: int = MODEL_STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, latency, ok: bool):
+        if ok and latency is not None:
+            self.latencies.append(latency)
+        self.outcomes.append((time.monotonic(), ok))
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        since = time.monotonic() - MODEL_ERROR_WINDOW
+        recent = [ok for at, ok in self.outcomes if at >= since]
+        if not recent:
+            return 0.0
+        return 1 - sum(recent) / len(recent)
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": len(self.outcomes),
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class ModelRouter:
+    """
+    Per-route ordered model lists with health-aware fallback and optional hedging.
+
+    Models whose circuit is open are skipped and models with a high recent error
+    rate are tried last. With hedging on, if the first model has not answered
+    within its own rolling p95, a duplicate request goes to the next model and
+    whichever finishes first wins; the other is cancelled.
+    """
+
+    def __init__(self, routes: dict = None, hedge: bool = MODEL_HEDGE):
+        self.routes = routes or {route: _models_for(route) for route in ROUTES}
+        self.hedge = hedge
+        self.stats = {}
+        self.breakers = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _stats(self, model: str) -> ModelStats:
+        return self.stats.setdefault(model, ModelStats())
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        return self.breakers.setdefault(model, CircuitBreaker(f"openrouter:{model}"))
+
+    def candidates(self, route: str) -> list:
+        models = self.routes.get(route) or [DEFAULT_MODEL]
+        available = [m for m in models if self.breaker(m).state != "open"] or models
+        healthy = [m for m in available if self._stats(m).error_rate <= MODEL_MAX_ERROR_RATE]
+        return healthy + [m for m in available if m not in healthy]
+
+    def primary(self, route: str) -> str:
+        return (self.routes.get(route) or [DEFAULT_MODEL])[0]
+
+    async def _timed(self, model: str, call, deadline: float):
+        started = time.monotonic()
+        try:
+            result = await call(model, deadline)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._stats(model).record(time.monotonic() - started, ok=False)
+            raise
+        self._stats(model).record(time.monotonic() - started, ok=True)
+        return result
+
+    async def complete(self, route: str, call, deadline: float = None):
+        """
+        Run `call(model, remaining_deadline)` against the route's models until one succeeds.
+        """
+        deadline_at = time.monotonic() + (UPSTREAM_DEADLINE if deadline is None else deadline)
+        models = self.candidates(route)
+        last_error = None
+        i = 0
+        while i < len(models):
+            if deadline_at - time.monotonic() <= 0:
+                raise last_error or DeadlineExceededError(f"{route} deadline exceeded")
+            model = models[i]
+            backup = models[i + 1] if self.hedge and i + 1 < len(models) else None
+            try:
+                if backup is not None:
+                    return await self._hedged(model, backup, call, deadline_at)
+                return await self._timed(model, call, deadline_at - time.monotonic())
+            except Exception as e:
+                last_error = e
+            logger.warning(f"↪️ Model {model} failed for {route}: {last_error}")
+            # A hedged pair has already tried the backup model too
+            i += 2 if backup is not None else 1
+        raise last_error
+
+    async def _hedged(self, model: str, backup: str, call, deadline_at: float):
+        stats = self._stats(model)
+        hedge_after = stats.percentile(0.95) if len(stats.latencies) >= MODEL_HEDGE_MIN_SAMPLES else None
+        primary = asyncio.ensure_future(self._timed(model, call, deadline_at - time.monotonic()))
+        try:
+            if hedge_after is not None and time.monotonic() + hedge_after < deadline_at:
+                done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+                if not done:
+                    return await self._race(primary, model, backup, call, deadline_at, hedge_after)
+            try:
+                return await primary
+            except Exception as e:
+                # The primary failed before a hedge was needed; fall back to the backup alone
+                logger.warning(f"↪️ Model {model} failed, falling back to {backup}: {e}")
+                return await self._timed(backup, call, deadline_at - time.monotonic())
+        finally:
+            # Never leave the primary running if the caller goes away
+            if not primary.done():
+                primary.cancel()
+
+    async def _race(self, primary, model: str, backup: str, call, deadline_at: float, hedge_after: float):
+        self.hedges += 1
+        logger.info(f"🪁 Hedging {model} (> p95 {hedge_after * 1000:.0f}ms) with {backup}")
+        secondary = asyncio.ensure_future(self._timed(backup, call, deadline_at - time.monotonic()))
+        pending = {primary, secondary}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, route: str, make_stream):
+        """
+        Stream from the first healthy model; fall back only before the first chunk.
+        """
+        last_error = None
+        for model in self.candidates(route):
+            sent = False
+            try:
+                async for chunk in make_stream(model):
+                    if not sent:
+                        sent = True
+                        # Stream timings aren't comparable with full completions; only count the outcome
+                        self._stats(model).record(None, ok=True)
+                    yield chunk
+                return
+            except Exception as e:
+                if sent:
+                    raise
+                self._stats(model).record(None, ok=False)
+                last_error = e
+                logger.warning(f"↪️ Model {model} failed to stream for {route}: {e}")
+        raise last_error
+
+    def snapshot(self) -> dict:
+        return {
+            "routes": self.routes,
+            "hedging": self.hedge,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "models": {
+                model: {**stats.snapshot(), "circuit": self.breaker(model).state}
+                for model, stats in self.stats.items()
+            },
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from metrics import observe_stage
+
+# =========================
+# 🔹 Engine Settings
+# =========================
+NLU_SENTIMENT_MODEL = os.getenv("NLU_SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+NLU_NER_MODEL = os.getenv("NLU_NER_MODEL", "dslim/bert-base-NER")
+NLU_BATCH_SIZE = int(os.getenv("NLU_BATCH_SIZE", "16"))
+NLU_BATCH_WAIT_MS = float(os.getenv("NLU_BATCH_WAIT_MS", "10"))
+NLU_PRELOAD = os.getenv("NLU_PRELOAD", "true").lower() == "true"
+NLU_MEMO_MAX_ENTRIES = int(os.getenv("NLU_MEMO_MAX_ENTRIES", "10000"))
+NLU_MEMO_MAX_BYTES = int(os.getenv("NLU_MEMO_MAX_BYTES", str(16 * 1024 * 1024)))
+# torch = full-precision PyTorch; quantized = PyTorch with int8 dynamic quantization;
+# onnx = ONNX Runtime models exported by `python nlu_export.py export`
+NLU_BACKEND = os.getenv("NLU_BACKEND", "torch").lower()
+NLU_ONNX_DIR = os.getenv("NLU_ONNX_DIR", "nlu_models")
+NLU_BACKENDS = ("torch", "quantized", "onnx")
+# model = transformers only; rules = regex/lexicon fast path only;
+# hybrid = fast path, escalating to the models when it is not confident
+NLU_MODE = os.getenv("NLU_MODE", "model").lower()
+
+logger = logging.getLogger(__name__)
+
+NEUTRAL_RESULT = {"sentiment": "neutral", "entities": [], "keywords": []}
+
+
+def split_fallback(result: dict) -> tuple:
+    """
+    Separate a result from its internal fallback marker: (result without it, was it the fallback).
+    """
+    fallback = bool(result.pop("fallback", False))
+    return result, fallback
+
+
+def _to_result(sentiment_result: dict, ner_results: list) -> dict:
+    entities = [ent['word'] for ent in ner_results]
+    return {
+        "sentiment": sentiment_result['label'].lower(),
+        "entities": entities,
+        "keywords": list(set(entities))[:5]
+    }
+
+
+def _quantized_pipeline(task: str, model_name: str, **kwargs):
+    import torch
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification, AutoModelForTokenClassification
+
+    model_class = AutoModelForSequenceClassification if task == "sentiment-analysis" else AutoModelForTokenClassification
+    model = model_class.from_pretrained(model_name).eval()
+    # Linear layers hold almost all of the weights; int8 them and keep activations in float
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_name), **kwargs)
+
+
+def _onnx_pipeline(task: str, model_dir: str, **kwargs):
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForTokenClassification
+    except ImportError as e:
+        raise RuntimeError("NLU_BACKEND=onnx needs optimum[onnxruntime] (pip install 'optimum[onnxruntime]')") from e
+    from transformers import pipeline, AutoTokenizer
+
+    if not os.path.isdir(model_dir):
+        raise FileNotFoundError(f"No ONNX model at {model_dir}; run `python nlu_export.py export` first")
+    model_class = ORTModelForSequenceClassification if task == "sentiment-analysis" else ORTModelForTokenClassification
+    # Prefer the int8 file when the export was quantized
+    file_name = "model_quantized.onnx" if os.path.exists(os.path.join(model_dir, "model_quantized.onnx")) else "model.onnx"
+    model = model_class.from_pretrained(model_dir, file_name=file_name)
+    return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_dir), **kwargs)
+
+
+def build_pipelines(backend: str = NLU_BACKEND, onnx_dir: str = NLU_ONNX_DIR) -> tuple:
+    """
+    Build the (sentiment, ner) pipelines for an inference backend.
+    """
+    if backend == "torch":
+        from transformers import pipeline
+        return (pipeline("sentiment-analysis", model=NLU_SENTIMENT_MODEL),
+                pipeline("ner", model=NLU_NER_MODEL, aggregation_strategy="simple"))
+    if backend == "quantized":
+        return (_quantized_pipeline("sentiment-analysis", NLU_SENTIMENT_MODEL),
+                _quantized_pipeline("ner", NLU_NER_MODEL, aggregation_strategy="simple"))
+    if backend == "onnx":
+        return (_onnx_pipeline("sentiment-analysis", os.path.join(onnx_dir, "sentiment")),
+                _onnx_pipeline("ner", os.path.join(onnx_dir, "ner"), aggregation_strategy="simple"))
+    raise ValueError(f"Unknown NLU backend '{backend}'; expected one of {', '.join(NLU_BACKENDS)}")
+
+
+class NLUResultCache:
+    """
+    Bounded LRU memo of NLU results keyed by a hash of the input text.
+    Evicts by entry count and by an approximate byte budget.
+    """
+
+    def __init__(self, max_entries: int = NLU_MEMO_MAX_ENTRIES, max_bytes: int = NLU_MEMO_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, text: str):
+        key = self.key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[0]
+        # Copy so callers cannot mutate the memoized value
+        return {**result, "entities": list(result["entities"]), "keywords": list(result["keywords"])}
+
+    def set(self, text: str, result: dict):
+        if self.max_entries <= 0:
+            return
+        key = self.key(text)
+        # 64 bytes for the hex key plus the serialized result is close enough for a cap
+        size = 64 + len(json.dumps(result))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class NLUEngine:
+    """
+    Sentiment + NER inference with models loaded once and requests micro-batched.
+
+    Concurrent `analyze()` calls are queued and drained in batches of up to
+    `batch_size` texts, waiting at most `wait_ms` for a batch to fill. Each batch
+    runs on a single dedicated worker thread so the event loop is never blocked.
+    Results are memoized by text hash, so repeated texts skip the models entirely.
+    """
+
+    def __init__(self, batch_size: int = NLU_BATCH_SIZE, wait_ms: float = NLU_BATCH_WAIT_MS,
+                 backend: str = NLU_BACKEND):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.wait_ms = max(0.0, wait_ms)
+        self._sentiment_analyzer = None
+        self._ner_tagger = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlu-worker")
+        self._queue = None
+        self._batcher = None
+        self._start_lock = None
+        self.memo = NLUResultCache()
+
+    # ---------- model loading ----------
+    @property
+    def loaded(self) -> bool:
+        return self._sentiment_analyzer is not None and self._ner_tagger is not None
+
+    def load(self):
+        """
+        Load both pipelines exactly once (thread-safe).
+        """
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        with self._load_lock:
+            if not self.loaded:
+                logger.info(f"Loading sentiment analysis and NER models ({self.backend} backend)...")
+                # transformers is imported in here so deployments with NLU disabled never pay for it
+                self._sentiment_analyzer, self._ner_tagger = build_pipelines(self.backend)
+        observe_stage("model_load", time.perf_counter() - started)
+
+    # ---------- synchronous batch inference ----------
+    def analyze_batch(self, texts: list) -> list:
+        """
+        Run sentiment and NER over a list of texts in one forward pass each.
+        Memoized texts are answered without touching the models.
+        """
+        results = [self.memo.get(text) for text in texts]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            computed = self._infer([texts[i] for i in pending])
+            for i, result in zip(pending, computed):
+                results[i] = split_fallback(result)[0]
+        return results
+
+    def _infer(self, texts: list) -> list:
+        """
+        Run the models over texts that missed the memo and memoize the results.
+        On failure every text gets the neutral result with an internal "fallback" marker.
+        """
+        if not texts:
+            return []
+        # Duplicate texts inside one batch only need a single forward pass
+        unique = list(dict.fromkeys(texts))
+        try:
+            self.load()
+            sentiments = self._sentiment_analyzer(unique, batch_size=len(unique), truncation=True)
+            ner_batches = self._ner_tagger(unique, batch_size=len(unique))
+            # A single string input returns a flat entity list rather than a list of lists
+            if len(unique) == 1 and (not ner_batches or isinstance(ner_batches[0], dict)):
+                ner_batches = [ner_batches]
+            computed = {}
+            for text, s, n in zip(unique, sentiments, ner_batches):
+                computed[text] = _to_result(s, n)
+                self.memo.set(text, computed[text])
+        except Exception as e:
+            logger.error(f"❌ NLU analysis failed: {e}")
+            # Marked so the server can tell clients not to memoize it; stripped before reaching callers
+            computed = {text: {**NEUTRAL_RESULT, "fallback": True} for text in unique}
+
+        return [
+            {**computed[text], "entities": list(computed[text]["entities"]),
+             "keywords": list(computed[text]["keywords"])}
+            for text in texts
+        ]
+
+    # ---------- async micro-batching ----------
+    async def start(self):
+        """
+        Load the models on the worker thread and start the batching loop.
+        """
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._batcher is not None and not self._batcher.done():
+                return
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._executor, self.load)
+                logger.info(f"✅ NLU models ready in {time.perf_counter() - started:.1f}s "
+                            f"(backend={self.backend}, batch_size={self.batch_size}, wait={self.wait_ms}ms)")
+            except Exception as e:
+                # Batches retry the load and fall back to a neutral result
+                logger.error(f"❌ NLU model load failed: {e}")
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        """
+        Stop the batching loop; texts still queued get the neutral result.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_result({**NEUTRAL_RESULT, "fallback": True})
+
+    async def analyze(self, text: str) -> dict:
+        """
+        Queue a text for the next micro-batch and wait for its result.
+        """
+        result, _ = await self.analyze_with_status(text)
+        return result
+
+    async def analyze_with_status(self, text: str) -> tuple:
+        """
+        Like `analyze`, but returns (result, fallback) where fallback is True when the
+        models failed and the result is the neutral placeholder.
+        """
+        cached = self.memo.get(text)
+        if cached is not None:
+            return cached, False
+        if self._batcher is None or self._batcher.done():
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return split_fallback(await future)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.wait_ms / 1000
+                while len(batch) < self.batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                texts = [text for text, _ in batch]
+                results = await loop.run_in_executor(self._executor, self._infer, texts)
+            except asyncio.CancelledError:
+                # Stopped mid-batch: answer the texts already taken off the queue
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result({**NEUTRAL_RESULT, "fallback": True})
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+
+def build_engine():
+    """
+    In-process engine, or a client for the shared NLU server when NLU_SERVER_ADDRESS is set,
+    fronted by the rule fast path in the rules and hybrid modes.
+    """
+    if NLU_MODE == "rules":
+        from nlu_rules import FastPathNLUEngine
+        return FastPathNLUEngine()
+    if os.getenv("NLU_SERVER_ADDRESS"):
+        from nlu_remote import RemoteNLUEngine
+        engine = RemoteNLUEngine()
+    else:
+        engine = NLUEngine()
+    if NLU_MODE == "hybrid":
+        from nlu_rules import FastPathNLUEngine
+        return FastPathNLUEngine(engine)
+    return engine
+
+
+nlu_engine = build_engine()
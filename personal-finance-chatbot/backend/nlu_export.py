@@ -0,0 +1,188 @@
+"""
+Export the NLU models for the faster CPU backends and check them against the PyTorch pipelines.
+
+    # ONNX export (optionally int8-quantized) into NLU_ONNX_DIR
+    python nlu_export.py export --output nlu_models --quantize
+
+    # Compare a backend with the full-precision pipelines; exit 1 below the thresholds
+    python nlu_export.py parity --backend onnx
+    python nlu_export.py parity --backend quantized --texts questions.txt --output parity.json
+
+Then run the API with NLU_BACKEND=onnx (or quantized).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from nlu_engine import NLU_SENTIMENT_MODEL, NLU_NER_MODEL, NLU_ONNX_DIR, NLU_BACKENDS, build_pipelines, _to_result
+
+# Finance questions shaped like real /generate traffic; --texts replaces them
+SAMPLE_TEXTS = [
+    "How can I save money as a student?",
+    "I'm stressed about paying off my credit card debt before December.",
+    "Should I invest in index funds or pay down my student loan first?",
+    "My rent in Boston went up by $200, how do I adjust my budget?",
+    "What is a good emergency fund size for a freelancer?",
+    "I want to buy a house in three years, how much should I save monthly?",
+    "Is it worth cancelling Netflix and Spotify to save money?",
+    "How do I build credit with no credit history?",
+    "Chase charged me a late fee again and I'm furious.",
+    "I just got a raise at Microsoft and want to max out my 401k.",
+    "Can I afford a Tesla on a $70,000 salary?",
+    "My Vanguard account dropped 10% this year, should I sell?",
+    "Great news, I finally paid off my car loan from Wells Fargo!",
+    "How much should I put into a Roth IRA each year?",
+    "Is Bank of America or Ally better for a high-yield savings account?",
+    "I'm moving to London next spring, how do I budget for it?",
+]
+
+
+def export(output: str, quantize: bool):
+    """
+    Convert both Hugging Face models to ONNX (and optionally int8) under output/{sentiment,ner}.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForTokenClassification
+    except ImportError:
+        sys.exit("❌ ONNX export needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'")
+    from transformers import AutoTokenizer
+
+    for name, model_name, model_class in (("sentiment", NLU_SENTIMENT_MODEL, ORTModelForSequenceClassification),
+                                          ("ner", NLU_NER_MODEL, ORTModelForTokenClassification)):
+        target = os.path.join(output, name)
+        started = time.perf_counter()
+        model = model_class.from_pretrained(model_name, export=True)
+        model.save_pretrained(target)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(target)
+        if quantize:
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            # Dynamic quantization needs no calibration data; avx2 runs on any x86-64 node we have
+            config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            ORTQuantizer.from_pretrained(target).quantize(save_dir=target, quantization_config=config)
+        size = sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target) if f.endswith(".onnx"))
+        print(f"✅ {name}: {model_name} -> {target} ({size / 1e6:.0f} MB of .onnx, "
+              f"{time.perf_counter() - started:.1f}s)")
+
+
+def _run_backend(backend: str, onnx_dir: str, texts: list, repeats: int) -> dict:
+    """
+    Load one backend and time it; runs in a fresh process so the memory numbers are its own.
+    """
+    started = time.perf_counter()
+    sentiment, ner = build_pipelines(backend, onnx_dir)
+    load_seconds = time.perf_counter() - started
+
+    results = [_to_result(s, n) for s, n in zip(sentiment(texts, truncation=True), ner(texts))]
+    latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            sentiment([text], truncation=True)
+            ner([text])
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        peak = None  # Windows
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "latency_ms": {"p50": round(latencies[len(latencies) // 2] * 1000, 2),
+                       "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 2)},
+        "peak_rss_mb": round(peak / 1e6, 1) if peak else None,
+        "results": results,
+    }
+
+
+def parity(backend: str, onnx_dir: str, texts: list, repeats: int) -> dict:
+    """
+    Run the full-precision pipelines and `backend` on the same texts and compare the outputs.
+    """
+    measured = {}
+    for name in ("torch", backend):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            measured[name] = pool.submit(_run_backend, name, onnx_dir, texts, repeats).result()
+
+    reference, candidate = measured["torch"]["results"], measured[backend]["results"]
+    mismatches = []
+    sentiment_same = entities_same = 0
+    for text, ref, got in zip(texts, reference, candidate):
+        same_sentiment = ref["sentiment"] == got["sentiment"]
+        same_entities = set(ref["entities"]) == set(got["entities"])
+        sentiment_same += same_sentiment
+        entities_same += same_entities
+        if not (same_sentiment and same_entities):
+            mismatches.append({"text": text, "torch": ref, backend: got})
+
+    summary = {name: {k: v for k, v in m.items() if k != "results"} for name, m in measured.items()}
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "sentiment_agreement": round(sentiment_same / len(texts), 4),
+        "entity_agreement": round(entities_same / len(texts), 4),
+        "speedup_p50": round(summary["torch"]["latency_ms"]["p50"] / max(summary[backend]["latency_ms"]["p50"], 1e-9), 2),
+        "measurements": summary,
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export the models to ONNX")
+    export_parser.add_argument("--output", default=NLU_ONNX_DIR)
+    export_parser.add_argument("--quantize", action="store_true", help="also write int8 model_quantized.onnx")
+
+    parity_parser = commands.add_parser("parity", help="compare a backend with the PyTorch pipelines")
+    parity_parser.add_argument("--backend", choices=[b for b in NLU_BACKENDS if b != "torch"], default="onnx")
+    parity_parser.add_argument("--onnx-dir", default=NLU_ONNX_DIR)
+    parity_parser.add_argument("--texts", help="file with one text per line (default: built-in finance questions)")
+    parity_parser.add_argument("--repeats", type=int, default=5, help="timed passes over the texts")
+    parity_parser.add_argument("--min-sentiment", type=float, default=0.95, help="minimum sentiment agreement")
+    parity_parser.add_argument("--min-entities", type=float, default=0.90, help="minimum entity-set agreement")
+    parity_parser.add_argument("--output", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.output, args.quantize)
+        return
+
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    try:
+        report = parity(args.backend, args.onnx_dir, texts, args.repeats)
+    except (ImportError, RuntimeError, FileNotFoundError) as e:
+        sys.exit(f"❌ {e}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    for name, m in report["measurements"].items():
+        print(f"{name:>10}: load {m['load_seconds']}s, p50 {m['latency_ms']['p50']}ms, "
+              f"p95 {m['latency_ms']['p95']}ms, peak RSS {m['peak_rss_mb']} MB")
+    print(f"📊 sentiment agreement {report['sentiment_agreement']:.1%}, "
+          f"entity agreement {report['entity_agreement']:.1%}, p50 speedup {report['speedup_p50']}x")
+    for mismatch in report["mismatches"][:10]:
+        print(f"  ≠ {mismatch['text']!r}: torch={mismatch['torch']} {args.backend}={mismatch[args.backend]}")
+
+    if report["sentiment_agreement"] < args.min_sentiment or report["entity_agreement"] < args.min_entities:
+        print("❌ Parity below threshold")
+        sys.exit(1)
+    print("✅ Parity OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import json
+import socket
+import struct
+import asyncio
+import logging
+from nlu_engine import NLUResultCache, NEUTRAL_RESULT
+
+# =========================
+# 🔹 NLU Server Settings
+# =========================
+# "unix:/tmp/finbot-nlu.sock" or "tcp:127.0.0.1:8765"; empty = load the models in-process
+NLU_SERVER_ADDRESS = os.getenv("NLU_SERVER_ADDRESS", "")
+NLU_SERVER_TIMEOUT = float(os.getenv("NLU_SERVER_TIMEOUT", "10"))
+NLU_SERVER_POOL = int(os.getenv("NLU_SERVER_POOL", "8"))
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by a JSON body
+_HEADER = struct.Struct("!I")
+
+
+def parse_address(address: str) -> tuple:
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return "unix", rest
+    if kind == "tcp" and rest:
+        host, _, port = rest.rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Invalid NLU server address '{address}'; use unix:/path or tcp:host:port")
+
+
+def encode_frame(message: dict) -> bytes:
+    body = json.dumps(message).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(size))
+
+
+async def open_connection(address: str):
+    kind, target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+async def start_server(handler, address: str):
+    kind, target = parse_address(address)
+    if kind == "unix":
+        if os.path.exists(target):
+            os.unlink(target)  # stale socket from a previous run
+        return await asyncio.start_unix_server(handler, target)
+    return await asyncio.start_server(handler, *target)
+
+
+def _blocking_request(address: str, message: dict, timeout: float) -> dict:
+    kind, target = parse_address(address)
+    family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall(encode_frame(message))
+        reader = sock.makefile("rb")
+        header = reader.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ConnectionError("NLU server closed the connection before replying")
+        (size,) = _HEADER.unpack(header)
+        body = reader.read(size)
+        if len(body) < size:
+            raise ConnectionError("NLU server closed the connection mid-reply")
+        return json.loads(body)
+
+
+class RemoteNLUEngine:
+    """
+    Drop-in stand-in for NLUEngine that forwards texts to the shared inference process
+    (nlu_server.py), so N API workers share one copy of the model weights. Each worker
+    keeps its own result memo; the server micro-batches across all workers.
+    """
+
+    def __init__(self, address: str = NLU_SERVER_ADDRESS, pool_size: int = NLU_SERVER_POOL,
+                 timeout: float = NLU_SERVER_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.memo = NLUResultCache()
+        self._idle = []
+        self._slots = None
+        self._server_loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._server_loaded
+
+    def load(self):
+        """
+        Check that the server is up (blocking), for parity with NLUEngine.load.
+        """
+        reply = _blocking_request(self.address, {"op": "ping"}, self.timeout)
+        self._server_loaded = bool(reply.get("loaded"))
+
+    def analyze_batch(self, texts: list) -> list:
+        """
+        Blocking batch analysis; async callers should use `analyze`.
+        """
+        results = [self.memo.get(text) for text in texts]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            try:
+                reply = _blocking_request(self.address, {"op": "analyze", "texts": [texts[i] for i in pending]},
+                                          self.timeout)
+                computed = reply["results"]
+                fallback = set(reply.get("fallback", ()))
+            except (OSError, KeyError, ValueError) as e:
+                logger.error(f"❌ NLU server request failed: {e}")
+                computed = [None] * len(pending)
+                fallback = set()
+            for n, (i, result) in enumerate(zip(pending, computed)):
+                if result is None:
+                    results[i] = {**NEUTRAL_RESULT, "entities": [], "keywords": []}
+                else:
+                    if n not in fallback:
+                        self.memo.set(texts[i], result)
+                    results[i] = result
+        return results
+
+    async def start(self):
+        try:
+            reply = await self._request({"op": "ping"})
+            self._server_loaded = bool(reply.get("loaded"))
+            logger.info(f"🔌 Using shared NLU server at {self.address} (models loaded: {self._server_loaded})")
+        except Exception as e:
+            logger.error(f"❌ NLU server at {self.address} is unreachable: {e}")
+
+    async def stop(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _request(self, message: dict) -> dict:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            reader, writer = self._idle.pop() if self._idle else await open_connection(self.address)
+            try:
+                writer.write(encode_frame(message))
+                await writer.drain()
+                reply = await asyncio.wait_for(read_frame(reader), self.timeout)
+            except BaseException:
+                # Never reuse a connection that may hold half a reply
+                writer.close()
+                raise
+            self._idle.append((reader, writer))
+            return reply
+
+    async def analyze(self, text: str) -> dict:
+        cached = self.memo.get(text)
+        if cached is not None:
+            return cached
+        try:
+            reply = await self._request({"op": "analyze", "texts": [text]})
+            result = reply["results"][0]
+        except Exception as e:
+            logger.error(f"❌ NLU server request failed: {e}")
+            return {**NEUTRAL_RESULT, "entities": [], "keywords": []}
+        # The server's neutral fallback (models not loaded) must not outlive its recovery
+        if not reply.get("fallback"):
+            self.memo.set(text, result)
+        return result
@@ -0,0 +1,267 @@
+import os
+import re
+import logging
+from metrics import nlu_paths
+from nlu_engine import NLUResultCache
+
+# =========================
+# 🔹 Fast-Path Settings
+# =========================
+# Below this confidence the hybrid mode asks the transformer models instead
+NLU_HYBRID_MIN_CONFIDENCE = float(os.getenv("NLU_HYBRID_MIN_CONFIDENCE", "0.6"))
+# Longer texts carry more nuance than a lexicon can score
+NLU_FAST_MAX_WORDS = int(os.getenv("NLU_FAST_MAX_WORDS", "40"))
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# 🔹 Lexicons
+# =========================
+INSTITUTIONS = [
+    "Bank of America", "Wells Fargo", "JPMorgan Chase", "JPMorgan", "Chase", "Citibank", "Citi", "Capital One",
+    "US Bank", "U.S. Bank", "PNC", "TD Bank", "HSBC", "Barclays", "Santander", "Goldman Sachs", "Morgan Stanley",
+    "Ally", "Marcus", "SoFi", "Discover", "American Express", "Amex", "Visa", "Mastercard", "PayPal", "Venmo",
+    "Zelle", "Cash App", "Revolut", "Monzo", "Chime", "Vanguard", "Fidelity", "Charles Schwab", "Schwab",
+    "Robinhood", "E*TRADE", "Coinbase", "Sallie Mae", "Navient", "Experian", "Equifax", "TransUnion", "IRS",
+    "Social Security", "Medicare", "Medicaid", "HDFC", "ICICI", "SBI",
+]
+FINANCE_TERMS = [
+    "401(k)", "401k", "403(b)", "roth ira", "ira", "hsa", "fsa", "credit card", "credit score", "credit report",
+    "credit history", "credit", "debt", "student loan", "car loan", "personal loan", "mortgage", "loan", "refinance",
+    "interest rate", "apr", "apy", "rent", "budget", "budgeting", "savings account", "savings", "emergency fund",
+    "down payment", "index funds", "index fund", "etf", "mutual fund", "stocks", "stock", "bonds", "crypto",
+    "bitcoin", "dividends", "portfolio", "retirement", "pension", "invest", "investing", "investment", "taxes",
+    "tax", "tax return", "insurance", "salary", "paycheck", "income", "expenses", "subscription", "overdraft",
+    "late fee", "fees", "bills", "net worth", "inflation", "annuity", "bankruptcy",
+]
+POSITIVE_WORDS = {
+    "good": 1.0, "great": 1.5, "happy": 1.5, "glad": 1.0, "excited": 1.5, "love": 1.5, "awesome": 1.5,
+    "excellent": 1.5, "proud": 1.5, "relieved": 1.5, "thrilled": 2.0, "grateful": 1.5, "amazing": 1.5,
+    "confident": 1.0, "comfortable": 1.0, "finally": 0.5, "best": 1.0, "better": 0.5, "improved": 1.0,
+    "raise": 1.0, "bonus": 1.0, "promoted": 1.5, "promotion": 1.0, "profit": 1.0, "win": 1.0, "won": 1.0,
+    "nice": 1.0, "thanks": 0.5, "thank": 0.5, "helpful": 1.0, "easy": 0.5, "optimistic": 1.5,
+}
+NEGATIVE_WORDS = {
+    "bad": 1.0, "terrible": 2.0, "awful": 2.0, "worst": 2.0, "worse": 1.0, "hate": 1.5, "stressed": 1.5,
+    "stress": 1.0, "stressful": 1.5, "worried": 1.5, "worry": 1.0, "anxious": 1.5, "afraid": 1.5,
+    "scared": 1.5, "nervous": 1.0, "panic": 2.0, "overwhelmed": 1.5, "broke": 1.5, "struggling": 1.5,
+    "struggle": 1.0, "furious": 2.0, "angry": 1.5, "upset": 1.5, "frustrated": 1.5, "annoyed": 1.0, "sad": 1.5,
+    "lost": 1.0, "losing": 1.0, "loss": 1.0, "dropped": 1.0, "crashed": 1.5, "failed": 1.5, "behind": 0.5,
+    "unfair": 1.5, "penalty": 1.0, "bankrupt": 2.0, "evicted": 2.0, "fired": 1.5, "unemployed": 1.5,
+    "regret": 1.5, "hopeless": 2.0, "denied": 1.5, "rejected": 1.5, "scam": 2.0, "scammed": 2.0, "ripped": 1.0,
+    "expensive": 0.5, "desperate": 2.0, "confused": 1.0, "drowning": 2.0,
+}
+# Multi-word phrases scored before single words; negation does not apply to them
+SENTIMENT_PHRASES = {
+    "paid off": 1.0, "laid off": -2.0, "late fee": -1.0, "can't afford": -1.5,
+    "cannot afford": -1.5, "can not afford": -1.5, "fall behind": -1.5, "falling behind": -1.5,
+    "ripped off": -2.0, "paycheck to paycheck": -1.5, "in the red": -1.0,
+}
+NEGATORS = {"not", "no", "never", "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "won't",
+            "can't", "cannot", "hardly", "without", "nor"}
+INTENSIFIERS = {"very": 1.5, "really": 1.5, "so": 1.3, "extremely": 2.0, "super": 1.5, "totally": 1.5,
+                "incredibly": 2.0, "completely": 1.5}
+CONTRASTS = {"but", "however", "although", "though", "yet", "except"}
+# Capitalized words that are not named entities when they start a clause
+COMMON_CAPITALIZED = {"I", "I'm", "I've", "I'll", "I'd", "My", "Should", "Can", "Is", "How", "What", "When",
+                      "Where", "Why", "Which", "Who", "Do", "Does", "Will", "Would", "Could", "The", "A", "An"}
+
+MONTHS = ("January|February|March|April|June|July|August|September|October|November|December|"
+          "Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec")
+WEEKDAYS = "Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday"
+NUMBER_WORDS = "one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|a few|several|\\d+"
+
+# =========================
+# 🔹 Compiled Patterns
+# =========================
+_ENTITY_PATTERNS = [
+    # $1,200.50  €300  £2k  $1.5 million  ₹50,000
+    re.compile(r"[$€£¥₹]\s?\d+(?:,\d{3})*(?:\.\d+)?(?:\s?(?:k|K|m|M|bn|million|billion|thousand)\b)?"),
+    re.compile(r"\b\d+(?:,\d{3})*(?:\.\d+)?\s?(?:dollars|usd|USD|euros|EUR|pounds|GBP|rupees|INR)\b"),
+    re.compile(r"\b\d+(?:\.\d+)?\s?(?:%|percent\b)"),
+    re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b"),
+    # "December", "Dec 15", "May 2027" (bare "May" is too often the verb)
+    re.compile(rf"\b(?:{MONTHS})\b(?:\s\d{{1,2}}(?:st|nd|rd|th)?)?(?:,?\s\d{{4}})?"
+               r"|\bMay\s(?:\d{1,2}(?:st|nd|rd|th)?|\d{4})\b"),
+    re.compile(rf"\b(?:{WEEKDAYS})\b"),
+    re.compile(r"\b(?:19|20)\d{2}\b"),
+    re.compile(rf"\b(?:{NUMBER_WORDS})\s(?:days?|weeks?|months?|years?)\b", re.IGNORECASE),
+    re.compile(r"\b(?:next|this|last)\s(?:week|month|year|spring|summer|fall|autumn|winter|quarter)\b",
+               re.IGNORECASE),
+    # Longest names first so "Bank of America" wins over shorter overlaps
+    re.compile(r"(?<![\w*])(?:" + "|".join(re.escape(name) for name in sorted(INSTITUTIONS, key=len, reverse=True))
+               + r")(?![\w*])"),
+]
+_TERMS = re.compile(r"(?<!\w)(?:" + "|".join(re.escape(term) for term in sorted(FINANCE_TERMS, key=len, reverse=True))
+                    + r")(?!\w)", re.IGNORECASE)
+_PHRASES = re.compile("|".join(re.escape(phrase) for phrase in sorted(SENTIMENT_PHRASES, key=len, reverse=True)))
+_WORDS = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_CAPITALIZED = re.compile(r"\b[A-Z][A-Za-z&'.-]*")
+
+
+def _entities(text: str) -> tuple:
+    """
+    Money, percentages, dates and institutions in text order, plus the spans they cover.
+    """
+    found = []
+    for pattern in _ENTITY_PATTERNS:
+        found.extend((m.start(), m.end(), m.group().strip()) for m in pattern.finditer(text))
+    found.sort(key=lambda f: (f[0], -f[1]))
+    entities, spans, covered_to = [], [], -1
+    for start, end, value in found:
+        # Drop matches inside a longer one ("2027" inside "May 2027")
+        if start < covered_to:
+            continue
+        entities.append(value)
+        spans.append((start, end))
+        covered_to = end
+    return entities, spans
+
+
+def _unknown_names(text: str, spans: list) -> list:
+    """
+    Mid-sentence capitalized words the lexicons do not know, e.g. people and places.
+    """
+    names = []
+    for match in _CAPITALIZED.finditer(text):
+        word = match.group().rstrip(".'")
+        if word in COMMON_CAPITALIZED or any(start <= match.start() < end for start, end in spans):
+            continue
+        before = text[:match.start()].rstrip()
+        if not before or before[-1] in '.!?:"(':
+            continue  # sentence-initial capital
+        names.append(word)
+    return names
+
+
+def _sentiment(lowered: str) -> tuple:
+    """
+    Lexicon score with negation and intensifiers; returns (score, positive hits, negative hits, negated).
+    """
+    score = 0.0
+    positive = negative = 0
+    for match in _PHRASES.finditer(lowered):
+        weight = SENTIMENT_PHRASES[match.group()]
+        score += weight
+        positive += weight > 0
+        negative += weight < 0
+    tokens = _WORDS.findall(_PHRASES.sub(" ", lowered))
+    negated = False
+    for i, token in enumerate(tokens):
+        weight = POSITIVE_WORDS.get(token) or -NEGATIVE_WORDS.get(token, 0.0)
+        if not weight:
+            continue
+        window = tokens[max(0, i - 3):i]
+        if any(word in NEGATORS for word in window):
+            weight = -weight
+            negated = True
+        if i and tokens[i - 1] in INTENSIFIERS:
+            weight *= INTENSIFIERS[tokens[i - 1]]
+        score += weight
+        positive += weight > 0
+        negative += weight < 0
+    return score, positive, negative, negated
+
+
+def analyze_rules(text: str) -> tuple:
+    """
+    Regex/lexicon NLU in microseconds. Returns ({sentiment, entities, keywords}, confidence)
+    where confidence in [0, 1] says how far the result can be trusted without the models.
+    """
+    lowered = text.lower()
+    entities, spans = _entities(text)
+    score, positive, negative, negated = _sentiment(lowered)
+    sentiment = "positive" if score > 0 else "negative" if score < 0 else "neutral"
+
+    term_matches = list(_TERMS.finditer(text))
+    # Keep the user's spelling ("APY", "Roth IRA") but only once per term
+    terms = {}
+    for match in term_matches:
+        terms.setdefault(match.group().lower(), match.group())
+    keywords = list(dict.fromkeys(list(terms.values()) + entities))[:5]
+
+    confidence = 1.0
+    words = lowered.split()
+    if positive and negative:
+        confidence = min(confidence, 0.3)  # mixed feelings
+    if (positive or negative) and CONTRASTS.intersection(words):
+        confidence = min(confidence, 0.5)  # "good salary but drowning in debt"
+    if negated:
+        confidence = min(confidence, 0.7)
+    if _unknown_names(text, spans + [m.span() for m in term_matches]):
+        confidence = min(confidence, 0.5)  # people/places only NER finds
+    if len(words) > NLU_FAST_MAX_WORDS:
+        confidence = min(confidence, 0.5)
+    return {"sentiment": sentiment, "entities": entities, "keywords": keywords}, confidence
+
+
+def _merge(model_result: dict, rules_result: dict) -> dict:
+    """
+    Model sentiment and names, plus the amounts/dates/terms the NER model does not tag.
+    """
+    entities = list(dict.fromkeys(model_result["entities"] + rules_result["entities"]))
+    keywords = list(dict.fromkeys(rules_result["keywords"] + model_result["keywords"]))[:5]
+    # The models only say positive/negative; neutral means they failed and fell back
+    sentiment = model_result["sentiment"] if model_result["sentiment"] != "neutral" else rules_result["sentiment"]
+    return {"sentiment": sentiment, "entities": entities, "keywords": keywords}
+
+
+class FastPathNLUEngine:
+    """
+    NLU engine front that answers from the rule matcher first.
+
+    In "rules" mode the transformer models are never loaded. In "hybrid" mode a text
+    whose rule confidence is below `min_confidence` is escalated to `model_engine`
+    (in-process or the shared NLU server) and the two results are merged.
+    """
+
+    def __init__(self, model_engine=None, min_confidence: float = NLU_HYBRID_MIN_CONFIDENCE):
+        self.model_engine = model_engine
+        self.min_confidence = min_confidence
+        self.mode = "hybrid" if model_engine is not None else "rules"
+        # Rule results are cheaper to recompute than to memoize
+        self._memo = NLUResultCache(max_entries=0)
+
+    @property
+    def memo(self) -> NLUResultCache:
+        return self.model_engine.memo if self.model_engine is not None else self._memo
+
+    @property
+    def loaded(self) -> bool:
+        return self.model_engine.loaded if self.model_engine is not None else True
+
+    def load(self):
+        if self.model_engine is not None:
+            self.model_engine.load()
+
+    async def start(self):
+        logger.info(f"⚡ Rule-based NLU fast path enabled (mode={self.mode}, min_confidence={self.min_confidence})")
+        if self.model_engine is not None:
+            await self.model_engine.start()
+
+    async def stop(self):
+        if self.model_engine is not None:
+            await self.model_engine.stop()
+
+    def _escalate(self, confidence: float) -> bool:
+        return self.model_engine is not None and confidence < self.min_confidence
+
+    def analyze_batch(self, texts: list) -> list:
+        ruled = [analyze_rules(text) for text in texts]
+        results = [result for result, _ in ruled]
+        pending = [i for i, (_, confidence) in enumerate(ruled) if self._escalate(confidence)]
+        if pending:
+            computed = self.model_engine.analyze_batch([texts[i] for i in pending])
+            for i, model_result in zip(pending, computed):
+                results[i] = _merge(model_result, results[i])
+        nlu_paths.inc("rules", amount=len(texts) - len(pending))
+        nlu_paths.inc("model", amount=len(pending))
+        return results
+
+    async def analyze(self, text: str) -> dict:
+        result, confidence = analyze_rules(text)
+        if not self._escalate(confidence):
+            nlu_paths.inc("rules")
+            return result
+        nlu_paths.inc("model")
+        return _merge(await self.model_engine.analyze(text), result)
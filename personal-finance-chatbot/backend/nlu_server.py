@@ -0,0 +1,76 @@
+"""
+Dedicated NLU inference process shared by all API workers.
+
+Loads the sentiment and NER pipelines once and answers analyze requests from any
+number of workers over a local socket. Requests from different workers land in the
+same micro-batches.
+
+    python nlu_server.py --address unix:/tmp/finbot-nlu.sock
+"""
+import asyncio
+import logging
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from nlu_engine import NLUEngine
+from nlu_remote import NLU_SERVER_ADDRESS, start_server, read_frame, encode_frame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "unix:/tmp/finbot-nlu.sock"
+
+
+async def serve(address: str):
+    # Always the in-process engine here, whatever NLU_SERVER_ADDRESS says
+    engine = NLUEngine()
+    await engine.start()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    message = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    return
+                op = message.get("op")
+                if op == "ping":
+                    reply = {"ok": True, "loaded": engine.loaded}
+                elif op == "analyze":
+                    texts = message.get("texts") or []
+                    analyzed = await asyncio.gather(*(engine.analyze_with_status(t) for t in texts))
+                    # Indices of neutral fallbacks, which clients must not memoize
+                    reply = {"results": [result for result, _ in analyzed],
+                             "fallback": [i for i, (_, fallback) in enumerate(analyzed) if fallback]}
+                elif op == "stats":
+                    reply = {"memo": engine.memo.stats(), "loaded": engine.loaded, "backend": engine.backend}
+                else:
+                    reply = {"error": f"unknown op {op!r}"}
+                writer.write(encode_frame(reply))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await start_server(handle, address)
+    logger.info(f"🧠 NLU server listening on {address}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=NLU_SERVER_ADDRESS or DEFAULT_ADDRESS,
+                        help="unix:/path/to.sock or tcp:host:port")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.address))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,291 @@
-import os
-import requests
-import logging
-from transformers import pipeline
-from dotenv import load_dotenv
-
-# =========================
-# 🔹 Load Environment Variables
-# =========================
-load_dotenv()  # Ensure .env variables are loaded
-
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "gpt-4o-mini")
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
-OPENROUTER_TIMEOUT = int(os.getenv("OPENROUTER_TIMEOUT", "30"))  # Default 30 seconds timeout
-
-# =========================
-# 🔹 Logging Setup
-# =========================
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-if OPENROUTER_API_KEY:
-    logger.info(f"✅ OPENROUTER_API_KEY loaded successfully: {OPENROUTER_API_KEY[:8]}...")
-else:
-    logger.error("❌ OPENROUTER_API_KEY is NOT set. Check your .env file.")
-
-# =========================
-# 🔹 Lazy Pipeline Initialization
-# =========================
-_sentiment_analyzer = None
-_ner_tagger = None
-
-
-def analyze_nlu(text: str):
-    """
-    Perform sentiment analysis and named entity recognition (NER) on the given text.
-    Returns sentiment, entities, and keywords.
-    """
-    global _sentiment_analyzer, _ner_tagger
-
-    try:
-        # Initialize sentiment analyzer if not already loaded
-        if _sentiment_analyzer is None:
-            logger.info("Loading sentiment analysis model...")
-            _sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english"
-            )
-
-        # Initialize NER tagger if not already loaded
-        if _ner_tagger is None:
-            logger.info("Loading NER model...")
-            _ner_tagger = pipeline(
-                "ner",
-                model="dslim/bert-base-NER",
-                aggregation_strategy="simple"
-            )
-
-        sentiment_result = _sentiment_analyzer(text)[0]
-        sentiment = sentiment_result['label'].lower()
-
-        ner_results = _ner_tagger(text)
-        entities = [ent['word'] for ent in ner_results]
-
-        keywords = list(set(entities))[:5]
-
-        return {
-            "sentiment": sentiment,
-            "entities": entities,
-            "keywords": keywords
-        }
-
-    except Exception as e:
-        logger.error(f"❌ NLU analysis failed: {e}")
-        return {
-            "sentiment": "neutral",
-            "entities": [],
-            "keywords": []
-        }
-
-
-def generate_response(messages):
-    """
-    Send messages to OpenRouter API and return the model's response.
-    """
-    if not OPENROUTER_API_KEY:
-        error_msg = "❌ OPENROUTER_API_KEY is not set in environment variables"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": OPENROUTER_MODEL,
-        "messages": messages,
-        "max_tokens": 1000,
-        "temperature": 0.7,
-        "top_p": 0.95,
-        "n": 1,
-        "stream": False
-    }
-
-    try:
-        logger.info(f"📡 Sending request to OpenRouter model: {OPENROUTER_MODEL}")
-        response = requests.post(
-            OPENROUTER_API_URL, json=payload, headers=headers, timeout=OPENROUTER_TIMEOUT
-        )
-        response.raise_for_status()
-        data = response.json()
-        reply = data['choices'][0]['message']['content']
-        logger.info("✅ Response received from OpenRouter")
-        return reply
-
-    except requests.exceptions.Timeout:
-        logger.error("⏳ Request to OpenRouter API timed out.")
-        raise
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"🌐 Connection error: {e}")
-        raise
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"❌ HTTP error: {e} - Response: {response.text}")
-        raise
-    except Exception as e:
-        logger.error(f"⚠️ Unexpected error: {e}")
-        raise
+import os
+import time
+import httpx
+import logging
+from dotenv import load_dotenv
+from http_client import get_client
+from streaming import iter_completion_deltas
+from nlu_engine import nlu_engine
+from cache import completion_cache, make_cache_key
+from singleflight import SingleFlight
+from resilience import (
+    call_with_retries, stream_with_retries, CircuitOpenError, DeadlineExceededError, RETRY_MAX_ATTEMPTS
+)
+from model_router import model_router
+from admission import upstream_admission, AdmissionRejectedError, PRIORITY_INTERACTIVE, PRIORITY_INSIGHT
+from prompt_compiler import output_budget, count_tokens, OUTPUT_TOKENS_CEILING
+from metrics import timed, observe_stage, record_usage
+from features import is_enabled
+
+# =========================
+# 🔹 Load Environment Variables
+# =========================
+load_dotenv()  # Ensure .env variables are loaded
+
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "gpt-4o-mini")
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_TIMEOUT = int(os.getenv("OPENROUTER_TIMEOUT", "30"))  # Default 30 seconds timeout
+OPENROUTER_MAX_TOKENS = OUTPUT_TOKENS_CEILING  # per route/persona caps adapt below this
+# Send response_format=json_object for structured replies; turn off for models that reject it
+OPENROUTER_JSON_MODE = os.getenv("OPENROUTER_JSON_MODE", "true").lower() == "true"
+
+# =========================
+# 🔹 Logging Setup
+# =========================
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if OPENROUTER_API_KEY:
+    logger.info(f"✅ OPENROUTER_API_KEY loaded successfully: {OPENROUTER_API_KEY[:8]}...")
+else:
+    logger.error("❌ OPENROUTER_API_KEY is NOT set. Check your .env file.")
+
+# Identical concurrent completions share one upstream call
+inflight_completions = SingleFlight()
+
+
+def _cache():
+    return completion_cache if is_enabled("cache") else None
+
+
+def analyze_nlu(text: str):
+    """
+    Perform sentiment analysis and named entity recognition (NER) on the given text.
+    Returns sentiment, entities, and keywords.
+
+    Blocking; async callers should use `nlu_engine.analyze` to join a micro-batch.
+    """
+    return nlu_engine.analyze_batch([text])[0]
+
+
+def _build_request(messages, stream: bool = False, model: str = OPENROUTER_MODEL,
+                   max_tokens: int = OPENROUTER_MAX_TOKENS, json_mode: bool = False):
+    """
+    Build the headers and payload for an OpenRouter chat completion.
+    """
+    if not OPENROUTER_API_KEY:
+        error_msg = "❌ OPENROUTER_API_KEY is not set in environment variables"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "n": 1,
+        "stream": stream
+    }
+    if json_mode and OPENROUTER_JSON_MODE:
+        payload["response_format"] = {"type": "json_object"}
+    return headers, payload
+
+
+def _reserve_tokens(messages, max_tokens: int = OPENROUTER_MAX_TOKENS) -> int:
+    # Prompt estimate plus the full completion allowance; the surplus is refunded from `usage`
+    return sum(count_tokens(m["content"]) for m in messages) + max_tokens
+
+
+def _default_priority(route: str) -> int:
+    return PRIORITY_INTERACTIVE if route == "chat" else PRIORITY_INSIGHT
+
+
+def _attempts_per_model(route: str) -> int:
+    # With fallbacks configured, move on to the next model rather than retrying the same one
+    return RETRY_MAX_ATTEMPTS if len(model_router.candidates(route)) == 1 else 1
+
+
+def _budget_route(route: str, json_mode: bool = False) -> str:
+    # JSON replies are much shorter than prose, so their caps are learned separately
+    return f"{route}.json" if json_mode else route
+
+
+async def _post_completion(messages, route: str = "chat", cache_key: str = None, priority: int = None,
+                           persona: str = None, json_mode: bool = False, max_tokens: int = None,
+                           validate=None):
+    """
+    Perform one admitted, routed completion call and store the reply in the cache
+    (only if `validate`, when given, accepts it).
+    """
+    budget_route = _budget_route(route, json_mode)
+    if max_tokens is None:
+        max_tokens = output_budget.max_tokens(budget_route, persona)
+
+    async def call(model: str, remaining: float):
+        headers, payload = _build_request(messages, model=model, max_tokens=max_tokens, json_mode=json_mode)
+
+        async def send():
+            response = await get_client().post(OPENROUTER_API_URL, json=payload, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        logger.info(f"📡 Sending request to OpenRouter model: {model}")
+        return await call_with_retries(send, model_router.breaker(model), deadline=remaining,
+                                       max_attempts=_attempts_per_model(route))
+
+    reserved = _reserve_tokens(messages, max_tokens)
+    # Tokens to keep charged against the TPM budget; a call that fails consumed none
+    used = 0
+    admitted = False
+    try:
+        waited = await upstream_admission.acquire(reserved, _default_priority(route) if priority is None else priority)
+        admitted = True
+        observe_stage("queue_wait", waited)
+        with timed("upstream"):
+            data = await model_router.complete(route, call)
+        usage = data.get("usage") or {}
+        record_usage(data.get("model") or model_router.primary(route), usage)
+        choice = data['choices'][0]
+        reply = choice['message']['content']
+        completion_tokens = usage.get("completion_tokens") or count_tokens(reply)
+        used = usage.get("total_tokens") or reserved - max_tokens + completion_tokens
+        output_budget.record(budget_route, persona, completion_tokens,
+                             truncated=choice.get("finish_reason") == "length")
+        logger.info("✅ Response received from OpenRouter")
+        if cache_key is not None and _cache() is not None and _accepts(validate, reply):
+            await _cache().set(cache_key, reply)
+        return reply
+
+    except (CircuitOpenError, AdmissionRejectedError) as e:
+        logger.error(f"🔴 {e}")
+        raise
+    except (httpx.TimeoutException, DeadlineExceededError):
+        logger.error("⏳ Request to OpenRouter API timed out.")
+        raise
+    except httpx.TransportError as e:
+        logger.error(f"🌐 Connection error: {e}")
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error(f"❌ HTTP error: {e} - Response: {e.response.text}")
+        raise
+    except Exception as e:
+        logger.error(f"⚠️ Unexpected error: {e}")
+        raise
+    finally:
+        if admitted:
+            upstream_admission.release(reserved, used)
+
+
+def _accepts(validate, reply: str) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(reply)
+        return True
+    except ValueError:
+        return False
+
+
+async def generate_response(messages, use_cache: bool = True, route: str = "chat", priority: int = None,
+                            persona: str = None, json_mode: bool = False, validate=None):
+    """
+    Send messages to OpenRouter API and return the model's response.
+    Uses the shared pooled AsyncClient so the event loop is never blocked.
+
+    `route` ("chat", "budget" or "spending") selects the model list; the model router
+    falls back to the next model when one fails or its circuit is open. Upstream calls are
+    admitted by rate limit and `priority` (chat first, then insights, then batch work).
+    `max_tokens` follows the answer lengths seen for this route and `persona`.
+    `json_mode` asks the model for a JSON object (see structured.py).
+
+    With `use_cache` (the default) identical requests are served from the completion
+    cache, and concurrent identical requests share a single upstream call. Pass
+    `use_cache=False` for a fresh, independent sample. `validate(reply)` raising ValueError
+    keeps a reply out of the cache, so an unusable reply is sampled again next time.
+    """
+    if not use_cache:
+        return await _post_completion(messages, route, priority=priority, persona=persona, json_mode=json_mode)
+
+    # Keyed on the route's primary model, so a fallback reply is reused until the primary recovers.
+    # The key includes the cap actually sent: a reply cut at a smaller cap is not served for a larger one.
+    max_tokens = output_budget.max_tokens(_budget_route(route, json_mode), persona)
+    _, payload = _build_request(messages, model=model_router.primary(route), max_tokens=max_tokens,
+                                json_mode=json_mode)
+    cache_key = make_cache_key(payload)
+    if _cache() is not None:
+        cached = await _cache().get(cache_key)
+        if cached is not None:
+            logger.info("🗄️ Completion cache hit")
+            return cached
+
+    return await inflight_completions.do(
+        cache_key,
+        lambda: _post_completion(messages, route, cache_key, priority, persona, json_mode, max_tokens, validate)
+    )
+
+
+def stream_response(messages, use_cache: bool = True, route: str = "chat", priority: int = None,
+                    persona: str = None):
+    """
+    Stream the model's response from OpenRouter, yielding text chunks as they arrive.
+    A cached completion is replayed as a single chunk; a fresh one is cached once complete.
+
+    Raises AdmissionRejectedError right away, before any chunk, if the upstream queue is full.
+    """
+    priority = _default_priority(route) if priority is None else priority
+    upstream_admission.check(priority)
+    return _stream_response(messages, use_cache, route, priority, persona)
+
+
+async def _stream_response(messages, use_cache: bool, route: str, priority: int, persona: str):
+    max_tokens = output_budget.max_tokens(route, persona)
+    _, payload = _build_request(messages, stream=True, model=model_router.primary(route), max_tokens=max_tokens)
+
+    cache_key = None
+    if use_cache and _cache() is not None:
+        cache_key = make_cache_key(payload)
+        cached = await _cache().get(cache_key)
+        if cached is not None:
+            logger.info("🗄️ Completion cache hit")
+            yield cached
+            return
+
+    outcome = {}
+
+    def open_stream(model: str):
+        headers, payload = _build_request(messages, stream=True, model=model, max_tokens=max_tokens)
+        logger.info(f"📡 Streaming request to OpenRouter model: {model}")
+        return stream_with_retries(
+            lambda: iter_completion_deltas(OPENROUTER_API_URL, headers, payload, outcome),
+            model_router.breaker(model), max_attempts=_attempts_per_model(route),
+        )
+
+    reserved = _reserve_tokens(messages, max_tokens)
+    chunks = []
+    admitted = failed = False
+    try:
+        observe_stage("queue_wait", await upstream_admission.acquire(reserved, priority))
+        admitted = True
+        started = time.perf_counter()
+        upstream = model_router.stream(route, open_stream)
+        async for delta in upstream:
+            if not chunks:
+                observe_stage("ttft", time.perf_counter() - started)
+            chunks.append(delta)
+            yield delta
+        observe_stage("upstream", time.perf_counter() - started)
+        reply = "".join(chunks)
+        output_budget.record(route, persona, count_tokens(reply), truncated=outcome.get("finish_reason") == "length")
+        logger.info("✅ Stream completed from OpenRouter")
+        if cache_key is not None:
+            await _cache().set(cache_key, reply)
+    except httpx.HTTPStatusError as e:
+        failed = True
+        logger.error(f"❌ HTTP error while streaming: {e} - Response: {e.response.text}")
+        raise
+    except Exception as e:
+        failed = True
+        logger.error(f"⚠️ Streaming error: {e}")
+        raise
+    finally:
+        # Charge the prompt plus what was produced, even if the stream broke or the client left
+        # part way; only a stream that failed before any output is refunded in full
+        if admitted:
+            used = 0 if failed and not chunks else reserved - max_tokens + count_tokens("".join(chunks))
+            upstream_admission.release(reserved, used)
@@ -0,0 +1,370 @@
+import os
+import math
+import logging
+import threading
+from string import Formatter
+from collections import deque, namedtuple
+from metrics import registry, Histogram
+
+# =========================
+# 🔹 Prompt Budget Settings
+# =========================
+# heuristic = ~4 characters per token; tiktoken = local BPE tokenizer (pip install tiktoken)
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "heuristic").lower()
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "o200k_base")
+# Input budgets in tokens; long expense/goal lists are rolled up into "Other" to fit
+PROMPT_INPUT_BUDGETS = {
+    "chat": int(os.getenv("PROMPT_BUDGET_CHAT", "600")),
+    "budget": int(os.getenv("PROMPT_BUDGET_BUDGET", "500")),
+    "spending": int(os.getenv("PROMPT_BUDGET_SPENDING", "700")),
+}
+PROMPT_MAX_LIST_ITEMS = int(os.getenv("PROMPT_MAX_LIST_ITEMS", "12"))
+# Output caps: max_tokens per route and persona follows the observed answer lengths
+OUTPUT_TOKENS_CEILING = int(os.getenv("OPENROUTER_MAX_TOKENS", "1000"))
+OUTPUT_TOKENS_FLOOR = int(os.getenv("OUTPUT_TOKENS_FLOOR", "192"))
+OUTPUT_TOKENS_HEADROOM = float(os.getenv("OUTPUT_TOKENS_HEADROOM", "1.3"))
+OUTPUT_TOKENS_WINDOW = int(os.getenv("OUTPUT_TOKENS_WINDOW", "200"))
+OUTPUT_TOKENS_MIN_SAMPLES = int(os.getenv("OUTPUT_TOKENS_MIN_SAMPLES", "20"))
+OUTPUT_TOKENS_STEP = 32  # caps move in steps so they stay stable between requests
+# Caps are learned per persona for these; any other persona value shares the "other" cap
+OUTPUT_TOKENS_PERSONAS = ("student", "professional")
+
+logger = logging.getLogger(__name__)
+
+prompt_tokens = registry.register(Histogram(
+    "finbot_prompt_tokens", "Estimated prompt tokens after compilation.", ("route",),
+    buckets=(50, 100, 200, 300, 400, 500, 700, 1000, 1500, 2000, 4000)))
+
+CompiledPrompt = namedtuple("CompiledPrompt", "text tokens rolled_up")
+
+
+# =========================
+# 🔹 Token Counting
+# =========================
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = False
+                if PROMPT_TOKENIZER == "tiktoken":
+                    try:
+                        import tiktoken
+                        _encoder = tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+                        logger.info(f"🔢 Token counts from tiktoken ({PROMPT_TOKENIZER_ENCODING})")
+                    except Exception as e:
+                        logger.warning(f"⚠️ tiktoken unavailable ({e}); estimating ~4 characters per token")
+    return _encoder or None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+# =========================
+# 🔹 Templates
+# =========================
+class PromptTemplate:
+    """
+    A route's prompt text, parsed once. The literal parts are token-counted on first
+    use, so estimating a prompt only counts the values filled into it.
+    """
+
+    def __init__(self, route: str, text: str):
+        self.route = route
+        self.text = text
+        parsed = list(Formatter().parse(text))
+        self.literal = "".join(literal for literal, _, _, _ in parsed)
+        self.fields = tuple(name for _, name, _, _ in parsed if name)
+        self._literal_tokens = None
+
+    @property
+    def literal_tokens(self) -> int:
+        if self._literal_tokens is None:
+            self._literal_tokens = count_tokens(self.literal)
+        return self._literal_tokens
+
+    def render(self, **values) -> str:
+        return self.text.format_map(values)
+
+    def estimate(self, **values) -> int:
+        return self.literal_tokens + sum(count_tokens(str(values[name])) for name in self.fields)
+
+
+_BUDGET_FACTS = (
+    "You are a personal finance assistant helping a {persona}.\n"
+    "Income: {currency}{income}\n"
+    "Expenses:\n{expenses}\n"
+    "Savings goal: {currency}{savings_goal}\n"
+    "Precomputed figures (exact, do not recalculate):\n"
+    "{breakdown}"
+    "- Savings goal: {goal_status}\n"
+)
+_SPENDING_FACTS = (
+    "You are a personal finance assistant helping a {persona}.\n"
+    "Income: {currency}{income}\n"
+    "Expenses:\n{expenses}\n"
+    "Goals:\n{goals}\n"
+    "Precomputed figures (exact, do not recalculate):\n"
+    "{breakdown}"
+    "{goal_figures}"
+)
+
+TEMPLATES = {
+    "chat": PromptTemplate("chat", (
+        "You are a personal finance assistant. The user is a {persona}.\n"
+        "User 's sentiment: {sentiment}\n"
+        "Keywords: {keywords}\n"
+        "Entities: {entities}\n"
+        "User  question: {question}\n"
+        "Please provide a clear, concise, and helpful financial advice answer."
+    )),
+    "budget": PromptTemplate("budget", _BUDGET_FACTS + (
+        "Please provide a summary of the budget, highlight top spending categories, "
+        "and give actionable advice to improve savings."
+    )),
+    "spending": PromptTemplate("spending", _SPENDING_FACTS + (
+        "Analyze the spending patterns and provide insights on how to achieve the goals, "
+        "including whether current spending allows meeting the goals."
+    )),
+}
+
+# Structured variants: same facts, answered as compact JSON (schemas in structured.py)
+STRUCTURED_TEMPLATES = {
+    "budget": PromptTemplate("budget", _BUDGET_FACTS + (
+        "Reply with only a JSON object in this shape, no other text:\n"
+        '{{"summary": "<one sentence>", '
+        '"top_categories": [{{"name": "<category>", "comment": "<short note>"}}], '
+        '"recommendations": ["<one short action>"], '
+        '"savings_goal": {{"met": <true|false>, "comment": "<short note>"}}}}\n'
+        "List at most 3 top categories and 3 recommendations."
+    )),
+    "spending": PromptTemplate("spending", _SPENDING_FACTS + (
+        "Reply with only a JSON object in this shape, no other text:\n"
+        '{{"summary": "<one sentence>", '
+        '"top_categories": [{{"name": "<category>", "comment": "<short note>"}}], '
+        '"recommendations": ["<one short action>"], '
+        '"goals": [{{"name": "<goal>", "on_track": <true|false>, "comment": "<short note>"}}]}}\n'
+        "List at most 3 top categories and 3 recommendations, and one entry per goal."
+    )),
+}
+
+
+# =========================
+# 🔹 List Roll-up
+# =========================
+class RollupList:
+    """
+    Prompt lines with amounts; the smallest are folded into one summary line on demand.
+
+    Each item may carry lines for several template fields (a goal and its figures), given
+    as `fields` [(name, separator)]; a rolled-up item drops out of all of them and only
+    the first field gets the summary line.
+    """
+
+    def __init__(self, items: list, format_rest, fields: tuple):
+        # items: [(amount, (line per field))] in display order
+        self.items = items
+        self.format_rest = format_rest
+        self.fields = fields
+        self.kept = list(range(len(items)))
+        self.rolled = []
+        self._tokens = [sum(count_tokens(line) + 1 for line in lines) for _, lines in items]
+
+    def __len__(self):
+        return len(self.kept)
+
+    def roll_smallest(self):
+        smallest = min(self.kept, key=lambda i: self.items[i][0])
+        self.kept.remove(smallest)
+        self.rolled.append(smallest)
+
+    def render(self) -> dict:
+        rendered = {}
+        for column, (name, separator) in enumerate(self.fields):
+            lines = [self.items[i][1][column] for i in self.kept]
+            if self.rolled and column == 0:
+                lines.append(self.format_rest(len(self.rolled), round(sum(self.items[i][0] for i in self.rolled), 2)))
+            rendered[name] = separator.join(lines)
+        return rendered
+
+    def tokens(self) -> int:
+        total = sum(self._tokens[i] for i in self.kept)
+        if self.rolled:
+            # The summary line's size barely depends on its numbers
+            total += count_tokens(self.format_rest(len(self.rolled), 0)) + 2
+        return total
+
+
+def _fit(template: PromptTemplate, values: dict, lists: list, budget: int) -> CompiledPrompt:
+    """
+    Roll the smallest list items into "Other" until the prompt fits `budget` tokens
+    (and no list shows more than PROMPT_MAX_LIST_ITEMS items).
+    """
+    fixed = template.literal_tokens + sum(count_tokens(str(values[name])) for name in values)
+    for rollup in lists:
+        while len(rollup) > PROMPT_MAX_LIST_ITEMS:
+            rollup.roll_smallest()
+    while fixed + sum(r.tokens() for r in lists) > budget:
+        # Trim the longest list first; always keep at least one item of each
+        longest = max(lists, key=len)
+        if len(longest) <= 1:
+            break
+        longest.roll_smallest()
+    for rollup in lists:
+        values.update(rollup.render())
+    tokens = fixed + sum(r.tokens() for r in lists)
+    prompt_tokens.observe(tokens, template.route)
+    return CompiledPrompt(template.render(**values), tokens, sum(len(r.rolled) for r in lists))
+
+
+def _expense_list(expenses: dict, currency: str) -> RollupList:
+    # Zero-spend categories carry no information
+    items = [(_amount(amount), (f"- {name}: {currency}{amount}",)) for name, amount in expenses.items()
+             if _amount(amount) != 0]
+    return RollupList(items, lambda n, total: f"- Other ({n} smaller categories): {currency}{total}",
+                      (("expenses", "\n"),))
+
+
+def _amount(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# =========================
+# 🔹 Route Compilers
+# =========================
+def compile_chat_prompt(question: str, nlu_data: dict, persona: str) -> CompiledPrompt:
+    template = TEMPLATES["chat"]
+    budget = PROMPT_INPUT_BUDGETS["chat"]
+    values = {
+        "persona": persona,
+        "sentiment": nlu_data.get("sentiment", "neutral"),
+        "keywords": ", ".join(nlu_data.get("keywords", [])),
+        "entities": ", ".join(nlu_data.get("entities", [])),
+        "question": question,
+    }
+    tokens = template.estimate(**values)
+    if tokens > budget:
+        # The NLU hints are the first thing to go, then the tail of a very long question
+        values.update(keywords="", entities="")
+        tokens = template.estimate(**values)
+        question_tokens = count_tokens(question)
+        if tokens > budget and question_tokens > 1:
+            keep = max(1, question_tokens - (tokens - budget))
+            values["question"] = question[:max(1, len(question) * keep // question_tokens)].rstrip() + "…"
+            tokens = template.estimate(**values)
+    prompt_tokens.observe(tokens, "chat")
+    return CompiledPrompt(template.render(**values), tokens, 0)
+
+
+def _template(route: str, structured: bool) -> PromptTemplate:
+    return (STRUCTURED_TEMPLATES if structured else TEMPLATES)[route]
+
+
+def compile_budget_prompt(budget_data: dict, persona: str, breakdown: str, goal_status: str,
+                          structured: bool = False) -> CompiledPrompt:
+    currency = budget_data.get("currency", "$")
+    values = {
+        "persona": persona,
+        "currency": currency,
+        "income": budget_data.get("income", 0),
+        "savings_goal": budget_data.get("savings_goal", 0),
+        "breakdown": breakdown,
+        "goal_status": goal_status,
+    }
+    lists = [_expense_list(budget_data.get("expenses", {}), currency)]
+    return _fit(_template("budget", structured), values, lists, PROMPT_INPUT_BUDGETS["budget"])
+
+
+def compile_spending_prompt(spending_data: dict, persona: str, breakdown: str, goal_figures: list,
+                            structured: bool = False) -> CompiledPrompt:
+    """
+    `goal_figures` holds one precomputed line per goal, in the same order as the goals.
+    """
+    currency = spending_data.get("currency", "$")
+    values = {
+        "persona": persona,
+        "currency": currency,
+        "income": spending_data.get("income", 0),
+        "breakdown": breakdown,
+    }
+    goals = RollupList(
+        [(_amount(goal.get("amount")),
+          (f"- {goal['name']}: {currency}{goal['amount']} by {goal.get('deadline') or 'no deadline'}", figures))
+         for goal, figures in zip(spending_data.get("goals", []), goal_figures)],
+        lambda n, total: f"- {n} more goals: {currency}{total} in total",
+        (("goals", "\n"), ("goal_figures", "")))
+    lists = [_expense_list(spending_data.get("expenses", {}), currency), goals]
+    return _fit(_template("spending", structured), values, lists, PROMPT_INPUT_BUDGETS["spending"])
+
+
+# =========================
+# 🔹 Adaptive Output Caps
+# =========================
+class OutputBudget:
+    """
+    Per (route, persona) max_tokens from the recent answer lengths: the p95 plus
+    headroom, rounded up to OUTPUT_TOKENS_STEP and clamped to [floor, ceiling].
+    Until `min_samples` answers are seen the ceiling applies.
+    """
+
+    def __init__(self, ceiling: int = OUTPUT_TOKENS_CEILING, floor: int = OUTPUT_TOKENS_FLOOR,
+                 headroom: float = OUTPUT_TOKENS_HEADROOM, window: int = OUTPUT_TOKENS_WINDOW,
+                 min_samples: int = OUTPUT_TOKENS_MIN_SAMPLES):
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.headroom = headroom
+        self.window = window
+        self.min_samples = min_samples
+        self.truncated = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(route: str, persona: str) -> tuple:
+        # Persona is client-supplied, so unknown values are bucketed to keep the table bounded
+        return route, persona if persona in OUTPUT_TOKENS_PERSONAS else "other"
+
+    def max_tokens(self, route: str, persona: str = None) -> int:
+        with self._lock:
+            samples = sorted(self._samples.get(self._key(route, persona), ()))
+        if len(samples) < self.min_samples:
+            return self.ceiling
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        cap = math.ceil(p95 * self.headroom / OUTPUT_TOKENS_STEP) * OUTPUT_TOKENS_STEP
+        return max(self.floor, min(self.ceiling, cap))
+
+    def record(self, route: str, persona: str, tokens: int, truncated: bool = False):
+        key = self._key(route, persona)
+        if truncated:
+            # The answer was cut at the cap, so its real length is unknown; count it as
+            # twice as long so the p95 (and the cap) climbs back up
+            tokens = min(self.ceiling, tokens * 2)
+            self.truncated[key] = self.truncated.get(key, 0) + 1
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(tokens)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            f"{route}/{persona}": {
+                "samples": len(self._samples[(route, persona)]),
+                "max_tokens": self.max_tokens(route, persona),
+                "truncated": self.truncated.get((route, persona), 0),
+            }
+            for route, persona in keys
+        }
+
+
+output_budget = OutputBudget()
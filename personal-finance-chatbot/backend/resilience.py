@@ -0,0 +1,236 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+import httpx
+from fastapi import HTTPException
+from admission import AdmissionRejectedError
+from metrics import record_error
+
+# =========================
+# 🔹 Resilience Settings
+# =========================
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8"))
+# Overall budget per upstream call, retries included; matches the client-side timeout
+UPSTREAM_DEADLINE = float(os.getenv("UPSTREAM_DEADLINE", os.getenv("OPENROUTER_TIMEOUT", "30")))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while its circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the overall upstream deadline runs out before a call succeeds."""
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError))
+
+
+def retry_after_seconds(exc: Exception):
+    """
+    Seconds requested by a Retry-After header (delta or HTTP date), if any.
+    """
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than the server's Retry-After.
+    """
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    return max(delay, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Per-upstream breaker: opens after consecutive retryable failures, fails fast
+    while open, and lets a single probe through once the reset timeout elapses.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through; returns True if this call is
+        the half-open probe, which the caller must hand back with `release_probe`.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(self.name, max(remaining, 1.0))
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        # The probe ended without an outcome (cancelled); let the next call probe instead
+        self._probing = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"🟢 Circuit for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"🔴 Circuit for {self.name} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+async def call_with_retries(fn, breaker: CircuitBreaker, deadline: float = None,
+                            max_attempts: int = RETRY_MAX_ATTEMPTS):
+    """
+    Await `fn()` with jittered exponential backoff, Retry-After, a circuit breaker
+    and an overall deadline (seconds from now) that bounds attempts and sleeps alike.
+    """
+    deadline_at = time.monotonic() + (UPSTREAM_DEADLINE if deadline is None else deadline)
+    attempt = 0
+    while True:
+        probe = breaker.before_call()
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            if probe:
+                breaker.release_probe()
+            raise DeadlineExceededError(f"{breaker.name} deadline exceeded")
+        try:
+            result = await asyncio.wait_for(fn(), remaining)
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            raise DeadlineExceededError(f"{breaker.name} deadline exceeded")
+        except Exception as e:
+            if not is_retryable(e):
+                # The upstream answered (e.g. a 4xx), so it is healthy even though the call failed
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            attempt += 1
+            delay = backoff_delay(attempt - 1, retry_after_seconds(e))
+            if attempt >= max_attempts or time.monotonic() + delay >= deadline_at:
+                raise
+            logger.warning(f"🔁 Retrying {breaker.name} in {delay:.2f}s (attempt {attempt + 1}/{max_attempts}): {e}")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            # Cancellation (client gone, losing hedge/race task) skips both record_* calls
+            if probe:
+                breaker.release_probe()
+
+
+async def stream_with_retries(make_stream, breaker: CircuitBreaker, deadline: float = None,
+                              max_attempts: int = RETRY_MAX_ATTEMPTS):
+    """
+    Like `call_with_retries` for streams: a failed attempt is retried only if it
+    fails before the first chunk, since chunks already sent cannot be taken back.
+    """
+    deadline_at = time.monotonic() + (UPSTREAM_DEADLINE if deadline is None else deadline)
+    attempt = 0
+    while True:
+        probe = breaker.before_call()
+        started = False
+        try:
+            async for chunk in make_stream():
+                if not started:
+                    started = True
+                    breaker.record_success()
+                yield chunk
+            if not started:
+                breaker.record_success()
+            return
+        except Exception as e:
+            if started:
+                raise
+            if not is_retryable(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            attempt += 1
+            delay = backoff_delay(attempt - 1, retry_after_seconds(e))
+            if attempt >= max_attempts or time.monotonic() + delay >= deadline_at:
+                raise
+            logger.warning(f"🔁 Retrying {breaker.name} stream in {delay:.2f}s (attempt {attempt + 1}/{max_attempts}): {e}")
+            await asyncio.sleep(delay)
+        finally:
+            # Also reached on cancellation and when the consumer closes the stream early
+            if probe:
+                breaker.release_probe()
+
+
+def upstream_http_exception(e: Exception) -> HTTPException:
+    """
+    Map an upstream failure to the HTTP error the client should see.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    record_error(e)
+    if isinstance(e, (CircuitOpenError, AdmissionRejectedError)):
+        return HTTPException(status_code=503, detail=str(e),
+                             headers={"Retry-After": str(int(e.retry_after))})
+    if isinstance(e, (DeadlineExceededError, httpx.TimeoutException)):
+        return HTTPException(status_code=504, detail="Request to OpenRouter API timed out. Please try again later.")
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        if status == 429:
+            retry_after = retry_after_seconds(e)
+            headers = {"Retry-After": str(int(retry_after))} if retry_after is not None else None
+            return HTTPException(status_code=503, detail="OpenRouter API rate limit reached. Please try again later.",
+                                 headers=headers)
+        return HTTPException(status_code=502, detail=f"OpenRouter API returned HTTP {status}")
+    if isinstance(e, httpx.TransportError):
+        return HTTPException(status_code=503, detail="Connection to OpenRouter API failed. Please try again later.")
+    return HTTPException(status_code=500, detail=str(e))
+
@@ -1,95 +1,437 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, List
-from openrouter_api import analyze_nlu, generate_response
-from utils import build_prompt_with_nlu, build_budget_prompt, build_spending_insight_prompt
-import traceback
-import logging
-import requests
-
-router = APIRouter()
-
-class NLURequest(BaseModel):
-    text: str
-
-class GenerateRequest(BaseModel):
-    question: str
-    persona: Optional[str] = "student"
-
-class BudgetSummaryRequest(BaseModel):
-    income: float
-    expenses: Dict[str, float]
-    savings_goal: float
-    currency: Optional[str] = "$"
-    persona: Optional[str] = "student"
-
-class SpendingInsightsRequest(BaseModel):
-    income: float
-    expenses: Dict[str, float]
-    goals: List[Dict[str, str]]  # e.g., [{"name": "Emergency Fund", "amount": 1000, "deadline": "2024-12-31"}]
-    currency: Optional[str] = "$"
-    persona: Optional[str] = "student"
-
-@router.post("/nlu")
-async def nlu_analysis(request: NLURequest):
-    try:
-        result = analyze_nlu(request.text)
-        return {"nlu": result}
-    except requests.exceptions.Timeout:
-        error_msg = "Request to OpenRouter API timed out. Please try again later."
-        logging.error(error_msg)
-        raise HTTPException(status_code=504, detail=error_msg)
-    except requests.exceptions.ConnectionError:
-        error_msg = "Connection to OpenRouter API failed. Please check your internet connection."
-        logging.error(error_msg)
-        raise HTTPException(status_code=503, detail=error_msg)
-    except Exception as e:
-        logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/generate")
-async def generate_answer(request: GenerateRequest):
-    try:
-        nlu_data = analyze_nlu(request.question)
-        prompt = build_prompt_with_nlu(request.question, nlu_data, request.persona)
-        messages = [{"role": "user", "content": prompt}]
-        answer = generate_response(messages)
-        return {
-            "persona": request.persona,
-            "nlu": nlu_data,
-            "prompt": prompt,
-            "answer": answer
-        }
-    except Exception as e:
-        logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/budget-summary")
-async def budget_summary(request: BudgetSummaryRequest):
-    try:
-        prompt = build_budget_prompt(request.dict(), request.persona)
-        messages = [{"role": "user", "content": prompt}]
-        summary = generate_response(messages)
-        return {
-            "persona": request.persona,
-            "prompt": prompt,
-            "summary": summary
-        }
-    except Exception as e:
-        logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/spending-insights")
-async def spending_insights(request: SpendingInsightsRequest):
-    try:
-        prompt = build_spending_insight_prompt(request.dict(), request.persona)
-        messages = [{"role": "user", "content": prompt}]
-        insights = generate_response(messages)
-        return {
-            "persona": request.persona,
-            "prompt": prompt,
-            "insights": insights
-        }
-    except Exception as e:
-        logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response, Header
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, Dict, List, Union
+from openrouter_api import generate_response, stream_response, inflight_completions
+from streaming import sse_response, sse_event
+from nlu_engine import nlu_engine, NLU_PRELOAD, NLU_MODE, NEUTRAL_RESULT
+from cache import completion_cache
+from semantic_cache import semantic_cache
+from faq import faq_index, FAQ_ARTIFACT_PATH
+from prompt_compiler import output_budget, PROMPT_INPUT_BUDGETS
+from structured import generate_structured, StructuredOutputError, OUTPUT_FORMATS
+from utils import build_prompt_with_nlu, build_budget_prompt, build_spending_insight_prompt
+from analytics import budget_metrics, spending_metrics
+from ingest import ingest_transactions
+from sessions import chat_sessions, build_context
+from resilience import upstream_http_exception
+from model_router import model_router
+from admission import upstream_admission
+from features import is_enabled, snapshot as feature_snapshot
+from metrics import timed, record_error, registry, CallbackCounter, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from jobs import job_queue, JobQueueFullError, IdempotencyConflictError, JOB_MAX_WAIT
+from batch import run_budget_batch, parse_budget_table, BATCH_CONCURRENCY, BATCH_MAX_RECORDS
+import traceback
+import logging
+import asyncio
+
+router = APIRouter()
+
+def _cache_events():
+    events = {("nlu", "hit"): nlu_engine.memo.hits, ("nlu", "miss"): nlu_engine.memo.misses,
+              ("inflight", "coalesced"): inflight_completions.followers}
+    if completion_cache is not None:
+        events.update({("completion", "hit"): completion_cache.hits, ("completion", "miss"): completion_cache.misses})
+    if is_enabled("faq"):
+        events.update({("faq", "hit"): faq_index.hits, ("faq", "miss"): faq_index.misses})
+    if is_enabled("semantic_cache"):
+        events.update({("semantic", "hit"): semantic_cache.hits, ("semantic", "miss"): semantic_cache.misses})
+    return events
+
+registry.register(CallbackCounter(
+    "finbot_cache_events_total", "Cache lookups by cache and result.", ("cache", "result"), _cache_events))
+
+_warming = set()
+
+async def _warm_semantic_cache():
+    # Paraphrases of catalog questions then hit too; runs after startup so it never delays it
+    for entry in faq_index.entries():
+        vector = await semantic_cache.embed(entry["question"])
+        semantic_cache.store(entry["persona"], entry["question"], vector, entry["answer"])
+    logging.info(f"🔥 Semantic cache warmed with {len(faq_index)} FAQ answers")
+
+async def _load_faq_answers():
+    try:
+        await asyncio.to_thread(faq_index.load, FAQ_ARTIFACT_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"❌ Could not load FAQ answers: {e}")
+        return
+    # The semantic cache is started before this, so its embedder is loaded before warming
+    if len(faq_index) and is_enabled("semantic_cache"):
+        task = asyncio.create_task(_warm_semantic_cache())
+        _warming.add(task)
+        task.add_done_callback(_warming.discard)
+
+async def start_components():
+    """
+    Start the enabled background components; called once from the app's lifespan.
+    """
+    # Load models before the first request instead of on it
+    if NLU_PRELOAD and is_enabled("nlu"):
+        await nlu_engine.start()
+    if is_enabled("semantic_cache"):
+        await semantic_cache.start()
+    if is_enabled("faq"):
+        await _load_faq_answers()
+    if is_enabled("jobs"):
+        await job_queue.start()
+
+async def stop_components():
+    """
+    Stop what start_components started, in reverse order.
+    """
+    await job_queue.stop()
+    for task in list(_warming):
+        task.cancel()
+    await asyncio.gather(*_warming, return_exceptions=True)
+    await nlu_engine.stop()
+
+class NLURequest(BaseModel):
+    text: str
+
+class GenerateRequest(BaseModel):
+    question: str
+    persona: Optional[str] = "student"
+    session_id: Optional[str] = None  # opt-in multi-turn memory; created on first use
+
+class SessionRequest(BaseModel):
+    persona: Optional[str] = "student"
+
+class BudgetSummaryRequest(BaseModel):
+    income: float
+    expenses: Dict[str, float]
+    savings_goal: float
+    currency: Optional[str] = "$"
+    persona: Optional[str] = "student"
+
+class SpendingInsightsRequest(BaseModel):
+    income: float
+    expenses: Dict[str, float]
+    goals: List[Dict[str, Union[str, float]]]  # e.g., [{"name": "Emergency Fund", "amount": 1000, "deadline": "2024-12-31"}]
+    currency: Optional[str] = "$"
+    persona: Optional[str] = "student"
+
+@router.post("/nlu")
+async def nlu_analysis(request: NLURequest):
+    if not is_enabled("nlu"):
+        raise HTTPException(status_code=503, detail="NLU is disabled on this deployment")
+    try:
+        with timed("nlu"):
+            result = await nlu_engine.analyze(request.text)
+        return {"nlu": result}
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        raise upstream_http_exception(e)
+
+async def _replay(answer: str):
+    yield answer
+
+@router.post("/generate")
+async def generate_answer(request: GenerateRequest, stream: bool = False, cache: bool = True):
+    try:
+        # Catalog questions are answered from the pre-generated FAQ artifact, before NLU
+        faq = faq_index.lookup(request.persona, request.question) \
+            if cache and not request.session_id and is_enabled("faq") else None
+        if faq is not None:
+            prompt = build_prompt_with_nlu(request.question, faq["nlu"], request.persona)
+            response = {"persona": request.persona, "nlu": faq["nlu"], "prompt": prompt, "session_id": None,
+                        "faq": {"question": faq["question"]}}
+            if stream and is_enabled("streaming"):
+                return sse_response(_replay(faq["answer"]), meta=response)
+            return {**response, "answer": faq["answer"]}
+        if is_enabled("nlu"):
+            with timed("nlu"):
+                nlu_data = await nlu_engine.analyze(request.question)
+        else:
+            nlu_data = {**NEUTRAL_RESULT, "entities": [], "keywords": []}
+        with timed("prompt_build"):
+            prompt = build_prompt_with_nlu(request.question, nlu_data, request.persona)
+        session_id = request.session_id
+        if session_id:
+            session = await chat_sessions.get_or_create(session_id, request.persona)
+            messages = build_context(session["messages"], prompt)
+        else:
+            messages = [{"role": "user", "content": prompt}]
+        # Paraphrases of an answered question skip the LLM; session turns depend on history
+        vector = hit = None
+        if cache and not session_id and is_enabled("semantic_cache"):
+            with timed("semantic_lookup"):
+                vector = await semantic_cache.embed(request.question)
+                hit = semantic_cache.lookup(request.persona, request.question, vector)
+        matched = {"question": hit["question"], "similarity": hit["similarity"]} if hit else None
+        if stream and is_enabled("streaming"):
+            meta = {"persona": request.persona, "nlu": nlu_data, "prompt": prompt, "session_id": session_id}
+            if hit:
+                return sse_response(_replay(hit["answer"]), meta={**meta, "semantic_cache": matched})
+            deltas = stream_response(messages, use_cache=cache, persona=request.persona)
+            if session_id:
+                deltas = chat_sessions.record_streamed_turn(deltas, session_id, request.question)
+            if vector is not None:
+                deltas = semantic_cache.record_streamed_answer(deltas, request.persona, request.question, vector)
+            return sse_response(deltas, meta=meta)
+        if hit:
+            answer = hit["answer"]
+        else:
+            answer = await generate_response(messages, use_cache=cache, persona=request.persona)
+            if vector is not None:
+                semantic_cache.store(request.persona, request.question, vector, answer)
+        if session_id:
+            await chat_sessions.record_turn(session_id, request.question, answer)
+        response = {
+            "persona": request.persona,
+            "nlu": nlu_data,
+            "prompt": prompt,
+            "session_id": session_id,
+            "answer": answer
+        }
+        if matched:
+            response["semantic_cache"] = matched
+        return response
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        raise upstream_http_exception(e)
+
+def _check_format(format: str) -> bool:
+    if format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'; expected one of {', '.join(OUTPUT_FORMATS)}")
+    return format == "structured"
+
+@router.post("/budget-summary")
+async def budget_summary(request: BudgetSummaryRequest, stream: bool = False, cache: bool = True,
+                         llm: bool = True, format: str = "prose"):
+    structured = _check_format(format)
+    try:
+        with timed("analytics"):
+            metrics = budget_metrics(request.dict())
+        if not llm:
+            return {"persona": request.persona, "analytics": metrics}
+        with timed("prompt_build"):
+            prompt = build_budget_prompt(request.dict(), request.persona, metrics, structured=structured)
+        messages = [{"role": "user", "content": prompt}]
+        if structured:
+            # Short JSON replies are never streamed; `summary` is a dict (structured.BudgetAnalysis)
+            summary = await generate_structured(messages, "budget", use_cache=cache, persona=request.persona)
+            return {"persona": request.persona, "prompt": prompt, "analytics": metrics,
+                    "format": format, "summary": summary}
+        if stream and is_enabled("streaming"):
+            meta = {"persona": request.persona, "prompt": prompt, "analytics": metrics}
+            return sse_response(stream_response(messages, use_cache=cache, route="budget", persona=request.persona), meta=meta)
+        summary = await generate_response(messages, use_cache=cache, route="budget", persona=request.persona)
+        return {
+            "persona": request.persona,
+            "prompt": prompt,
+            "analytics": metrics,
+            "summary": summary
+        }
+    except StructuredOutputError as e:
+        record_error(e)
+        logging.error(f"❌ {e}")
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        raise upstream_http_exception(e)
+
+@router.post("/budget-summary/batch")
+async def budget_summary_batch(batch: List[BudgetSummaryRequest], llm: bool = True, cache: bool = True,
+                               concurrency: int = BATCH_CONCURRENCY):
+    if len(batch) > BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"Too many records; the limit is {BATCH_MAX_RECORDS}")
+    records = [{"id": str(i), **item.dict()} for i, item in enumerate(batch)]
+    return StreamingResponse(
+        run_budget_batch(records, llm=llm, use_cache=cache, concurrency=min(concurrency, BATCH_CONCURRENCY)),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/budget-summary/batch/upload")
+async def budget_summary_batch_upload(file: UploadFile = File(...), llm: bool = True, cache: bool = True,
+                                      concurrency: int = BATCH_CONCURRENCY):
+    try:
+        records = parse_budget_table(file.filename, await file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        run_budget_batch(records, llm=llm, use_cache=cache, concurrency=min(concurrency, BATCH_CONCURRENCY)),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/spending-insights")
+async def spending_insights(request: SpendingInsightsRequest, stream: bool = False, cache: bool = True,
+                            llm: bool = True, format: str = "prose"):
+    structured = _check_format(format)
+    try:
+        with timed("analytics"):
+            metrics = spending_metrics(request.dict())
+        if not llm:
+            return {"persona": request.persona, "analytics": metrics}
+        with timed("prompt_build"):
+            prompt = build_spending_insight_prompt(request.dict(), request.persona, metrics, structured=structured)
+        messages = [{"role": "user", "content": prompt}]
+        if structured:
+            insights = await generate_structured(messages, "spending", use_cache=cache, persona=request.persona)
+            return {"persona": request.persona, "prompt": prompt, "analytics": metrics,
+                    "format": format, "insights": insights}
+        if stream and is_enabled("streaming"):
+            meta = {"persona": request.persona, "prompt": prompt, "analytics": metrics}
+            return sse_response(stream_response(messages, use_cache=cache, route="spending", persona=request.persona), meta=meta)
+        insights = await generate_response(messages, use_cache=cache, route="spending", persona=request.persona)
+        return {
+            "persona": request.persona,
+            "prompt": prompt,
+            "analytics": metrics,
+            "insights": insights
+        }
+    except StructuredOutputError as e:
+        record_error(e)
+        logging.error(f"❌ {e}")
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        raise upstream_http_exception(e)
+
+@router.post("/transactions/upload")
+async def upload_transactions(file: UploadFile = File(...), month: Optional[str] = None,
+                              income: Optional[float] = None, savings_goal: float = 0.0,
+                              analyze: Optional[str] = None, persona: str = "student",
+                              currency: str = "$", llm: bool = True, cache: bool = True):
+    try:
+        ingested = await asyncio.to_thread(ingest_transactions, file.file, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if month is not None:
+        if month not in ingested["months"]:
+            raise HTTPException(status_code=404, detail=f"No transactions for month {month}")
+        period = ingested["months"][month]
+    else:
+        period = ingested
+    expenses = period["expenses"]
+    income = period["income"] if income is None else income
+
+    if analyze == "budget":
+        request = BudgetSummaryRequest(income=income, expenses=expenses, savings_goal=savings_goal,
+                                       currency=currency, persona=persona)
+        return {"transactions": ingested, **await budget_summary(request, cache=cache, llm=llm)}
+    if analyze == "spending":
+        request = SpendingInsightsRequest(income=income, expenses=expenses, goals=[],
+                                          currency=currency, persona=persona)
+        return {"transactions": ingested, **await spending_insights(request, cache=cache, llm=llm)}
+    if analyze is not None:
+        raise HTTPException(status_code=400, detail="analyze must be 'budget' or 'spending'")
+    return {"transactions": ingested, "income": income, "expenses": expenses}
+
+# ---- Background jobs: submit now, poll or stream the result later ----
+async def _run_budget_job(payload: dict):
+    return await budget_summary(BudgetSummaryRequest(**payload["request"]), cache=payload["cache"],
+                                format=payload["format"])
+
+async def _run_spending_job(payload: dict):
+    return await spending_insights(SpendingInsightsRequest(**payload["request"]), cache=payload["cache"],
+                                   format=payload["format"])
+
+job_queue.register("budget-summary", _run_budget_job)
+job_queue.register("spending-insights", _run_spending_job)
+
+async def _submit_job(kind: str, request: BaseModel, response: Response, cache: bool, format: str,
+                      idempotency_key: Optional[str]):
+    if not is_enabled("jobs"):
+        raise HTTPException(status_code=503, detail="Background jobs are disabled on this deployment")
+    _check_format(format)
+    payload = {"request": request.dict(), "cache": cache, "format": format}
+    try:
+        job, created = await job_queue.submit(kind, payload, idempotency_key)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # 202 for a new job; a repeated idempotency key gets the existing job back with 200
+    response.status_code = 202 if created else 200
+    return job
+
+@router.post("/jobs/budget-summary")
+async def submit_budget_summary_job(request: BudgetSummaryRequest, response: Response, cache: bool = True,
+                                    format: str = "prose", idempotency_key: Optional[str] = Header(None)):
+    return await _submit_job("budget-summary", request, response, cache, format, idempotency_key)
+
+@router.post("/jobs/spending-insights")
+async def submit_spending_insights_job(request: SpendingInsightsRequest, response: Response, cache: bool = True,
+                                       format: str = "prose", idempotency_key: Optional[str] = Header(None)):
+    return await _submit_job("spending-insights", request, response, cache, format, idempotency_key)
+
+@router.get("/jobs")
+async def job_stats():
+    return job_queue.stats()
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    job = await job_queue.wait(job_id, min(max(wait, 0.0), JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        # One `status` event per change; the last one carries the result or error
+        async for job in job_queue.watch(job_id):
+            yield sse_event(job, event="status")
+        yield sse_event("[DONE]")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.post("/sessions")
+async def create_session(request: SessionRequest):
+    session = await chat_sessions.get_or_create(persona=request.persona)
+    return {"session_id": session["session_id"], "persona": session["persona"]}
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = await chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"deleted": session_id}
+
+@router.get("/health")
+async def health():
+    return {"status": "ok", "features": feature_snapshot(), "nlu_mode": NLU_MODE, "nlu_loaded": nlu_engine.loaded}
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return {
+        "completions": completion_cache.stats() if completion_cache else None,
+        "coalescing": inflight_completions.stats(),
+        "nlu": nlu_engine.memo.stats(),
+        "semantic": semantic_cache.stats() if is_enabled("semantic_cache") else None,
+        "faq": faq_index.stats() if is_enabled("faq") else None
+    }
+
+@router.get("/cache/semantic")
+async def semantic_cache_report(limit: int = 20):
+    if not is_enabled("semantic_cache"):
+        raise HTTPException(status_code=503, detail="Semantic cache is disabled on this deployment")
+    return semantic_cache.report(limit)
+
+@router.get("/models/stats")
+async def model_stats():
+    return model_router.snapshot()
+
+@router.get("/prompts/stats")
+async def prompt_stats():
+    return {"input_budgets": PROMPT_INPUT_BUDGETS, "output_caps": output_budget.snapshot()}
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@router.get("/admission/stats")
+async def admission_stats():
+    return upstream_admission.stats()
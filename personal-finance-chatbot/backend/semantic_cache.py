@@ -0,0 +1,298 @@
+import os
+import re
+import time
+import zlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# =========================
+# 🔹 Semantic Cache Settings
+# =========================
+# model = sentence-transformers on CPU; hashing = NumPy-only character n-grams (no model download)
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "model").lower()
+SEMANTIC_EMBED_MODEL = os.getenv("SEMANTIC_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_INDEX = os.getenv("SEMANTIC_INDEX", "numpy").lower()  # numpy (brute force) | hnsw (needs hnswlib)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))  # cosine similarity
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))  # per persona
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "604800"))  # seconds; 0 disables expiry
+HASHING_DIM = 1024
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBERS = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def normalize_question(question: str) -> str:
+    return _WHITESPACE.sub(" ", question.lower()).strip()
+
+
+def numbers_in(question: str) -> tuple:
+    """
+    The figures in a question; paraphrases with different amounts must not share an answer.
+    """
+    return tuple(sorted(n.replace(",", "") for n in _NUMBERS.findall(question)))
+
+
+# =========================
+# 🔹 Embedders
+# =========================
+class HashingEmbedder:
+    """
+    Character 3-gram counts hashed into a fixed-size vector. Catches reworded and
+    reordered questions with shared vocabulary; no model or extra dependency.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def load(self):
+        pass
+
+    def encode(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                padded = f" {word} "
+                for i in range(len(padded) - 2):
+                    vectors[row, zlib.crc32(padded[i:i + 3].encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceEmbedder:
+    """
+    Small sentence-transformers model on CPU (all-MiniLM-L6-v2 by default, 384 dims).
+    """
+
+    def __init__(self, model_name: str = SEMANTIC_EMBED_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                # Imported here so the dependency is only needed when the semantic cache is on
+                from sentence_transformers import SentenceTransformer
+                logger.info(f"Loading embedding model {self.model_name}...")
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+
+    def encode(self, texts: list) -> np.ndarray:
+        self.load()
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+# =========================
+# 🔹 Vector Indexes
+# =========================
+class NumpyIndex:
+    """
+    Brute-force cosine search over a preallocated float32 matrix of unit vectors.
+    Freed slots are reused, so removal is O(1) and the matrix never shrinks.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._vectors = None
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def add(self, vector: np.ndarray) -> int:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        slot = self._free.pop()
+        self._vectors[slot] = vector
+        self._valid[slot] = True
+        return slot
+
+    def remove(self, slot: int):
+        self._valid[slot] = False
+        self._free.append(slot)
+
+    def search(self, vector: np.ndarray) -> tuple:
+        """
+        Best (slot, similarity), or (None, 0.0) when empty.
+        """
+        if self._vectors is None or not self._valid.any():
+            return None, 0.0
+        scores = self._vectors @ vector
+        scores[~self._valid] = -np.inf
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+
+class HNSWIndex:
+    """
+    Approximate nearest-neighbour search with hnswlib, for caches too large to scan.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._index = None
+        self._count = 0
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def add(self, vector: np.ndarray) -> int:
+        if self._index is None:
+            import hnswlib
+            self._index = hnswlib.Index(space="ip", dim=vector.shape[0])
+            self._index.init_index(max_elements=self.capacity, ef_construction=200, M=16,
+                                   allow_replace_deleted=True)
+            self._index.set_ef(64)
+        slot = self._free.pop()
+        self._index.add_items(vector[None, :], [slot], replace_deleted=True)
+        self._count += 1
+        return slot
+
+    def remove(self, slot: int):
+        self._index.mark_deleted(slot)
+        self._count -= 1
+        self._free.append(slot)
+
+    def search(self, vector: np.ndarray) -> tuple:
+        if self._index is None or self._count == 0:
+            return None, 0.0
+        labels, distances = self._index.knn_query(vector[None, :], k=1)
+        # hnswlib "ip" distance is 1 - inner product
+        return int(labels[0][0]), 1.0 - float(distances[0][0])
+
+
+# =========================
+# 🔹 Semantic Answer Cache
+# =========================
+class SemanticCache:
+    """
+    Answers keyed by question meaning rather than exact text.
+
+    Each persona has its own index, so a student never gets a retiree's answer. A lookup
+    hits when the nearest stored question is at least `threshold` cosine-similar and
+    mentions the same figures. Entries expire after `ttl` and each persona keeps at most
+    `max_entries`, evicting the least recently used.
+    """
+
+    def __init__(self, embedder, index_class=NumpyIndex, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, ttl: float = SEMANTIC_CACHE_TTL):
+        self.embedder = embedder
+        self.index_class = index_class
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._similarities = []
+        self._indexes = {}
+        self._entries = {}  # persona -> OrderedDict(slot -> entry), oldest use first
+        self._lock = threading.Lock()
+        # One thread, so CPU-bound encoding never competes with itself
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+
+    async def embed(self, question: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(self._executor, self.embedder.encode, [normalize_question(question)])
+        return vectors[0]
+
+    async def start(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.embedder.load)
+
+    def lookup(self, persona: str, question: str, vector: np.ndarray):
+        """
+        Cached entry for a question close enough to `question`, or None.
+        """
+        with self._lock:
+            index = self._indexes.get(persona)
+            slot, similarity = index.search(vector) if index is not None else (None, 0.0)
+            entry = self._entries[persona].get(slot) if slot is not None else None
+            if entry is not None and self.ttl and entry["created"] + self.ttl < time.time():
+                self._remove(persona, slot)
+                self.expirations += 1
+                entry = None
+            if entry is None or similarity < self.threshold or entry["numbers"] != numbers_in(question):
+                self.misses += 1
+                return None
+            self._entries[persona].move_to_end(slot)
+            entry["hits"] += 1
+            self.hits += 1
+            self._similarities.append(similarity)
+            del self._similarities[:-1000]
+            return {**entry, "similarity": round(similarity, 4)}
+
+    def store(self, persona: str, question: str, vector: np.ndarray, answer: str):
+        with self._lock:
+            if persona not in self._indexes:
+                self._indexes[persona] = self.index_class(self.max_entries)
+                self._entries[persona] = OrderedDict()
+            entries = self._entries[persona]
+            # Refresh a near-identical question instead of storing a duplicate
+            slot, similarity = self._indexes[persona].search(vector)
+            if slot is not None and similarity >= 0.999 and slot in entries:
+                self._remove(persona, slot)
+            while len(entries) >= self.max_entries:
+                self._remove(persona, next(iter(entries)))
+                self.evictions += 1
+            slot = self._indexes[persona].add(vector)
+            entries[slot] = {"question": question, "answer": answer, "numbers": numbers_in(question),
+                             "created": time.time(), "hits": 0}
+
+    def _remove(self, persona: str, slot: int):
+        self._entries[persona].pop(slot, None)
+        self._indexes[persona].remove(slot)
+
+    async def record_streamed_answer(self, deltas, persona: str, question: str, vector: np.ndarray):
+        """
+        Pass stream chunks through and cache the full answer once the stream completes.
+        """
+        chunks = []
+        async for delta in deltas:
+            chunks.append(delta)
+            yield delta
+        self.store(persona, question, vector, "".join(chunks))
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        similarities = sorted(self._similarities)
+        return {
+            "embedder": type(self.embedder).__name__,
+            "index": self.index_class.__name__,
+            "threshold": self.threshold,
+            "entries": {persona: len(entries) for persona, entries in self._entries.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "hit_similarity_p50": round(similarities[len(similarities) // 2], 4) if similarities else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def report(self, limit: int = 20) -> dict:
+        """
+        Hit-rate report: overall stats plus the most-served cached questions.
+        """
+        with self._lock:
+            top = sorted(((persona, entry) for persona, entries in self._entries.items() for entry in entries.values()),
+                         key=lambda item: item[1]["hits"], reverse=True)[:limit]
+        return {
+            **self.stats(),
+            "top_questions": [{"persona": persona, "question": entry["question"], "hits": entry["hits"]}
+                              for persona, entry in top],
+        }
+
+
+def build_semantic_cache() -> SemanticCache:
+    embedder = HashingEmbedder() if SEMANTIC_EMBEDDER == "hashing" else SentenceEmbedder()
+    index_class = HNSWIndex if SEMANTIC_INDEX == "hnsw" else NumpyIndex
+    return SemanticCache(embedder, index_class)
+
+
+semantic_cache = build_semantic_cache()
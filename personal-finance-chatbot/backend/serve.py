@@ -0,0 +1,100 @@
+"""
+Production serving mode: one shared NLU inference process plus N API worker processes.
+
+The NLU models are loaded once in nlu_server.py; workers reach it over a local socket
+instead of each loading their own copy. Caches, sessions and the upstream rate limiter
+default to SQLite so all workers share them.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import subprocess
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Shared-state defaults for multi-worker mode; anything set explicitly wins
+SHARED_STATE_ENV = {
+    "LLM_CACHE_BACKEND": "sqlite",
+    "SESSION_BACKEND": "sqlite",
+    "ADMISSION_BACKEND": "sqlite",
+}
+
+
+def default_nlu_address() -> str:
+    if sys.platform == "win32":
+        return "tcp:127.0.0.1:8765"
+    return f"unix:{os.path.join(tempfile.gettempdir(), f'finbot-nlu-{os.getpid()}.sock')}"
+
+
+def start_nlu_server(address: str, timeout: float) -> subprocess.Popen:
+    """
+    Launch nlu_server.py and wait until it answers a ping with its models loaded.
+    """
+    from nlu_remote import RemoteNLUEngine
+
+    process = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, "nlu_server.py"), "--address", address],
+                               cwd=BACKEND_DIR)
+    client = RemoteNLUEngine(address)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"NLU server exited with code {process.returncode}")
+        try:
+            client.load()
+            logger.info(f"🧠 Shared NLU server ready at {address} (models loaded: {client.loaded})")
+            return process
+        except (OSError, ValueError) as e:
+            # Not listening yet, or it closed the connection mid-reply (e.g. while dying)
+            if process.poll() is not None:
+                raise RuntimeError(f"NLU server exited with code {process.returncode}: {e}") from e
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"NLU server did not come up within {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 2))))
+    parser.add_argument("--nlu-address", default=os.getenv("NLU_SERVER_ADDRESS") or default_nlu_address(),
+                        help="unix:/path/to.sock or tcp:host:port for the shared NLU server")
+    parser.add_argument("--nlu-timeout", type=float, default=300.0, help="seconds to wait for the models to load")
+    args = parser.parse_args()
+
+    for name, value in SHARED_STATE_ENV.items():
+        os.environ.setdefault(name, value)
+
+    nlu_process = None
+    # NLU_MODE=rules never loads the models, so there is nothing to share
+    if os.getenv("FEATURE_NLU", "true").lower() == "true" and os.getenv("NLU_MODE", "model").lower() != "rules":
+        nlu_process = start_nlu_server(args.nlu_address, args.nlu_timeout)
+        # Workers inherit this and talk to the shared server instead of loading the models
+        os.environ["NLU_SERVER_ADDRESS"] = args.nlu_address
+
+    import uvicorn
+    try:
+        logger.info(f"🚀 Starting {args.workers} workers on {args.host}:{args.port}")
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, app_dir=BACKEND_DIR)
+    finally:
+        if nlu_process is not None:
+            nlu_process.terminate()
+            try:
+                nlu_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                nlu_process.kill()
+
+
+if __name__ == "__main__":
+    main()
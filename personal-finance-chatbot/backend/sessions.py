@@ -0,0 +1,267 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from prompt_compiler import count_tokens
+
+# =========================
+# 🔹 Session Settings
+# =========================
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()  # memory | sqlite
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_CONTEXT_TOKENS = int(os.getenv("SESSION_CONTEXT_TOKENS", "1500"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "200"))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token estimate from the prompt compiler's local tokenizer (~4 characters per token without it).
+    """
+    return count_tokens(text)
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "..."
+
+
+def summarize_turns(turns: list, max_tokens: int = SESSION_SUMMARY_TOKENS) -> str:
+    """
+    Fold older turns into a short extractive summary (first sentence of each),
+    keeping the most recent ones when the summary budget runs out.
+    """
+    lines = []
+    used = 0
+    for turn in reversed(turns):
+        speaker = "User" if turn["role"] == "user" else "Assistant"
+        line = f"{speaker}: {_first_sentence(turn['content'])}"
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return ""
+    return "Summary of earlier conversation:\n" + "\n".join(reversed(lines))
+
+
+def build_context(history: list, prompt: str, max_tokens: int = SESSION_CONTEXT_TOKENS) -> list:
+    """
+    Assemble chat messages for the next turn under a token budget.
+    The newest turns are kept verbatim; anything older is summarized into one system message.
+    """
+    budget = max_tokens - estimate_tokens(prompt)
+    costs = [estimate_tokens(turn["content"]) for turn in history]
+    if sum(costs) > budget:
+        # Reserve room for the summary of whatever has to be dropped
+        budget -= SESSION_SUMMARY_TOKENS
+    kept = 0
+    for cost in reversed(costs):
+        if cost > budget:
+            break
+        kept += 1
+        budget -= cost
+
+    messages = []
+    dropped, recent = history[:len(history) - kept], history[len(history) - kept:]
+    if dropped:
+        summary = summarize_turns(dropped, SESSION_SUMMARY_TOKENS)
+        if summary:
+            messages.append({"role": "system", "content": summary})
+    messages.extend({"role": t["role"], "content": t["content"]} for t in recent)
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+class MemorySessionStore:
+    """
+    In-process chat history, evicting the least recently used session past the cap.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {**session, "messages": list(session["messages"])}
+
+    def create(self, session_id: str, persona: str) -> dict:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.setdefault(
+                session_id,
+                {"session_id": session_id, "persona": persona, "messages": [], "created_at": now, "updated_at": now},
+            )
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return {**session, "messages": list(session["messages"])}
+
+    def append(self, session_id: str, role: str, content: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["messages"].append({"role": role, "content": content})
+            del session["messages"][:-SESSION_MAX_MESSAGES]
+            session["updated_at"] = time.time()
+            self._sessions.move_to_end(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore:
+    """
+    Chat history persisted in SQLite so sessions survive restarts. Past the cap the
+    least recently updated sessions are evicted, as in the memory store.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.path = path
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, persona TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)")
+        self._conn.commit()
+
+    def _load(self, session_id: str):
+        row = self._conn.execute(
+            "SELECT persona, created_at, updated_at FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        messages = self._conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return {
+            "session_id": session_id,
+            "persona": row[0],
+            "messages": [{"role": r, "content": c} for r, c in messages],
+            "created_at": row[1],
+            "updated_at": row[2],
+        }
+
+    def get(self, session_id: str):
+        with self._lock:
+            return self._load(session_id)
+
+    def create(self, session_id: str, persona: str) -> dict:
+        now = time.time()
+        with self._lock:
+            created = self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, persona, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, persona, now, now),
+            ).rowcount
+            if created:
+                self._evict()
+            self._conn.commit()
+            return self._load(session_id)
+
+    def _evict(self):
+        excess = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if excess <= 0:
+            return
+        oldest = "SELECT id FROM sessions ORDER BY updated_at LIMIT ?"
+        self._conn.execute(f"DELETE FROM messages WHERE session_id IN ({oldest})", (excess,))
+        self._conn.execute(f"DELETE FROM sessions WHERE id IN ({oldest})", (excess,))
+
+    def append(self, session_id: str, role: str, content: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)", (session_id, role, content)
+            )
+            self._conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id NOT IN ("
+                "SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, SESSION_MAX_MESSAGES),
+            )
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (time.time(), session_id))
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            deleted = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            self._conn.commit()
+            return deleted > 0
+
+
+class ChatSessions:
+    """
+    Async facade over a session store; SQLite calls run in a worker thread.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._offload = isinstance(store, SQLiteSessionStore)
+
+    async def _call(self, fn, *args):
+        if self._offload:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, session_id: str):
+        return await self._call(self.store.get, session_id)
+
+    async def get_or_create(self, session_id: str = None, persona: str = "student") -> dict:
+        session_id = session_id or uuid.uuid4().hex
+        session = await self._call(self.store.get, session_id)
+        if session is None:
+            session = await self._call(self.store.create, session_id, persona)
+        return session
+
+    async def record_turn(self, session_id: str, question: str, answer: str):
+        await self._call(self.store.append, session_id, "user", question)
+        await self._call(self.store.append, session_id, "assistant", answer)
+
+    async def record_streamed_turn(self, deltas, session_id: str, question: str):
+        """
+        Pass stream chunks through and record the turn once the stream completes.
+        """
+        chunks = []
+        async for delta in deltas:
+            chunks.append(delta)
+            yield delta
+        await self.record_turn(session_id, question, "".join(chunks))
+
+    async def delete(self, session_id: str) -> bool:
+        return await self._call(self.store.delete, session_id)
+
+
+def build_sessions() -> ChatSessions:
+    if SESSION_BACKEND == "sqlite":
+        logger.info(f"💬 Chat sessions: sqlite ({SESSION_DB_PATH})")
+        return ChatSessions(SQLiteSessionStore())
+    logger.info("💬 Chat sessions: memory")
+    return ChatSessions(MemorySessionStore())
+
+
+chat_sessions = build_sessions()
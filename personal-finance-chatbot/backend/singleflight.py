@@ -0,0 +1,44 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one underlying call.
+
+    The first caller for a key starts the work as a task; callers arriving while
+    it is in flight await the same task and receive its result or its exception.
+    The task is shielded, so one waiter disconnecting does not cancel the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn):
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.followers += 1
+            logger.info("🔗 Joining in-flight upstream call")
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task):
+        self._calls.pop(key, None)
+        # Mark the exception retrieved in case every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.followers,
+        }
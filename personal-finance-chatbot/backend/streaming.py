@@ -0,0 +1,76 @@
+import json
+import logging
+from fastapi.responses import StreamingResponse
+from http_client import get_client
+from metrics import record_usage, record_error
+
+logger = logging.getLogger(__name__)
+
+
+async def iter_completion_deltas(url: str, headers: dict, payload: dict, outcome: dict = None):
+    """
+    POST a streaming chat completion and yield content deltas as they arrive.
+    Parses OpenRouter's SSE frames (`data: {...}` lines ending in `data: [DONE]`).
+    If given, `outcome["finish_reason"]` is set from the frame that reports it.
+    """
+    payload = {**payload, "stream": True}
+    async with get_client().stream("POST", url, json=payload, headers=headers) as response:
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            # Blank lines separate frames; ':' lines are keep-alive comments.
+            if not line or line.startswith(":") or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ Skipping malformed stream frame: {data[:80]}")
+                continue
+            if chunk.get("usage"):
+                # OpenRouter reports usage on the final frame
+                record_usage(chunk.get("model") or payload.get("model"), chunk["usage"])
+            choices = chunk.get("choices") or [{}]
+            if outcome is not None and choices[0].get("finish_reason"):
+                outcome["finish_reason"] = choices[0]["finish_reason"]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+
+def sse_event(data, event: str = None) -> str:
+    """
+    Format one Server-Sent Event frame.
+    """
+    body = data if isinstance(data, str) else json.dumps(data)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {body}\n\n"
+
+
+def sse_response(deltas, meta: dict = None) -> StreamingResponse:
+    """
+    Relay an async iterator of text deltas to the client as text/event-stream.
+
+    Frames: an optional `meta` event, one `{"delta": ...}` frame per chunk,
+    an `error` event if the upstream fails mid-stream, then `[DONE]`.
+    """
+    async def event_stream():
+        if meta is not None:
+            yield sse_event(meta, event="meta")
+        try:
+            async for delta in deltas:
+                yield sse_event({"delta": delta})
+        except Exception as e:
+            logger.error(f"❌ Stream aborted: {e}")
+            record_error(e)
+            yield sse_event({"detail": str(e)}, event="error")
+        yield sse_event("[DONE]")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import logging
+from typing import List
+from pydantic import BaseModel, ValidationError
+from openrouter_api import generate_response
+from metrics import registry, Counter
+
+# =========================
+# 🔹 Structured Output Settings
+# =========================
+# Repair round-trips to the model after a reply fails validation (0 = local repair only)
+STRUCTURED_MAX_RETRIES = int(os.getenv("STRUCTURED_MAX_RETRIES", "1"))
+STRUCTURED_MAX_ITEMS = int(os.getenv("STRUCTURED_MAX_ITEMS", "5"))
+OUTPUT_FORMATS = ("prose", "structured")
+
+logger = logging.getLogger(__name__)
+
+structured_outputs = registry.register(Counter(
+    "finbot_structured_outputs_total", "Structured replies by route and how they were validated.",
+    ("route", "result")))
+
+
+class StructuredOutputError(ValueError):
+    """
+    The model did not produce a valid structured reply, even after repair.
+    """
+
+
+# =========================
+# 🔹 Schemas
+# =========================
+class CategoryNote(BaseModel):
+    name: str
+    comment: str
+
+
+class SavingsVerdict(BaseModel):
+    met: bool
+    comment: str
+
+
+class GoalVerdict(BaseModel):
+    name: str
+    on_track: bool
+    comment: str
+
+
+class BudgetAnalysis(BaseModel):
+    summary: str
+    top_categories: List[CategoryNote]
+    recommendations: List[str]
+    savings_goal: SavingsVerdict
+
+
+class SpendingAnalysis(BaseModel):
+    summary: str
+    top_categories: List[CategoryNote]
+    recommendations: List[str]
+    goals: List[GoalVerdict]
+
+
+SCHEMAS = {"budget": BudgetAnalysis, "spending": SpendingAnalysis}
+
+
+# =========================
+# 🔹 Parsing and Repair
+# =========================
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# String literals are matched whole, so a literal only matches in a value position outside them
+_PYTHON_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|([:\[,]\s*)(True|False|None)\b')
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _repair(text: str) -> str:
+    """
+    Undo the usual ways a model wraps or bends JSON: code fences, prose around the
+    object, trailing commas and Python literals.
+    """
+    text = _FENCE.sub("", text)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    return _PYTHON_LITERAL.sub(
+        lambda m: m.group(0) if m.group(2) is None else m.group(1) + _JSON_LITERALS[m.group(2)], text)
+
+
+def _validate(schema, text: str):
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"not valid JSON ({e})")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    try:
+        analysis = schema(**data)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()))
+    # Keep the reply compact even if the model lists more than asked for
+    for field in ("top_categories", "recommendations", "goals"):
+        if hasattr(analysis, field):
+            setattr(analysis, field, getattr(analysis, field)[:STRUCTURED_MAX_ITEMS])
+    return analysis
+
+
+def parse_structured(route: str, text: str):
+    """
+    Validate a reply against the route's schema; returns (analysis, repaired).
+    Raises ValueError describing what is wrong when even the repaired text is invalid.
+    """
+    schema = SCHEMAS[route]
+    try:
+        return _validate(schema, text), False
+    except ValueError:
+        return _validate(schema, _repair(text)), True
+
+
+async def generate_structured(messages, route: str, use_cache: bool = True, persona: str = None) -> dict:
+    """
+    Ask for a JSON reply in the route's schema and return it as a validated dict.
+
+    A malformed reply is repaired locally first; if that fails the model is shown its
+    reply and the validation errors and asked for corrected JSON, up to
+    STRUCTURED_MAX_RETRIES times. Only a first reply that validates (locally repaired or
+    not) is cached; repair calls always bypass the cache, so an invalid reply is never
+    served again.
+    """
+    reply = await generate_response(messages, use_cache=use_cache, route=route, persona=persona, json_mode=True,
+                                    validate=lambda text: parse_structured(route, text))
+    for attempt in range(STRUCTURED_MAX_RETRIES + 1):
+        try:
+            analysis, repaired = parse_structured(route, reply)
+            result = "repaired" if repaired else "valid"
+            structured_outputs.inc(route, "retried" if attempt else result)
+            return analysis.dict()
+        except ValueError as e:
+            error = str(e)
+        if attempt == STRUCTURED_MAX_RETRIES:
+            break
+        logger.warning(f"🔧 Invalid structured {route} reply ({error}); asking the model to fix it")
+        messages = messages + [
+            {"role": "assistant", "content": reply},
+            {"role": "user", "content": f"That reply is invalid: {error}. "
+                                        "Reply with only the corrected JSON object."},
+        ]
+        reply = await generate_response(messages, use_cache=False, route=route, persona=persona, json_mode=True)
+    structured_outputs.inc(route, "failed")
+    raise StructuredOutputError(f"The model did not return a valid {route} analysis: {error}")
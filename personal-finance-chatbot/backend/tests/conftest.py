@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import pytest
+
+# The backend modules are imported flat, as the API does when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NLU_MODE", "rules")
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    Answer OpenRouter calls from `replies` (texts, or httpx.Response objects) with a fresh
+    completion cache; returns (replies, requests) where requests are the JSON bodies sent.
+    """
+    import httpx
+    import features
+    import http_client
+    import openrouter_api
+    from cache import CompletionCache, MemoryCacheBackend
+
+    replies, requests = [], []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        reply = replies.pop(0)
+        if isinstance(reply, httpx.Response):
+            return reply
+        return httpx.Response(200, json={"choices": [{"message": {"content": reply}, "finish_reason": "stop"}],
+                                          "usage": {}})
+
+    monkeypatch.setattr(openrouter_api, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(openrouter_api, "completion_cache", CompletionCache(MemoryCacheBackend()))
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setitem(features._enabled, "cache", True)
+    return replies, requests
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import sqlite3
+import pytest
+from admission import (
+    TokenBucket, LocalLimiter, SQLiteLimiter, AdmissionController, AdmissionRejectedError,
+    PRIORITY_INTERACTIVE, PRIORITY_INSIGHT, PRIORITY_BATCH, ADMISSION_DB_BUSY_RETRY,
+)
+
+
+# =========================
+# 🔹 Shared SQLite buckets
+# =========================
+def _hold_lock(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE")
+    return conn
+
+
+def test_sqlite_limiter_shares_one_budget(tmp_path):
+    path = str(tmp_path / "admission.sqlite3")
+    first, second = SQLiteLimiter(rpm=2, tpm=0, path=path), SQLiteLimiter(rpm=2, tpm=0, path=path)
+    assert first.try_acquire(10) == 0
+    assert second.try_acquire(10) == 0
+    assert first.try_acquire(10) > 0
+
+
+def test_sqlite_limiter_does_not_wait_for_a_busy_lock(tmp_path):
+    path = str(tmp_path / "admission.sqlite3")
+    limiter = SQLiteLimiter(rpm=60, tpm=1000, path=path)
+    other = _hold_lock(path)
+    started = time.monotonic()
+    assert limiter.try_acquire(100) == ADMISSION_DB_BUSY_RETRY
+    assert time.monotonic() - started < 0.5
+    other.execute("ROLLBACK")
+    assert limiter.try_acquire(100) == 0
+
+
+def test_sqlite_limiter_applies_a_refund_held_back_by_a_busy_lock(tmp_path):
+    path = str(tmp_path / "admission.sqlite3")
+    limiter = SQLiteLimiter(rpm=0, tpm=1000, path=path)
+    assert limiter.try_acquire(1000) == 0
+    other = _hold_lock(path)
+    limiter.refund(1000)
+    other.execute("ROLLBACK")
+    # The held-back refund makes the full budget available again on the next acquire
+    assert limiter.try_acquire(1000) == 0
+
+
+# =========================
+# 🔹 Token buckets and the priority queue
+# =========================
+def test_token_bucket_waits_for_refill_and_caps_oversized_requests():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    # More than a bucketful only waits for a full bucket
+    assert bucket.wait_time(600) == pytest.approx(60.0, abs=0.1)
+    bucket.refund(30)
+    assert bucket.wait_time(30) == 0
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(per_minute=0)
+    bucket.take(10 ** 9)
+    assert bucket.wait_time(10 ** 9) == 0
+
+
+def test_local_limiter_takes_both_buckets_or_neither():
+    limiter = LocalLimiter(rpm=60, tpm=100)
+    assert limiter.try_acquire(150) == 0  # capped at one bucketful
+    assert limiter.try_acquire(10) > 0
+    limiter.refund(100)
+    assert limiter.try_acquire(10) == 0
+    assert limiter.requests.level == pytest.approx(58, abs=0.1)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_queued_calls_are_admitted_in_priority_order():
+    async def scenario():
+        controller = AdmissionController(LocalLimiter(rpm=6000, tpm=0), max_queue=10, max_wait=5)
+        controller.limiter.requests.level = 0  # empty: everything queues until the bucket refills
+        order = []
+
+        async def call(name, priority):
+            await controller.acquire(1, priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call(name, priority)) for name, priority in
+                 (("batch", PRIORITY_BATCH), ("insight", PRIORITY_INSIGHT), ("chat", PRIORITY_INTERACTIVE))]
+        await asyncio.gather(*tasks)
+        return order, controller.stats()
+
+    order, stats = _run(scenario())
+    assert order == ["chat", "insight", "batch"]
+    assert stats["admitted"] == {"interactive": 1, "insight": 1, "batch": 1}
+    assert stats["queue_depth"] == 0
+
+
+def test_full_queue_sheds_the_lowest_priority_waiter():
+    async def scenario():
+        controller = AdmissionController(LocalLimiter(rpm=1, tpm=0), max_queue=1, max_wait=5)
+        controller.limiter.requests.level = 0
+        batch = asyncio.create_task(controller.acquire(1, PRIORITY_BATCH))
+        await asyncio.sleep(0)
+        chat = asyncio.create_task(controller.acquire(1, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError):
+            await batch
+        # Another batch call cannot displace the waiting chat call, so it is shed up front
+        with pytest.raises(AdmissionRejectedError):
+            controller.check(PRIORITY_BATCH)
+        chat.cancel()
+        await asyncio.gather(chat, return_exceptions=True)
+        return controller.stats()
+
+    stats = _run(scenario())
+    assert stats["rejected"]["batch"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(LocalLimiter(rpm=1, tpm=0), max_queue=5, max_wait=0.05)
+        controller.limiter.requests.level = 0
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire(1, PRIORITY_INSIGHT)
+        return controller, rejected.value
+
+    controller, error = _run(scenario())
+    assert "queued longer" in str(error)
+    assert error.retry_after >= 1
+    assert controller.stats()["queue_depth"] == 0
+
+
+def test_release_refunds_unused_tokens_and_admits_waiters():
+    async def scenario():
+        controller = AdmissionController(LocalLimiter(rpm=0, tpm=600), max_queue=5, max_wait=5)
+        await controller.acquire(600)
+        waiter = asyncio.create_task(controller.acquire(500))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        controller.release(600, 50)  # only 50 of the 600 reserved were used
+        await asyncio.wait_for(waiter, 0.5)
+        # Using more than reserved never refunds
+        level = controller.limiter.tokens.level
+        controller.release(10, 40)
+        return level, controller.limiter.tokens.level
+
+    before, after = _run(scenario())
+    assert after == pytest.approx(before, abs=1)
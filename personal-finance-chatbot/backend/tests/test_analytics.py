@@ -0,0 +1,86 @@
+from datetime import date
+import pytest
+from analytics import (
+    expense_breakdown, budget_metrics, budget_metrics_batch, spending_metrics, parse_deadline_months,
+)
+
+
+def test_expense_breakdown_shares_and_order():
+    metrics = expense_breakdown(2000, {"Food": 300, "Rent": 900, "Fun": "300", "Gifts": 0})
+    assert metrics["total_expenses"] == 1500
+    assert metrics["surplus"] == 500
+    assert metrics["status"] == "surplus"
+    assert metrics["savings_rate"] == 25
+    assert [c["name"] for c in metrics["categories"]] == ["Rent", "Food", "Fun", "Gifts"]
+    assert metrics["categories"][0] == {"name": "Rent", "amount": 900, "share_of_expenses": 60, "share_of_income": 45}
+    assert metrics["top_categories"] == ["Rent", "Food", "Fun"]
+
+
+def test_expense_breakdown_without_income_or_expenses():
+    metrics = expense_breakdown(0, {})
+    assert metrics["total_expenses"] == 0
+    assert metrics["savings_rate"] is None
+    assert metrics["categories"] == [] and metrics["top_categories"] == []
+    deficit = expense_breakdown("not a number", {"Rent": 100})
+    assert deficit["status"] == "deficit"
+    assert deficit["categories"][0]["share_of_income"] == 0
+
+
+def test_budget_metrics_savings_gap():
+    short = budget_metrics({"income": 1000, "expenses": {"Rent": 800}, "savings_goal": 300})
+    assert (short["savings_gap"], short["savings_goal_met"]) == (100, False)
+    met = budget_metrics({"income": 1000, "expenses": {"Rent": 500}, "savings_goal": 300})
+    assert (met["savings_gap"], met["savings_goal_met"]) == (0, True)
+
+
+def test_batch_matches_single_record_metrics():
+    records = [
+        {"income": 1000, "expenses": {"Rent": 12.345, "Fun": 12.345, "Food": 12.345, "Misc": 500}, "savings_goal": 100},
+        {"income": 0, "expenses": {"Travel": None, "Rent": 0}, "savings_goal": 50},
+        {"income": "2500.5", "expenses": {}, "savings_goal": 0},
+        {"income": 3000, "expenses": {"Food": 0.1, "Rent": 0.2, "Fun": "70"}},
+    ]
+    assert budget_metrics_batch(records) == [budget_metrics(record) for record in records]
+    assert budget_metrics_batch([]) == []
+
+
+def test_batch_lists_only_each_records_own_categories():
+    first, second = budget_metrics_batch([{"income": 100, "expenses": {"Rent": 50}},
+                                          {"income": 100, "expenses": {"Food": 20}}])
+    assert [c["name"] for c in first["categories"]] == ["Rent"]
+    assert [c["name"] for c in second["categories"]] == ["Food"]
+
+
+@pytest.mark.parametrize("deadline, months", [
+    ("6 months", 6), ("1 year", 12), ("2 weeks", 2 * 12 / 52.18), ("2024-07-01", 182 * 12 / 365.25),
+    ("2023-01-01", 0), ("someday", None), ("", None), (None, None),
+])
+def test_parse_deadline_months(deadline, months):
+    result = parse_deadline_months(deadline, today=date(2024, 1, 1))
+    assert result == (None if months is None else pytest.approx(months))
+
+
+def test_spending_metrics_goal_feasibility():
+    metrics = spending_metrics({
+        "income": 3000,
+        "expenses": {"Rent": 1500, "Food": 500},
+        "goals": [
+            {"name": "Laptop", "amount": 2000, "deadline": "4 months"},
+            {"name": "Car", "amount": 12000, "deadline": "6 months"},
+            {"name": "Trip", "amount": 1000},
+        ],
+    })
+    laptop, car, trip = metrics["goals"]
+    assert (laptop["months_to_goal"], laptop["feasible"], laptop["required_monthly"]) == (2, True, 500)
+    assert (car["months_to_goal"], car["feasible"]) == (12, False)
+    assert (trip["deadline_months"], trip["feasible"]) == (None, None)
+    assert metrics["total_goal_amount"] == 15000
+    assert metrics["combined_required_monthly"] == 2500
+    assert metrics["all_goals_feasible"] is False
+
+
+def test_spending_metrics_with_no_surplus():
+    metrics = spending_metrics({"income": 1000, "expenses": {"Rent": 1200},
+                                "goals": [{"name": "Fund", "amount": 500, "deadline": "1 year"}]})
+    assert metrics["goals"][0]["months_to_goal"] is None
+    assert metrics["goals"][0]["feasible"] is False
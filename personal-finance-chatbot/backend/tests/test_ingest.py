@@ -0,0 +1,95 @@
+import io
+import pytest
+import ingest
+from ingest import ingest_transactions, categorize, _parse_amount, _parse_month
+
+CSV = """Date,Description,Amount
+2024-01-03,Landlord rent January,-1200.00
+2024-01-05,Kroger groceries,"-$85.40"
+2024-01-15,Payroll ACME,3000
+2024-01-20,Mystery charge,(20.00)
+2024-02-02,Uber trip,-14.60
+not a date,Netflix,-15.99
+"""
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000[-5:EST]
+<TRNAMT>-42.10
+<NAME>SHELL OIL
+<MEMO>fuel
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20240131</DTPOSTED><TRNAMT>2500.00</TRNAMT><NAME>PAYROLL</NAME></STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def _ingest(text: str, filename: str, encoding: str = "utf-8"):
+    return ingest_transactions(io.BytesIO(text.encode(encoding)), filename)
+
+
+def test_categorize_by_keyword_token():
+    assert categorize("STARBUCKS #1234 Seattle") == "Food"
+    assert categorize("Monthly AT&T bill") == "Utilities"
+    assert categorize("Transfer to savings") == "Other"
+
+
+@pytest.mark.parametrize("value, amount", [
+    ("-12.5", -12.5), ("$1,234.50", 1234.5), ("(12.00)", -12.0), ("-45.00 USD", -45.0), ("", 0.0), (None, 0.0),
+])
+def test_parse_amount(value, amount):
+    assert _parse_amount(value) == amount
+
+
+@pytest.mark.parametrize("value, month", [
+    ("2024-01-31", "2024-01"), ("01/31/2024", "2024-01"), ("20240131120000[-5:EST]", "2024-01"),
+    ("31 Jan 2024", "2024-01"), ("yesterday", None), ("", None),
+])
+def test_parse_month(value, month):
+    assert _parse_month(value) == month
+
+
+def test_csv_signed_amounts_are_aggregated_per_month_and_category():
+    result = _ingest(CSV, "export.csv")
+    assert (result["rows"], result["skipped"]) == (5, 1)
+    assert result["months"]["2024-01"] == {"income": 3000, "expenses": {"Food": 85.4, "Other": 20, "Rent": 1200}}
+    assert result["months"]["2024-02"] == {"income": 0, "expenses": {"Transportation": 14.6}}
+    # Averages over the two months in the export
+    assert result["income"] == 1500
+    assert result["expenses"]["Rent"] == 600
+
+
+def test_csv_debit_and_credit_columns_and_category_column():
+    text = ("Posted Date,Payee,Debit,Credit,Category\n"
+            "01/02/2024,Coffee shop,4.50,,Treats\n"
+            "01/03/2024,Employer,,1000.00,\n")
+    result = _ingest(text, "bank.csv")
+    assert result["months"]["2024-01"] == {"income": 1000, "expenses": {"Treats": 4.5}}
+
+
+def test_csv_lines_split_across_chunks(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_CHUNK_BYTES", 7)
+    text = "Date,Description,Amount\n" + "".join(f"2024-03-{day:02d},Café crème,-2.50\n" for day in range(1, 11))
+    result = _ingest(text, "small-chunks.csv")
+    assert result["rows"] == 10
+    assert result["months"]["2024-03"]["expenses"] == {"Other": 25.0}
+
+
+def test_csv_without_required_columns_is_rejected():
+    with pytest.raises(ValueError):
+        _ingest("Description,Amount\nRent,-100\n", "export.csv")
+    with pytest.raises(ValueError):
+        _ingest("", "export.csv")
+
+
+def test_ofx_transactions():
+    result = _ingest(OFX, "statement.qfx", encoding="latin-1")
+    assert result["rows"] == 2
+    assert result["months"]["2024-01"] == {"income": 2500, "expenses": {"Transportation": 42.1}}
+
+
+def test_unsupported_file_type():
+    with pytest.raises(ValueError):
+        _ingest("anything", "statement.pdf")
@@ -0,0 +1,156 @@
+import asyncio
+import sqlite3
+import pytest
+import jobs
+from jobs import (
+    JobStore, JobQueue, JobQueueFullError, IdempotencyConflictError,
+    QUEUED, RUNNING, SUCCEEDED, FAILED, JOB_MAX_ATTEMPTS,
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_INTERVAL", 0.01)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+# =========================
+# 🔹 Job store
+# =========================
+def test_idempotency_key_returns_the_existing_job(store):
+    job, created = store.submit("budget-summary", {"income": 100}, "key-1")
+    again, created_again = store.submit("budget-summary", {"income": 100}, "key-1")
+    assert created and not created_again
+    assert again["id"] == job["id"]
+    assert store.counts()[QUEUED] == 1
+
+
+def test_idempotency_key_reused_for_another_request_conflicts(store):
+    store.submit("budget-summary", {"income": 100}, "key-1")
+    with pytest.raises(IdempotencyConflictError):
+        store.submit("budget-summary", {"income": 200}, "key-1")
+    with pytest.raises(IdempotencyConflictError):
+        store.submit("spending-insights", {"income": 100}, "key-1")
+
+
+def test_full_queue_rejects_new_jobs(store):
+    store.submit("budget-summary", {"n": 1}, max_queued=1)
+    with pytest.raises(JobQueueFullError):
+        store.submit("budget-summary", {"n": 2}, max_queued=1)
+
+
+def test_claim_runs_jobs_oldest_first_and_finish_records_the_outcome(store):
+    first, _ = store.submit("budget-summary", {"n": 1})
+    second, _ = store.submit("budget-summary", {"n": 2})
+    assert store.claim() == (first["id"], "budget-summary", {"n": 1})
+    assert store.get(first["id"])["status"] == RUNNING
+    store.finish(first["id"], {"summary": "ok"})
+    store.claim()
+    store.finish(second["id"], error="Upstream failed", status_code=502)
+    assert store.get(first["id"])["result"] == {"summary": "ok"}
+    assert store.get(second["id"])["error"] == {"status_code": 502, "detail": "Upstream failed"}
+    assert store.claim() is None
+
+
+def test_recover_requeues_stale_jobs_then_fails_them(store):
+    job, _ = store.submit("budget-summary", {"n": 1})
+    for attempt in range(JOB_MAX_ATTEMPTS):
+        store.claim()
+        assert store.recover(stale_after=-1) == 1
+        expected = QUEUED if attempt + 1 < JOB_MAX_ATTEMPTS else FAILED
+        assert store.get(job["id"])["status"] == expected
+    assert store.get(job["id"])["error"]["detail"] == "Interrupted by a restart"
+
+
+def test_recover_leaves_fresh_running_jobs_alone(store):
+    store.submit("budget-summary", {"n": 1})
+    store.claim()
+    assert store.recover(stale_after=60) == 0
+
+
+def test_purge_drops_finished_jobs_and_frees_their_keys(store):
+    job, _ = store.submit("budget-summary", {"n": 1}, "key-1")
+    store.claim()
+    store.finish(job["id"], {"ok": True})
+    assert store.purge(older_than=-1) == 1
+    _, created = store.submit("budget-summary", {"n": 1}, "key-1")
+    assert created
+
+
+# =========================
+# 🔹 Worker pool
+# =========================
+def _run_queue(store, scenario, **handlers):
+    async def main():
+        queue = JobQueue(store, workers=1, timeout=0.2)
+        for kind, handler in handlers.items():
+            queue.register(kind, handler)
+        await queue.start()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop()
+
+    return asyncio.run(main())
+
+
+async def _ok(payload):
+    return {"doubled": payload["n"] * 2}
+
+
+def test_worker_runs_jobs_and_records_failures_and_timeouts(store):
+    class Rejected(Exception):
+        status_code = 422
+        detail = "Bad budget"
+
+    async def rejected(payload):
+        raise Rejected()
+
+    async def slow(payload):
+        await asyncio.sleep(5)
+
+    async def scenario(queue):
+        jobs_ = [(await queue.submit(kind, {"n": 2}))[0] for kind in ("ok", "rejected", "slow", "unknown")]
+        return [await queue.wait(job["id"], 2) for job in jobs_]
+
+    done, rejected_job, timed_out, unknown = _run_queue(store, scenario, ok=_ok, rejected=rejected, slow=slow)
+    assert done["result"] == {"doubled": 4}
+    assert rejected_job["error"] == {"status_code": 422, "detail": "Bad budget"}
+    assert timed_out["error"]["status_code"] == 504
+    assert unknown["status"] == FAILED
+
+
+def test_worker_survives_when_the_outcome_cannot_be_stored(store, monkeypatch):
+    finish = store.finish
+    failures = {"left": 2}
+
+    def flaky_finish(*args):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return finish(*args)
+
+    async def unstorable(payload):
+        return {"value": object()}
+
+    async def scenario(queue):
+        monkeypatch.setattr(store, "finish", flaky_finish)
+        lost, _ = await queue.submit("ok", {"n": 1})
+        while failures["left"]:
+            await asyncio.sleep(0.01)
+        bad, _ = await queue.submit("unstorable", {"n": 2})
+        good, _ = await queue.submit("ok", {"n": 3})
+        finished = [await queue.wait(job["id"], 2) for job in (bad, good)]
+        return [await queue.get(lost["id"])] + finished, [task.done() for task in queue._tasks]
+
+    (lost, bad, good), stopped = _run_queue(store, scenario, ok=_ok, unstorable=unstorable)
+    # Neither attempt to record the first job worked; housekeeping requeues it later
+    assert lost["status"] == RUNNING
+    assert bad["status"] == FAILED
+    assert "Could not store the job result" in bad["error"]["detail"]
+    assert good["result"] == {"doubled": 6}
+    assert not any(stopped)
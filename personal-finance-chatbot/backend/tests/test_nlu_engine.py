@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from nlu_engine import NLUEngine, NEUTRAL_RESULT
+
+
+def _engine(sentiment, ner, **kwargs) -> NLUEngine:
+    engine = NLUEngine(**kwargs)
+    engine._sentiment_analyzer, engine._ner_tagger = sentiment, ner
+    return engine
+
+
+def _working_sentiment(texts, **_):
+    return [{"label": "POSITIVE"} for _ in texts]
+
+
+def _working_ner(texts, **_):
+    return [[{"word": "Vanguard"}] for _ in texts]
+
+
+def _broken(texts, **_):
+    raise RuntimeError("model exploded")
+
+
+# =========================
+# 🔹 Results
+# =========================
+def test_results_are_memoized():
+    engine = _engine(_working_sentiment, _working_ner, wait_ms=0)
+
+    async def scenario():
+        first = await engine.analyze("Should I buy Vanguard funds?")
+        second = await engine.analyze("Should I buy Vanguard funds?")
+        await engine.stop()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"sentiment": "positive", "entities": ["Vanguard"], "keywords": ["Vanguard"]}
+    assert engine.memo.hits == 1
+
+
+def test_failure_returns_neutral_result_without_marker():
+    engine = _engine(_broken, _broken, wait_ms=0)
+
+    async def scenario():
+        status = await engine.analyze_with_status("anything")
+        result = await engine.analyze("anything")
+        await engine.stop()
+        return status, result
+
+    (status_result, fallback), result = asyncio.run(scenario())
+    assert fallback is True
+    assert status_result == result == NEUTRAL_RESULT
+    assert engine.analyze_batch(["anything"]) == [NEUTRAL_RESULT]
+    # Degraded results are never memoized
+    assert engine.memo.stats()["entries"] == 0
+
+
+# =========================
+# 🔹 Shutdown
+# =========================
+def test_stop_resolves_in_flight_and_queued_texts():
+    release = threading.Event()
+
+    def blocking_sentiment(texts, **_):
+        release.wait(5)
+        return _working_sentiment(texts)
+
+    engine = _engine(blocking_sentiment, _working_ner, batch_size=1, wait_ms=0)
+
+    async def scenario():
+        waiting = [asyncio.create_task(engine.analyze(text)) for text in ("first", "second", "third")]
+        await asyncio.sleep(0.05)
+        await engine.stop()
+        try:
+            return await asyncio.wait_for(asyncio.gather(*waiting), 1)
+        finally:
+            release.set()
+
+    assert asyncio.run(scenario()) == [NEUTRAL_RESULT] * 3
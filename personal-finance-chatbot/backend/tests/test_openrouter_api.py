@@ -0,0 +1,60 @@
+import asyncio
+import httpx
+import pytest
+import openrouter_api
+from openrouter_api import stream_response
+from prompt_compiler import count_tokens
+
+MESSAGES = [{"role": "user", "content": "How do I save more each month?"}]
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """
+    SSE body that delivers `frames` and then drops the connection.
+    """
+
+    def __init__(self, *frames):
+        self.frames = frames
+
+    async def __aiter__(self):
+        for frame in self.frames:
+            yield frame.encode()
+        raise httpx.ReadError("connection reset")
+
+
+@pytest.fixture
+def releases(monkeypatch):
+    calls = []
+    monkeypatch.setattr(openrouter_api.upstream_admission, "release",
+                        lambda reserved, used: calls.append((reserved, used)))
+    return calls
+
+
+async def _drain(deltas):
+    received = []
+    try:
+        async for delta in deltas:
+            received.append(delta)
+    except httpx.HTTPError:
+        pass
+    return received
+
+
+def test_stream_that_fails_after_output_is_charged_for_it(upstream, releases):
+    replies, _ = upstream
+    frame = 'data: {"choices": [{"delta": {"content": "Start by tracking every expense"}}]}\n\n'
+    replies.append(httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=BrokenStream(frame)))
+    received = asyncio.run(_drain(stream_response(MESSAGES, use_cache=False)))
+    assert received == ["Start by tracking every expense"]
+    [(reserved, used)] = releases
+    prompt = count_tokens(MESSAGES[0]["content"])
+    assert used == prompt + count_tokens("Start by tracking every expense")
+    assert used < reserved
+
+
+def test_stream_that_fails_before_output_is_refunded(upstream, releases, monkeypatch):
+    replies, _ = upstream
+    monkeypatch.setattr(openrouter_api, "RETRY_MAX_ATTEMPTS", 1)
+    replies.append(httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=BrokenStream()))
+    assert asyncio.run(_drain(stream_response(MESSAGES, use_cache=False))) == []
+    assert [used for _, used in releases] == [0]
@@ -0,0 +1,221 @@
+import asyncio
+import httpx
+import pytest
+import resilience
+from resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError, call_with_retries, stream_with_retries,
+    retry_after_seconds, backoff_delay, upstream_http_exception,
+)
+
+
+def _status_error(status: int, headers: dict = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://upstream.test/chat")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Record backoff sleeps instead of waiting them out.
+    """
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(resilience.asyncio, "sleep", sleep)
+    return delays
+
+
+def _flaky(*outcomes):
+    """
+    Async callable that raises or returns each outcome in turn; `.calls` counts calls.
+    """
+    outcomes = list(outcomes)
+
+    async def fn():
+        fn.calls += 1
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    fn.calls = 0
+    return fn
+
+
+# =========================
+# 🔹 Circuit breaker
+# =========================
+def _open(breaker: CircuitBreaker, elapsed: float = 0.0):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= elapsed
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("model", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 1 <= error.value.retry_after <= 30
+
+
+def test_half_open_breaker_lets_a_single_probe_through():
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=30)
+    _open(breaker, elapsed=31)
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker("model", failure_threshold=3, reset_timeout=30)
+    _open(breaker, elapsed=31)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_cancelled_probe_is_released(sleeps):
+    async def scenario():
+        breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=30)
+        _open(breaker, elapsed=31)
+        hung = asyncio.Event()
+
+        async def never_answers():
+            hung.set()
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(call_with_retries(never_answers, breaker, deadline=10))
+        await hung.wait()
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        # The next call becomes the probe instead of being rejected forever
+        return breaker, await call_with_retries(_flaky("ok"), breaker, deadline=10)
+
+    breaker, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert breaker.state == "closed"
+
+
+def test_stream_closed_by_the_consumer_releases_the_probe():
+    async def scenario():
+        breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=30)
+        _open(breaker, elapsed=31)
+
+        async def stream():
+            await asyncio.Event().wait()
+            yield "never"
+
+        consumer = asyncio.create_task(stream_with_retries(stream, breaker).__anext__())
+        await asyncio.sleep(0)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True
+
+
+# =========================
+# 🔹 Retries, Retry-After and the deadline
+# =========================
+def test_retryable_errors_are_retried_until_success(sleeps):
+    fn = _flaky(_status_error(503), httpx.ConnectError("refused"), "ok")
+    breaker = CircuitBreaker("model", failure_threshold=5)
+    assert asyncio.run(call_with_retries(fn, breaker, deadline=10, max_attempts=3)) == "ok"
+    assert fn.calls == 3
+    assert len(sleeps) == 2
+    assert breaker.failures == 0
+
+
+def test_client_errors_are_not_retried_and_keep_the_breaker_closed(sleeps):
+    fn = _flaky(_status_error(400), "ok")
+    breaker = CircuitBreaker("model", failure_threshold=1)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retries(fn, breaker, deadline=10))
+    assert fn.calls == 1
+    assert breaker.state == "closed"
+
+
+def test_retries_stop_after_max_attempts(sleeps):
+    fn = _flaky(_status_error(502), _status_error(502), "ok")
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retries(fn, CircuitBreaker("model"), deadline=10, max_attempts=2))
+    assert fn.calls == 2
+
+
+def test_retry_waits_at_least_retry_after(sleeps):
+    fn = _flaky(_status_error(429, {"Retry-After": "2"}), "ok")
+    assert asyncio.run(call_with_retries(fn, CircuitBreaker("model"), deadline=10)) == "ok"
+    assert sleeps[0] >= 2
+
+
+def test_retry_after_longer_than_the_deadline_is_not_waited_for(sleeps):
+    fn = _flaky(_status_error(429, {"Retry-After": "60"}), "ok")
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retries(fn, CircuitBreaker("model"), deadline=5))
+    assert sleeps == []
+
+
+def test_retry_after_header_forms():
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "7"})) == 7
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(_status_error(429)) is None
+    assert retry_after_seconds(httpx.ConnectError("refused")) is None
+    assert backoff_delay(0, retry_after=3) >= 3
+
+
+def test_slow_call_hits_the_deadline():
+    async def slow():
+        await asyncio.sleep(1)
+
+    breaker = CircuitBreaker("model", failure_threshold=1)
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(call_with_retries(slow, breaker, deadline=0.05))
+    assert breaker.state == "open"
+
+
+def test_stream_is_retried_only_before_the_first_chunk(sleeps):
+    attempts = []
+
+    def make_stream(fail_after: int):
+        async def stream():
+            attempts.append(fail_after)
+            for i in range(fail_after):
+                yield f"chunk{i}"
+            raise httpx.ReadError("reset")
+        return stream
+
+    streams = iter([make_stream(0), make_stream(1)])
+
+    async def consume():
+        received = []
+        with pytest.raises(httpx.ReadError):
+            async for chunk in stream_with_retries(lambda: next(streams)(), CircuitBreaker("model"), max_attempts=3):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(consume()) == ["chunk0"]
+    assert attempts == [0, 1]
+
+
+def test_upstream_errors_map_to_client_statuses():
+    assert upstream_http_exception(CircuitOpenError("model", 12)).status_code == 503
+    rate_limited = upstream_http_exception(_status_error(429, {"Retry-After": "9"}))
+    assert (rate_limited.status_code, rate_limited.headers["Retry-After"]) == (503, "9")
+    assert upstream_http_exception(_status_error(500)).status_code == 502
+    assert upstream_http_exception(DeadlineExceededError("late")).status_code == 504
@@ -0,0 +1,47 @@
+import time
+import pytest
+from sessions import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(max_sessions: int):
+        if request.param == "memory":
+            return MemorySessionStore(max_sessions=max_sessions)
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=max_sessions)
+    return make
+
+
+def test_store_round_trip(make_store):
+    store = make_store(10)
+    created = store.create("s1", "student")
+    assert (created["persona"], created["messages"]) == ("student", [])
+    store.append("s1", "user", "How do I budget?")
+    store.append("s1", "assistant", "Start with the 50/30/20 rule.")
+    assert [m["role"] for m in store.get("s1")["messages"]] == ["user", "assistant"]
+    # Creating an existing session keeps it as it is
+    assert len(store.create("s1", "professional")["messages"]) == 2
+    assert store.delete("s1") and store.get("s1") is None
+
+
+def test_store_evicts_the_least_recently_updated_sessions(make_store):
+    store = make_store(2)
+    for session_id in ("old", "busy", "new"):
+        store.create(session_id, "student")
+        time.sleep(0.01)
+        if session_id == "busy":
+            store.append("old", "user", "still here")
+            time.sleep(0.01)
+    assert store.get("old") is not None
+    assert store.get("busy") is None
+    assert store.get("new") is not None
+
+
+def test_sqlite_eviction_removes_the_sessions_messages(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=1)
+    store.create("first", "student")
+    store.append("first", "user", "hello")
+    time.sleep(0.01)
+    store.create("second", "student")
+    assert store.get("first") is None
+    assert store._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
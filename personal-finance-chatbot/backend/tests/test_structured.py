@@ -0,0 +1,35 @@
+import json
+import pytest
+from structured import _repair, parse_structured
+
+BUDGET_REPLY = """Here is the analysis:
+```json
+{
+  "summary": "None of your categories are over budget. True savings come from rent, False economies from food.",
+  "top_categories": [{"name": "Rent", "comment": "Fixed at None extra, \\"True\\" to plan"},],
+  "recommendations": ["Keep None-essential spending low", "Review [True, False] subscriptions"],
+  "savings_goal": {"met": True, "comment": "On track"},
+}
+```"""
+
+
+def test_repair_rewrites_python_literals_in_value_positions_only():
+    data = json.loads(_repair(BUDGET_REPLY))
+    assert data["summary"] == ("None of your categories are over budget. True savings come from rent, "
+                               "False economies from food.")
+    assert data["top_categories"][0]["comment"] == 'Fixed at None extra, "True" to plan'
+    assert data["recommendations"] == ["Keep None-essential spending low", "Review [True, False] subscriptions"]
+    assert data["savings_goal"]["met"] is True
+
+
+@pytest.mark.parametrize("literal, expected", [("True", True), ("False", False), ("None", None)])
+def test_repair_rewrites_literals_after_colon_bracket_and_comma(literal, expected):
+    data = json.loads(_repair(f'{{"a": {literal}, "b": [{literal}, {literal}]}}'))
+    assert data == {"a": expected, "b": [expected, expected]}
+
+
+def test_parse_structured_reports_repair():
+    analysis, repaired = parse_structured("budget", BUDGET_REPLY)
+    assert repaired
+    assert analysis.summary.startswith("None of your categories")
+    assert analysis.savings_goal.met is True
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import openrouter_api
+import structured
+from structured import generate_structured, StructuredOutputError
+
+VALID = ('{"summary": "Fine", "top_categories": [], "recommendations": [], '
+         '"savings_goal": {"met": true, "comment": "ok"}}')
+MESSAGES = [{"role": "user", "content": "Summarize my budget"}]
+
+
+@pytest.fixture(autouse=True)
+def one_retry(monkeypatch):
+    monkeypatch.setattr(structured, "STRUCTURED_MAX_RETRIES", 1)
+
+
+def test_invalid_reply_is_not_cached(upstream):
+    replies, requests = upstream
+    replies.extend(["not json", "still not json", VALID])
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(generate_structured(MESSAGES, "budget"))
+    assert len(openrouter_api.completion_cache.backend) == 0
+    # The next identical request samples the model again instead of replaying the bad reply
+    assert asyncio.run(generate_structured(MESSAGES, "budget"))["summary"] == "Fine"
+    assert len(requests) == 3
+
+
+def test_valid_reply_is_served_from_cache(upstream):
+    replies, requests = upstream
+    replies.append(VALID)
+    for _ in range(2):
+        assert asyncio.run(generate_structured(MESSAGES, "budget"))["summary"] == "Fine"
+    assert len(requests) == 1
+
+
+def test_repair_calls_bypass_the_cache(upstream):
+    replies, requests = upstream
+    replies.extend(["not json", VALID, VALID])
+    assert asyncio.run(generate_structured(MESSAGES, "budget"))["savings_goal"]["met"] is True
+    assert len(openrouter_api.completion_cache.backend) == 0
+    # Neither the bad first reply nor the corrected one was cached, so this goes upstream again
+    asyncio.run(generate_structured(MESSAGES, "budget"))
+    assert len(requests) == 3
@@ -1,51 +1,49 @@
-def build_prompt_with_nlu(user_text: str, nlu_data: dict, persona: str):
-    sentiment = nlu_data.get("sentiment", "neutral")
-    keywords = ", ".join(nlu_data.get("keywords", []))
-    entities = ", ".join(nlu_data.get("entities", []))
-
-    prompt = (
-        f"You are a personal finance assistant. The user is a {persona}.\n"
-        f"User 's sentiment: {sentiment}\n"
-        f"Keywords: {keywords}\n"
-        f"Entities: {entities}\n"
-        f"User  question: {user_text}\n"
-        "Please provide a clear, concise, and helpful financial advice answer."
-    )
-    return prompt
-
-def build_budget_prompt(budget_data: dict, persona: str):
-    income = budget_data.get("income", 0)
-    expenses = budget_data.get("expenses", {})
-    savings_goal = budget_data.get("savings_goal", 0)
-    currency = budget_data.get("currency", "$")
-
-    expenses_str = "\n".join([f"- {k}: {currency}{v}" for k, v in expenses.items()])
-
-    prompt = (
-        f"You are a personal finance assistant helping a {persona}.\n"
-        f"Income: {currency}{income}\n"
-        f"Expenses:\n{expenses_str}\n"
-        f"Savings goal: {currency}{savings_goal}\n"
-        "Please provide a summary of the budget, highlight top spending categories, "
-        "and give actionable advice to improve savings."
-    )
-    return prompt
-
-def build_spending_insight_prompt(spending_data: dict, persona: str):
-    income = spending_data.get("income", 0)
-    expenses = spending_data.get("expenses", {})
-    goals = spending_data.get("goals", [])
-    currency = spending_data.get("currency", "$")
-
-    expenses_str = "\n".join([f"- {k}: {currency}{v}" for k, v in expenses.items()])
-    goals_str = "\n".join([f"- {goal['name']}: {currency}{goal['amount']} by {goal['deadline']}" for goal in goals])
-
-    prompt = (
-        f"You are a personal finance assistant helping a {persona}.\n"
-        f"Income: {currency}{income}\n"
-        f"Expenses:\n{expenses_str}\n"
-        f"Goals:\n{goals_str}\n"
-        "Analyze the spending patterns and provide insights on how to achieve the goals, "
-        "including whether current spending allows meeting the goals."
-    )
-    return prompt
+from analytics import budget_metrics, spending_metrics
+from prompt_compiler import compile_chat_prompt, compile_budget_prompt, compile_spending_prompt
+
+# Prompt text lives in prompt_compiler.TEMPLATES; these builders fill it in and keep
+# each prompt within its route's token budget. `structured=True` asks for JSON instead of prose.
+
+def build_prompt_with_nlu(user_text: str, nlu_data: dict, persona: str):
+    return compile_chat_prompt(user_text, nlu_data, persona).text
+
+def _format_breakdown(metrics: dict, currency: str):
+    top = ", ".join(
+        f"{c['name']} ({c['share_of_expenses']}%)" for c in metrics["categories"][:3] if c["amount"] > 0
+    )
+    savings_rate = "n/a" if metrics["savings_rate"] is None else f"{metrics['savings_rate']}%"
+    return (
+        f"- Total expenses: {currency}{metrics['total_expenses']}\n"
+        f"- Monthly {metrics['status']}: {currency}{abs(metrics['surplus'])}\n"
+        f"- Savings rate: {savings_rate}\n"
+        f"- Top categories: {top or 'none'}\n"
+    )
+
+def build_budget_prompt(budget_data: dict, persona: str, metrics: dict = None, structured: bool = False):
+    currency = budget_data.get("currency", "$")
+    metrics = metrics or budget_metrics(budget_data)
+    goal_status = (
+        "met" if metrics["savings_goal_met"]
+        else f"short by {currency}{metrics['savings_gap']} per month"
+    )
+    return compile_budget_prompt(budget_data, persona, _format_breakdown(metrics, currency), goal_status,
+                                 structured).text
+
+def _format_goal(goal: dict):
+    if goal["months_to_goal"] is None:
+        reach = "not reachable from the current surplus"
+    else:
+        reach = f"{goal['months_to_goal']} months at the current surplus"
+    if goal["feasible"] is None:
+        verdict = "no deadline set"
+    else:
+        verdict = "deadline feasible" if goal["feasible"] else "deadline not feasible"
+    return f"- {goal['name']}: {reach}; {verdict}\n"
+
+def build_spending_insight_prompt(spending_data: dict, persona: str, metrics: dict = None,
+                                  structured: bool = False):
+    currency = spending_data.get("currency", "$")
+    metrics = metrics or spending_metrics(spending_data)
+    goal_figures = [_format_goal(goal) for goal in metrics["goals"]]
+    return compile_spending_prompt(spending_data, persona, _format_breakdown(metrics, currency), goal_figures,
+                                   structured).text
@@ -0,0 +1,270 @@
+"""
+Concurrent load scenarios against the backend, with OpenRouter replaced by the local mock.
+
+By default this starts bench/mock_openrouter.py and the backend (uvicorn main:app) on free
+ports, runs every scenario and prints a JSON report with throughput, p50/p95/p99 latency,
+time-to-first-token for streams and error rate. No network access is needed.
+
+    python bench/load.py --concurrency 20 --requests 200 --latency 0.3 --jitter 0.1
+    python bench/load.py --scenarios generate,generate_stream --output run.json
+    python bench/load.py --baseline run.json --tolerance 0.2     # exit 1 on p95 regressions
+    python bench/load.py --target http://127.0.0.1:8000          # an already running backend
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from report import latency_summary, environment, write_report, check_baseline  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(BENCH_DIR), "backend")
+
+
+# =========================
+# 🔹 Scenarios
+# =========================
+# Payloads vary per request so the completion cache does not hide upstream latency;
+# pass --repeat-payloads to measure the cached path instead.
+def _question(i: int) -> dict:
+    return {"question": f"How can I save more money each month as a student? (request {i})", "persona": "student"}
+
+
+def _budget(i: int) -> dict:
+    return {
+        "income": 3000.0 + i,
+        "expenses": {"Rent": 1000, "Food": 300, "Transportation": 200, "Utilities": 150, "Entertainment": 120},
+        "savings_goal": 500.0,
+        "persona": "student",
+    }
+
+
+def _spending(i: int) -> dict:
+    return {
+        "income": 4500.0 + i,
+        "expenses": {"Rent": 1500, "Food": 450, "Transportation": 250, "Shopping": 300},
+        "goals": [{"name": "Emergency Fund", "amount": 5000, "deadline": "12 months"},
+                  {"name": "Vacation", "amount": 1500, "deadline": "6 months"}],
+        "persona": "professional",
+    }
+
+
+def _nlu(i: int) -> dict:
+    return {"text": f"I'm worried about my credit card debt and want to start investing (request {i})"}
+
+
+SCENARIOS = {
+    "generate": ("/generate", _question, False),
+    "generate_stream": ("/generate", _question, True),
+    "budget_summary": ("/budget-summary", _budget, False),
+    "budget_summary_stream": ("/budget-summary", _budget, True),
+    "spending_insights": ("/spending-insights", _spending, False),
+    "nlu": ("/nlu", _nlu, False),
+}
+
+
+# =========================
+# 🔹 Load Runner
+# =========================
+async def _one_request(client: httpx.AsyncClient, path: str, payload: dict, stream: bool):
+    """
+    Returns (ok, status, total_seconds, ttft_seconds).
+    """
+    started = time.perf_counter()
+    if not stream:
+        response = await client.post(path, json=payload)
+        return response.is_success, response.status_code, time.perf_counter() - started, None
+
+    ttft = None
+    ok = True
+    async with client.stream("POST", path, json=payload, params={"stream": "true"}) as response:
+        if not response.is_success:
+            await response.aread()
+            return False, response.status_code, time.perf_counter() - started, None
+        async for line in response.aiter_lines():
+            if line.startswith("event: error"):
+                ok = False
+            elif ttft is None and line.startswith('data: {"delta"'):
+                ttft = time.perf_counter() - started
+    return ok, response.status_code, time.perf_counter() - started, ttft
+
+
+async def run_scenario(base_url: str, name: str, concurrency: int, total: int, duration: float,
+                       repeat_payloads: bool, timeout: float) -> dict:
+    path, make_payload, stream = SCENARIOS[name]
+    latencies, ttfts, statuses = [], [], Counter()
+    errors = 0
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            nonlocal issued, errors
+            while True:
+                if (total and issued >= total) or (deadline and time.perf_counter() >= deadline):
+                    return
+                i = issued
+                issued += 1
+                try:
+                    ok, status, elapsed, ttft = await _one_request(
+                        client, path, make_payload(0 if repeat_payloads else i), stream)
+                except httpx.HTTPError as e:
+                    ok, status, elapsed, ttft = False, type(e).__name__, None, None
+                statuses[str(status)] += 1
+                if not ok:
+                    errors += 1
+                if elapsed is not None:
+                    latencies.append(elapsed)
+                if ttft is not None:
+                    ttfts.append(ttft)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    result = {
+        "requests": issued,
+        "errors": errors,
+        "error_rate": round(errors / issued, 4) if issued else None,
+        "throughput_rps": round(issued / wall, 2) if wall else None,
+        **latency_summary(latencies),
+        "status_counts": dict(statuses),
+    }
+    if stream:
+        result.update({f"ttft_{k}": v for k, v in latency_summary(ttfts).items()})
+    return result
+
+
+# =========================
+# 🔹 Local Servers
+# =========================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def start_servers(args) -> tuple:
+    """
+    Launch the mock upstream and the backend pointed at it; returns (base_url, processes).
+    """
+    mock_port, backend_port = _free_port(), _free_port()
+    mock_cmd = [sys.executable, os.path.join(BENCH_DIR, "mock_openrouter.py"), "--port", str(mock_port),
+                "--latency", str(args.latency), "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+                "--error-status", str(args.error_status), "--chunk-delay", str(args.chunk_delay)]
+    if args.seed is not None:
+        mock_cmd += ["--seed", str(args.seed)]
+    mock = subprocess.Popen(mock_cmd)
+    processes = [mock]
+    try:
+        _wait_until_up(f"http://127.0.0.1:{mock_port}/health", mock)
+        env = {
+            **os.environ,
+            "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "bench-key"),
+            "OPENROUTER_API_URL": f"http://127.0.0.1:{mock_port}/api/v1/chat/completions",
+            # Measure the app, not the client-side rate limiter, unless asked to keep it
+            **({} if args.keep_limits else {"UPSTREAM_RPM": "0", "UPSTREAM_TPM": "0"}),
+        }
+        backend = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", args.app, "--host", "127.0.0.1", "--port", str(backend_port),
+             "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        processes.append(backend)
+        _wait_until_up(f"http://127.0.0.1:{backend_port}/docs", backend)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return f"http://127.0.0.1:{backend_port}", processes
+
+
+def stop_servers(processes: list):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run_all(base_url: str, args) -> dict:
+    results = {}
+    for name in args.scenarios:
+        if args.warmup:
+            await run_scenario(base_url, name, min(args.concurrency, args.warmup), args.warmup, 0,
+                               args.repeat_payloads, args.timeout)
+        print(f"▶ {name}: concurrency={args.concurrency}", file=sys.stderr)
+        results[name] = await run_scenario(base_url, name, args.concurrency, args.requests, args.duration,
+                                           args.repeat_payloads, args.timeout)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL of a running backend; default: start mock + backend locally")
+    parser.add_argument("--app", default="main:app", help="uvicorn app to start when no --target is given")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario (0 = use --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="seconds per scenario when --requests is 0")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--repeat-payloads", action="store_true", help="send identical payloads (cache hits)")
+    parser.add_argument("--keep-limits", action="store_true", help="keep UPSTREAM_RPM/TPM admission limits")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="previous report; exit 1 if p95 regressed beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+
+    processes = []
+    base_url = args.target
+    if base_url is None:
+        base_url, processes = start_servers(args)
+    try:
+        results = asyncio.run(run_all(base_url, args))
+    finally:
+        stop_servers(processes)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    report = {"benchmark": "load", "environment": environment(), "config": config, "results": results}
+    write_report(report, args.output)
+    check_baseline(report, args.baseline, "p95_ms", args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
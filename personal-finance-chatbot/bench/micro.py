@@ -0,0 +1,154 @@
+"""
+Microbenchmarks for the request hot paths: NLU inference (rule fast path and models)
+and prompt building.
+
+Each case is timed with timeit (best-of-N repeats) and reported as microseconds per
+call in JSON. NLU cases need the Hugging Face models from backend/requirements.txt and
+are reported as skipped when transformers is not installed.
+
+    python bench/micro.py
+    python bench/micro.py --only prompt --output micro.json
+    python bench/micro.py --baseline micro.json --tolerance 0.2   # exit 1 on regressions
+"""
+import os
+import sys
+import timeit
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+from report import environment, write_report, check_baseline, percentile  # noqa: E402
+
+QUESTIONS = [
+    "How can I save money as a student?",
+    "I'm stressed about paying off my credit card debt before December.",
+    "Should I invest in index funds or pay down my student loan first?",
+    "My rent in Boston went up by $200, how do I adjust my budget?",
+    "What is a good emergency fund size for a freelancer?",
+    "I want to buy a house in three years, how much should I save monthly?",
+    "Is it worth cancelling Netflix and Spotify to save money?",
+    "How do I build credit with no credit history?",
+]
+NLU_RESULT = {"sentiment": "negative", "entities": ["December"], "keywords": ["credit", "card", "debt"]}
+BUDGET = {
+    "income": 4200.0,
+    "expenses": {"Rent": 1400, "Food": 450, "Transportation": 220, "Utilities": 160,
+                 "Entertainment": 140, "Shopping": 210, "Healthcare": 90, "Education": 300},
+    "savings_goal": 600.0,
+    "currency": "$",
+}
+SPENDING = {
+    "income": 5200.0,
+    "expenses": {"Rent": 1700, "Food": 520, "Transportation": 260, "Shopping": 330, "Entertainment": 180},
+    "goals": [{"name": "Emergency Fund", "amount": 8000, "deadline": "12 months"},
+              {"name": "Vacation", "amount": 2000, "deadline": "2027-06-30"},
+              {"name": "New Laptop", "amount": 1500, "deadline": "6 months"}],
+    "currency": "$",
+}
+
+
+def prompt_cases() -> dict:
+    from utils import build_prompt_with_nlu, build_budget_prompt, build_spending_insight_prompt
+    from analytics import budget_metrics, spending_metrics
+
+    budget_figures = budget_metrics(BUDGET)
+    spending_figures = spending_metrics(SPENDING)
+    return {
+        "prompt.build_prompt_with_nlu": lambda: build_prompt_with_nlu(QUESTIONS[1], NLU_RESULT, "student"),
+        "prompt.build_budget_prompt": lambda: build_budget_prompt(BUDGET, "student"),
+        "prompt.build_budget_prompt_precomputed": lambda: build_budget_prompt(BUDGET, "student", budget_figures),
+        "prompt.build_spending_insight_prompt": lambda: build_spending_insight_prompt(SPENDING, "professional"),
+        "prompt.build_spending_insight_prompt_precomputed":
+            lambda: build_spending_insight_prompt(SPENDING, "professional", spending_figures),
+        "analytics.budget_metrics": lambda: budget_metrics(BUDGET),
+        "analytics.spending_metrics": lambda: spending_metrics(SPENDING),
+    }
+
+
+def rules_cases() -> dict:
+    from nlu_rules import analyze_rules
+
+    counter = [0]
+
+    def one():
+        counter[0] += 1
+        return analyze_rules(QUESTIONS[counter[0] % len(QUESTIONS)])
+
+    return {
+        "rules.analyze_rules": one,
+        f"rules.analyze_rules_{len(QUESTIONS)}": lambda: [analyze_rules(q) for q in QUESTIONS],
+    }
+
+
+def nlu_cases() -> dict:
+    from nlu_engine import nlu_engine
+
+    nlu_engine.load()
+    counter = [0]
+
+    def cold():
+        # A never-seen text each call, so the memo cannot answer it
+        counter[0] += 1
+        return nlu_engine.analyze_batch([f"{QUESTIONS[counter[0] % len(QUESTIONS)]} #{counter[0]}"])
+
+    def cold_batch():
+        counter[0] += 1
+        return nlu_engine.analyze_batch([f"{q} #{counter[0]}" for q in QUESTIONS])
+
+    nlu_engine.analyze_batch([QUESTIONS[0]])
+    return {
+        "nlu.analyze_nlu": cold,
+        f"nlu.analyze_batch_{len(QUESTIONS)}": cold_batch,
+        "nlu.analyze_nlu_memo_hit": lambda: nlu_engine.analyze_batch([QUESTIONS[0]]),
+    }
+
+
+def measure(fn, repeat: int, min_time: float) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    # autorange targets ~0.2s per sample; scale towards --min-time
+    number = max(1, int(number * min_time / 0.2))
+    samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "us_per_call": round(min(samples) * 1e6, 3),
+        "median_us": round(percentile(samples, 50) * 1e6, 3),
+        "max_us": round(max(samples) * 1e6, 3),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=("prompt", "rules", "nlu"), help="run a single group")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="approximate seconds per sample")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="previous report; exit 1 if a case got slower beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    groups = {"prompt": prompt_cases, "rules": rules_cases, "nlu": nlu_cases}
+    results, skipped = {}, {}
+    for group, load_cases in groups.items():
+        if args.only and args.only != group:
+            continue
+        try:
+            cases = load_cases()
+        except ImportError as e:
+            skipped[group] = f"missing dependency: {e.name or e}"
+            continue
+        for name, fn in cases.items():
+            print(f"▶ {name}", file=sys.stderr)
+            results[name] = measure(fn, args.repeat, args.min_time)
+
+    config = {"repeat": args.repeat, "min_time": args.min_time, "only": args.only}
+    report = {"benchmark": "micro", "environment": environment(), "config": config,
+              "results": results, "skipped": skipped}
+    write_report(report, args.output)
+    check_baseline(report, args.baseline, "us_per_call", args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers POST /api/v1/chat/completions with canned replies after a configurable
+latency (plus jitter), streams SSE frames when asked, and fails a configurable
+fraction of requests, so load tests run offline and reproducibly.
+
+    python bench/mock_openrouter.py --port 9100 --latency 0.3 --jitter 0.1 --error-rate 0.02
+"""
+import json
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = (
+    "Here is a practical plan. First, track every expense for a month. "
+    "Second, set a realistic savings target and automate a transfer on payday. "
+    "Third, review subscriptions and cut the ones you do not use. "
+    "Finally, build an emergency fund covering three to six months of expenses."
+)
+
+
+def create_mock_app(latency: float = 0.3, jitter: float = 0.1, error_rate: float = 0.0,
+                    error_status: int = 503, chunk_delay: float = 0.02, seed: int = None) -> FastAPI:
+    """
+    Build the mock app. `latency` is the time to the full reply (or to the first chunk
+    when streaming); `jitter` is the half-width of a uniform spread around it.
+    """
+    app = FastAPI(title="Mock OpenRouter")
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    def delay() -> float:
+        return max(0.0, latency + rng.uniform(-jitter, jitter))
+
+    @app.post("/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "mock-model")
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 1 for m in body.get("messages", []))
+        words = REPLY.split(" ")[: max(1, min(body.get("max_tokens") or 1000, 400))]
+
+        if rng.random() < error_rate:
+            await asyncio.sleep(delay() / 2)
+            return JSONResponse({"error": {"message": "mock upstream failure"}}, status_code=error_status,
+                                headers={"Retry-After": "1"} if error_status == 429 else None)
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay())
+            return {
+                "id": f"mock-{app.state.requests}",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def frames():
+            await asyncio.sleep(delay())
+            for i, word in enumerate(words):
+                chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if chunk_delay:
+                    await asyncio.sleep(chunk_delay)
+            yield f"data: {json.dumps({'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to reply / first chunk")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds of uniform jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status code for failures (e.g. 429, 503)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible latency and errors")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_mock_app(args.latency, args.jitter, args.error_rate, args.error_status, args.chunk_delay, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
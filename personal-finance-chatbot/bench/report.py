@@ -0,0 +1,89 @@
+"""
+Shared helpers for benchmark reports: percentiles, JSON output and baseline comparison.
+"""
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentile(values: list, q: float):
+    """
+    Linear-interpolated percentile of `values` (q in 0..100), or None if empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def latency_summary(seconds: list) -> dict:
+    """
+    p50/p95/p99/mean/max in milliseconds.
+    """
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git_commit": commit,
+    }
+
+
+def write_report(report: dict, output: str = None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def compare(current: dict, baseline: dict, metric: str, tolerance: float) -> list:
+    """
+    Names of entries whose `metric` got worse than baseline by more than `tolerance`
+    (0.2 = 20% slower). Both reports map entry name -> dict of metrics.
+    """
+    regressions = []
+    for name, result in current.items():
+        before = (baseline.get(name) or {}).get(metric)
+        after = (result or {}).get(metric)
+        if before and after is not None and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def check_baseline(current: dict, baseline_path: str, metric: str, tolerance: float):
+    """
+    Exit with status 1 if any entry regressed against the saved baseline report.
+    """
+    if not baseline_path:
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(current["results"], baseline.get("results", {}), metric, tolerance)
+    if regressions:
+        print("Regressions against baseline:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"No {metric} regressions beyond {tolerance:.0%} against {baseline_path}", file=sys.stderr)
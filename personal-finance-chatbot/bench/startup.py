@@ -0,0 +1,108 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import the app and to serve /health.
+
+Each run starts a new interpreter, so nothing is warm except the OS file cache. The report
+lists the slowest imports (python -X importtime) and exits 1 when the median time to
+ready exceeds --budget (default: STARTUP_BUDGET_SECONDS or 3s).
+
+    python bench/startup.py --runs 5
+    FEATURE_NLU=false python bench/startup.py --budget 1.5
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+from report import latency_summary, environment, write_report  # noqa: E402
+from load import BACKEND_DIR, _free_port  # noqa: E402
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def time_import(app_module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {app_module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(app_module: str, top: int) -> list:
+    """
+    Packages by cumulative import time (their slowest import), from python -X importtime.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {app_module}"],
+                         cwd=BACKEND_DIR, capture_output=True, text=True)
+    totals = {}
+    for line in out.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            name = match.group(3).split(".")[0]
+            if name != app_module:
+                totals[name] = max(totals.get(name, 0), int(match.group(2)))
+    ranked = sorted(totals.items(), key=lambda item: -item[1])[:top]
+    return [{"module": name, "ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def time_to_ready(app: str, timeout: float) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "bench-key")},
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Backend exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f"Backend not ready after {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0")))
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    module = args.app.split(":")[0]
+    imports = [time_import(module) for _ in range(args.runs)]
+    ready = [time_to_ready(args.app, args.timeout) for _ in range(args.runs)]
+    ready_summary = latency_summary(ready)
+    report = {
+        "benchmark": "startup",
+        "environment": environment(),
+        "config": {"app": args.app, "runs": args.runs, "budget_s": args.budget,
+                   "features": {k: v for k, v in os.environ.items() if k.startswith("FEATURE_")}},
+        "results": {
+            "import": latency_summary(imports),
+            "ready": ready_summary,
+        },
+        "slowest_imports": slowest_imports(module, args.top),
+    }
+    write_report(report, args.output)
+    if ready_summary["p50_ms"] > args.budget * 1000:
+        print(f"Startup p50 {ready_summary['p50_ms']:.0f}ms is over the {args.budget:.2f}s budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
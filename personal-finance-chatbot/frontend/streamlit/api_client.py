@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------- CLIENT SETTINGS ----------------
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))  # seconds; 0 disables the result cache
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+API_JOB_TIMEOUT = float(os.getenv("API_JOB_TIMEOUT", "300"))  # how long run_job waits for a background job
+API_JOB_POLL_WAIT = 20  # seconds per long-poll; well under API_READ_TIMEOUT
+
+
+class APIError(Exception):
+    """
+    A backend call that failed; `message` is ready to show to the user.
+    """
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of JSON responses keyed on endpoint + payload, with a TTL.
+    """
+
+    def __init__(self, ttl: float = API_CACHE_TTL, max_entries: int = API_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, payload: dict) -> str:
+        return endpoint + "\n" + json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: dict):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class APIClient:
+    """
+    Backend client shared by every Streamlit session in the process.
+
+    One pooled keep-alive `requests.Session`; connection failures are retried (nothing
+    is retried once the request reached the backend). JSON results can be cached by
+    endpoint + payload, and `post_many` runs several calls at once and yields each
+    result as soon as it arrives.
+    """
+
+    def __init__(self, base_url: str = API_URL, pool_size: int = API_POOL_SIZE, cache: ResultCache = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+        self.cache = cache or ResultCache()
+        self.session = requests.Session()
+        retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2, allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api-client")
+        self._job_failures = {}  # request digest -> failed runs, so a retry after a failure starts a new job
+        self._job_lock = threading.Lock()
+
+    def post(self, endpoint: str, payload: dict, cache: bool = False) -> dict:
+        """
+        POST JSON and return the decoded response; raises APIError.
+        """
+        key = self.cache.key(endpoint, payload) if cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        result = self._request("post", endpoint, json=payload)
+        if key is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _request(self, method: str, endpoint: str, **kwargs) -> dict:
+        try:
+            response = self.session.request(method, f"{self.base_url}/{endpoint}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise APIError(f"❌ Request failed: {e}") from e
+        if not response.ok:
+            raise APIError(f"API error: {response.status_code} - {response.text}", response.status_code)
+        return response.json()
+
+    def features(self) -> dict:
+        """
+        Feature flags reported by the backend's /health endpoint; raises APIError.
+        """
+        return self._request("get", "health").get("features", {})
+
+    def run_job(self, endpoint: str, payload: dict, cache: bool = False, timeout: float = API_JOB_TIMEOUT) -> dict:
+        """
+        Run `endpoint` as a backend job (POST /jobs/<endpoint>) and long-poll until it
+        finishes, so slow LLM calls never hit the read timeout.
+
+        The idempotency key is derived from the endpoint and payload, so submitting the same
+        request again (a rerun, or a retry after a timeout) returns the job already running
+        instead of starting another. Once that job has failed, the next submission gets a
+        new key and a new job.
+        """
+        request_key = self.cache.key("jobs/" + endpoint, payload)
+        key = request_key if cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        digest = hashlib.sha256(request_key.encode("utf-8")).hexdigest()
+        with self._job_lock:
+            failures = self._job_failures.get(digest, 0)
+        job = self._request("post", f"jobs/{endpoint}", json=payload,
+                            headers={"Idempotency-Key": f"{digest}-{failures}"})
+        deadline = time.time() + timeout
+        while job["status"] not in ("succeeded", "failed"):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise APIError("⏳ The analysis is taking longer than expected; please try again shortly.")
+            job = self._request("get", f"jobs/{job['id']}", params={"wait": min(API_JOB_POLL_WAIT, remaining)})
+        if job["status"] == "failed":
+            with self._job_lock:
+                self._job_failures[digest] = failures + 1
+            error = job["error"]
+            raise APIError(f"API error: {error['status_code']} - {error['detail']}", error["status_code"])
+        if key is not None:
+            self.cache.set(key, job["result"])
+        return job["result"]
+
+    def post_many(self, calls: dict, cache: bool = False):
+        """
+        Run {name: (endpoint, payload)} concurrently; yield (name, result, error) in
+        completion order, with exactly one of result/error set.
+        """
+        futures = {self._executor.submit(self.post, endpoint, payload, cache): name
+                   for name, (endpoint, payload) in calls.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except APIError as e:
+                yield futures[future], None, e
+
+    def stream(self, endpoint: str, payload: dict):
+        """
+        Yield text deltas from an SSE endpoint as they arrive; raises APIError.
+        """
+        try:
+            with self.session.post(f"{self.base_url}/{endpoint}", params={"stream": "true"}, json=payload,
+                                   stream=True, timeout=self.timeout) as response:
+                if not response.ok:
+                    raise APIError(f"API error: {response.status_code} - {response.text}", response.status_code)
+                if response.headers.get("content-type", "").startswith("application/json"):
+                    # Streaming is disabled on this backend; the whole answer comes back at once
+                    yield response.json().get("answer", "")
+                    return
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        event = None
+                        continue
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                        continue
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    if event == "error":
+                        raise APIError(f"❌ Stream failed: {json.loads(data).get('detail')}")
+                    if event is None:
+                        yield json.loads(data).get("delta", "")
+        except requests.RequestException as e:
+            raise APIError(f"❌ Request failed: {e}") from e
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -1,305 +1,409 @@
-import streamlit as st
-import requests
-import json
-from dotenv import load_dotenv
-import os
-
-# ---------------- ENV & API ----------------
-load_dotenv()
-API_URL = "http://127.0.0.1:8000"
-
-# ========== CYBERPUNK CSS ==========
-def add_custom_css():
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Roboto+Mono&display=swap');
-
-    .stApp {
-        background: linear-gradient(135deg, #0a0f1a 0%, #1a2b3a 50%, #0a1a2a 100%);
-        color: #c0d6e4;
-        font-family: 'Roboto Mono', monospace;
-        min-height: 100vh;
-    }
-
-    .frosted-glass {
-        background: rgba(10, 15, 26, 0.7);
-        backdrop-filter: blur(12px);
-        -webkit-backdrop-filter: blur(12px);
-        border: 1px solid #00aaff44;
-        border-radius: 15px;
-        padding: 2rem;
-        margin: 1rem 0;
-        box-shadow: 0 8px 32px rgba(0, 170, 255, 0.1);
-    }
-
-    h1, h2, h3 {
-        color: #00e0ff;
-        font-weight: 700;
-        text-shadow: 0 0 10px #00aaff88;
-        margin-bottom: 1.5rem;
-    }
-
-    [data-testid="stSidebar"] {
-        background: rgba(10, 15, 26, 0.9);
-        border-right: 1px solid #00aaff44;
-    }
-
-    /* ===== NAVIGATION (SIDEBAR) – MAKE ITEMS CLEAR ===== */
-
-    /* Base color for all nav items (radio options) */
-    [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label,
-    [data-testid="stSidebar"] .stRadio label,
-    [data-testid="stSidebar"] .stRadio label div,
-    [data-testid="stSidebar"] .stRadio label p,
-    [data-testid="stSidebar"] .stRadio label span {
-        color: #bfefff !important;   /* light neon cyan */
-        opacity: 1 !important;
-        font-weight: 650;
-    }
-
-    /* Hover state for nav items */
-    [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label:hover,
-    [data-testid="stSidebar"] .stRadio label:hover *,
-    [data-testid="stSidebar"] .stRadio label:hover {
-        color: #00e0ff !important;
-        text-shadow: 0 0 6px rgba(0,224,255,0.7);
-    }
-
-    /* Selected (active) nav item */
-    [data-testid="stSidebar"] [role="radio"][aria-checked="true"],
-    [data-testid="stSidebar"] [role="radio"][aria-checked="true"] * {
-        color: #00f7ff !important;         /* brighter cyan */
-        font-weight: 800 !important;
-        text-shadow: 0 0 6px rgba(0,224,255,0.95), 0 0 14px rgba(0,170,255,0.6);
-    }
-
-    /* Make the radio dot cyan as well (modern browsers) */
-    [data-testid="stSidebar"] input[type="radio"] { accent-color: #00e0ff; }
-
-    /* Sidebar headings / helper text */
-    [data-testid="stSidebar"] :where(h2, h3, label, p, span) {
-        color: #e6f7ff !important;
-        opacity: 1 !important;
-    }
-
-    /* ===== EXISTING STYLES (unchanged) ===== */
-
-    div.stButton > button {
-        background: linear-gradient(135deg, #001a33 0%, #003366 100%);
-        color: #00e0ff;
-        border: 2px solid #00aaff;
-        border-radius: 12px;
-        padding: 0.75em 2em;
-        font-weight: 700;
-        font-family: 'Roboto Mono', monospace;
-        box-shadow: 0 0 15px #00aaff, inset 0 0 10px #00aaff44;
-        transition: all 0.3s ease;
-    }
-
-    div.stButton > button:hover {
-        background: linear-gradient(135deg, #00aaff 0%, #00e0ff 100%);
-        color: #001a33;
-        box-shadow: 0 0 25px #00aaff, inset 0 0 20px #00aaff;
-        transform: translateY(-2px);
-    }
-
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea,
-    .stNumberInput > div > div > input,
-    .stSelectbox > div > div > select {
-        background: rgba(0, 26, 51, 0.8);
-        color: #c0d6e4;
-        border: 2px solid #00aaff;
-        border-radius: 10px;
-        padding: 0.75rem;
-        font-family: 'Roboto Mono', monospace;
-        font-size: 1rem;
-    }
-
-    /* Main content widget labels */
-    :where(.stTextInput, .stTextArea, .stNumberInput, .stSelectbox) label {
-        color: #e6f7ff !important;
-        opacity: 1 !important;
-        font-weight: 600;
-        text-shadow: 0 0 4px rgba(0, 224, 255, 0.35);
-    }
-
-    .response-box {
-        background: rgba(0, 26, 51, 0.9);
-        border: 1px solid #00aaff;
-        border-radius: 12px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        box-shadow: 0 4px 20px rgba(0, 170, 255, 0.15);
-        white-space: pre-wrap;
-    }
-
-    .chat-container {
-        max-height: 400px;
-        overflow-y: auto;
-        padding: 10px;
-        background: rgba(0, 26, 51, 0.4);
-        border: 1px solid #00aaff44;
-        border-radius: 15px;
-        margin-bottom: 1rem;
-    }
-
-    .user-bubble {
-        background: linear-gradient(135deg, #00aaff99, #00e0ffaa);
-        color: #001a33;
-        padding: 10px;
-        border-radius: 12px;
-        margin: 5px 0;
-        max-width: 70%;
-        float: right;
-        clear: both;
-    }
-
-    .bot-bubble {
-        background: rgba(0, 26, 51, 0.85);
-        color: #c0d6e4;
-        padding: 10px;
-        border-radius: 12px;
-        margin: 5px 0;
-        max-width: 70%;
-        float: left;
-        clear: both;
-        border: 1px solid #00aaff66;
-    }
-
-    ::-webkit-scrollbar { width: 8px; }
-    ::-webkit-scrollbar-track { background: #001a33; }
-    ::-webkit-scrollbar-thumb {
-        background: linear-gradient(180deg, #00aaff, #00e0ff);
-        border-radius: 4px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-# ========== API CALL ==========
-def call_api(endpoint, payload):
-    try:
-        response = requests.post(f"{API_URL}/{endpoint}", json=payload, timeout=30)
-        if response.ok:
-            return response.json()
-        else:
-            st.error(f"API error: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        st.error(f"❌ Request failed: {e}")
-        return None
-
-# ========== MAIN APP ==========
-def main():
-    st.set_page_config(page_title="Personal Finance Chatbot", layout="wide", page_icon="🤖")
-    add_custom_css()
-
-    if "page" not in st.session_state: st.session_state.page = "home"
-    if "chat_history" not in st.session_state: st.session_state.chat_history = []
-
-    # ---- SIDEBAR NAVIGATION ----
-    with st.sidebar:
-        st.title("💼 Navigation")
-        menu = {
-            "🏠 Home": "home",
-            "💬 Chat Assistant": "qa",
-            "📊 Budget Summary": "budget",
-            "🔍 Spending Insights": "spending",
-            "📈 NLU Analysis": "nlu"
-        }
-        selected = st.radio("Choose Feature", list(menu.keys()))
-        st.session_state.page = menu[selected]
-        st.markdown("---")
-        st.info("**AI Finance Assistant**\nAsk questions, analyze budgets, and get insights!")
-
-    # ---- HOME ----
-    if st.session_state.page == "home":
-        st.title("🤖 Personal Finance Chatbot")
-        st.markdown("""
-        <div class="frosted-glass">
-            <h3 style='text-align:center;'>💡 Your Cyberpunk Finance Assistant</h3>
-            <p style='text-align:center;'>Ask questions, track spending, and analyze budgets with AI-driven insights.</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-    # ---- CHAT ASSISTANT ----
-    elif st.session_state.page == "qa":
-        st.title("💬 Chat with Finance Assistant")
-        persona = st.selectbox("Select Persona", ["student", "professional"])
-
-        st.markdown("<div class='chat-container'>", unsafe_allow_html=True)
-        for msg in st.session_state.chat_history:
-            cls = "user-bubble" if msg["role"] == "user" else "bot-bubble"
-            st.markdown(f"<div class='{cls}'>{msg['content']}</div>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-        user_input = st.text_input("Type your message:")
-        if st.button("Send"):
-            if user_input.strip():
-                st.session_state.chat_history.append({"role": "user", "content": user_input})
-                with st.spinner("Thinking..."):
-                    result = call_api("generate", {"question": user_input, "persona": persona})
-                    if result:
-                        bot_reply = result.get("answer", "Sorry, couldn't process that.")
-                        st.session_state.chat_history.append({"role": "bot", "content": bot_reply})
-                st.experimental_rerun()
-
-    # ---- BUDGET SUMMARY ----
-    elif st.session_state.page == "budget":
-        st.title("📊 Budget Summary Analysis")
-        persona = st.selectbox("Persona", ["student", "professional"])
-        income = st.number_input("Monthly Income ($)", min_value=0.0, step=100.0, value=3000.0)
-        savings_goal = st.number_input("Savings Goal ($)", min_value=0.0, step=50.0, value=500.0)
-
-        expenses = {}
-        for c in ["Rent", "Food", "Transportation", "Utilities", "Entertainment", "Shopping", "Healthcare"]:
-            expenses[c] = st.number_input(f"{c} ($)", min_value=0.0, step=10.0, value=0.0, key=f"budget_{c}")
-
-        if st.button("Generate Budget Summary"):
-            payload = {"income": income, "savings_goal": savings_goal, "expenses": expenses, "persona": persona}
-            with st.spinner("📈 Analyzing..."):
-                res = call_api("budget-summary", payload)
-                if res:
-                    st.markdown(f"<div class='response-box'>{res.get('message','No summary')}</div>", unsafe_allow_html=True)
-
-    # ---- SPENDING INSIGHTS ----
-    elif st.session_state.page == "spending":
-        st.title("🔍 Spending Insights")
-        persona = st.selectbox("Persona", ["student", "professional"])
-        income = st.number_input("Monthly Income ($)", min_value=0.0, step=100.0, value=3000.0)
-
-        st.subheader("Financial Goals")
-        goals = []
-        for g in ["Emergency Fund", "Vacation", "Laptop"]:
-            amt = st.number_input(f"{g} ($)", min_value=0.0, step=50.0, key=f"goal_{g}")
-            if amt > 0:
-                goals.append({"name": g, "amount": amt})
-
-        st.subheader("Expenses")
-        expenses = {}
-        for e in ["Rent", "Food", "Transport", "Utilities", "Entertainment"]:
-            expenses[e] = st.number_input(f"{e} ($)", min_value=0.0, step=10.0, value=0.0, key=f"spend_{e}")
-
-        if st.button("Analyze Spending"):
-            payload = {"income": income, "expenses": expenses, "goals": goals, "persona": persona}
-            with st.spinner("🔬 Analyzing..."):
-                res = call_api("spending-insights", payload)
-                if res:
-                    st.markdown(f"<div class='response-box'>{res.get('message','No insights')}</div>", unsafe_allow_html=True)
-
-    # ---- NLU ANALYSIS ----
-    elif st.session_state.page == "nlu":
-        st.title("📈 Text Sentiment & Entity Analysis")
-        text = st.text_area("Enter text for analysis:")
-        if st.button("Analyze"):
-            if text.strip():
-                with st.spinner("Analyzing..."):
-                    res = call_api("nlu", {"text": text})
-                    if res:
-                        st.markdown(f"<div class='response-box'>{res.get('nlu',{}).get('analysis','No result')}</div>", unsafe_allow_html=True)
-
-if __name__ == "__main__":
-    main()
-
-# cd C:\Users\adam\OneDrive\Desktop\personal-finance-chatbot\frontend\streamlit       
-#PS C:\Users\adam\OneDrive\Desktop\personal-finance-chatbot\frontend\streamlit> & c:/Users/adam/OneDrive/Desktop/personal-finance-chatbot/.venv/Scripts/Activate.ps1
+import streamlit as st
+from dotenv import load_dotenv
+import uuid
+
+# ---------------- ENV & API ----------------
+load_dotenv()
+from api_client import APIClient, APIError, API_URL
+
+# ========== CYBERPUNK CSS ==========
+def add_custom_css():
+    st.markdown("""
+    <style>
+    @import url('https://fonts.googleapis.com/css2?family=Roboto+Mono&display=swap');
+
+    .stApp {
+        background: linear-gradient(135deg, #0a0f1a 0%, #1a2b3a 50%, #0a1a2a 100%);
+        color: #c0d6e4;
+        font-family: 'Roboto Mono', monospace;
+        min-height: 100vh;
+    }
+
+    .frosted-glass {
+        background: rgba(10, 15, 26, 0.7);
+        backdrop-filter: blur(12px);
+        -webkit-backdrop-filter: blur(12px);
+        border: 1px solid #00aaff44;
+        border-radius: 15px;
+        padding: 2rem;
+        margin: 1rem 0;
+        box-shadow: 0 8px 32px rgba(0, 170, 255, 0.1);
+    }
+
+    h1, h2, h3 {
+        color: #00e0ff;
+        font-weight: 700;
+        text-shadow: 0 0 10px #00aaff88;
+        margin-bottom: 1.5rem;
+    }
+
+    [data-testid="stSidebar"] {
+        background: rgba(10, 15, 26, 0.9);
+        border-right: 1px solid #00aaff44;
+    }
+
+    /* ===== NAVIGATION (SIDEBAR) – MAKE ITEMS CLEAR ===== */
+
+    /* Base color for all nav items (radio options) */
+    [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label,
+    [data-testid="stSidebar"] .stRadio label,
+    [data-testid="stSidebar"] .stRadio label div,
+    [data-testid="stSidebar"] .stRadio label p,
+    [data-testid="stSidebar"] .stRadio label span {
+        color: #bfefff !important;   /* light neon cyan */
+        opacity: 1 !important;
+        font-weight: 650;
+    }
+
+    /* Hover state for nav items */
+    [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label:hover,
+    [data-testid="stSidebar"] .stRadio label:hover *,
+    [data-testid="stSidebar"] .stRadio label:hover {
+        color: #00e0ff !important;
+        text-shadow: 0 0 6px rgba(0,224,255,0.7);
+    }
+
+    /* Selected (active) nav item */
+    [data-testid="stSidebar"] [role="radio"][aria-checked="true"],
+    [data-testid="stSidebar"] [role="radio"][aria-checked="true"] * {
+        color: #00f7ff !important;         /* brighter cyan */
+        font-weight: 800 !important;
+        text-shadow: 0 0 6px rgba(0,224,255,0.95), 0 0 14px rgba(0,170,255,0.6);
+    }
+
+    /* Make the radio dot cyan as well (modern browsers) */
+    [data-testid="stSidebar"] input[type="radio"] { accent-color: #00e0ff; }
+
+    /* Sidebar headings / helper text */
+    [data-testid="stSidebar"] :where(h2, h3, label, p, span) {
+        color: #e6f7ff !important;
+        opacity: 1 !important;
+    }
+
+    /* ===== EXISTING STYLES (unchanged) ===== */
+
+    div.stButton > button {
+        background: linear-gradient(135deg, #001a33 0%, #003366 100%);
+        color: #00e0ff;
+        border: 2px solid #00aaff;
+        border-radius: 12px;
+        padding: 0.75em 2em;
+        font-weight: 700;
+        font-family: 'Roboto Mono', monospace;
+        box-shadow: 0 0 15px #00aaff, inset 0 0 10px #00aaff44;
+        transition: all 0.3s ease;
+    }
+
+    div.stButton > button:hover {
+        background: linear-gradient(135deg, #00aaff 0%, #00e0ff 100%);
+        color: #001a33;
+        box-shadow: 0 0 25px #00aaff, inset 0 0 20px #00aaff;
+        transform: translateY(-2px);
+    }
+
+    .stTextInput > div > div > input,
+    .stTextArea > div > div > textarea,
+    .stNumberInput > div > div > input,
+    .stSelectbox > div > div > select {
+        background: rgba(0, 26, 51, 0.8);
+        color: #c0d6e4;
+        border: 2px solid #00aaff;
+        border-radius: 10px;
+        padding: 0.75rem;
+        font-family: 'Roboto Mono', monospace;
+        font-size: 1rem;
+    }
+
+    /* Main content widget labels */
+    :where(.stTextInput, .stTextArea, .stNumberInput, .stSelectbox) label {
+        color: #e6f7ff !important;
+        opacity: 1 !important;
+        font-weight: 600;
+        text-shadow: 0 0 4px rgba(0, 224, 255, 0.35);
+    }
+
+    .response-box {
+        background: rgba(0, 26, 51, 0.9);
+        border: 1px solid #00aaff;
+        border-radius: 12px;
+        padding: 1rem;
+        margin: 0.5rem 0;
+        box-shadow: 0 4px 20px rgba(0, 170, 255, 0.15);
+        white-space: pre-wrap;
+    }
+
+    .chat-container {
+        max-height: 400px;
+        overflow-y: auto;
+        padding: 10px;
+        background: rgba(0, 26, 51, 0.4);
+        border: 1px solid #00aaff44;
+        border-radius: 15px;
+        margin-bottom: 1rem;
+    }
+
+    .user-bubble {
+        background: linear-gradient(135deg, #00aaff99, #00e0ffaa);
+        color: #001a33;
+        padding: 10px;
+        border-radius: 12px;
+        margin: 5px 0;
+        max-width: 70%;
+        float: right;
+        clear: both;
+    }
+
+    .bot-bubble {
+        background: rgba(0, 26, 51, 0.85);
+        color: #c0d6e4;
+        padding: 10px;
+        border-radius: 12px;
+        margin: 5px 0;
+        max-width: 70%;
+        float: left;
+        clear: both;
+        border: 1px solid #00aaff66;
+    }
+
+    ::-webkit-scrollbar { width: 8px; }
+    ::-webkit-scrollbar-track { background: #001a33; }
+    ::-webkit-scrollbar-thumb {
+        background: linear-gradient(180deg, #00aaff, #00e0ff);
+        border-radius: 4px;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+# ========== API CALL ==========
+@st.cache_resource
+def get_client():
+    # One pooled client per Streamlit process, shared across reruns and sessions
+    return APIClient(API_URL)
+
+def call_api(endpoint, payload, cache=False):
+    try:
+        return get_client().post(endpoint, payload, cache=cache)
+    except APIError as e:
+        st.error(e.message)
+        return None
+
+@st.cache_data(ttl=60, show_spinner=False)
+def backend_features():
+    """Feature flags from the backend's /health, re-checked every minute."""
+    try:
+        return get_client().features()
+    except APIError:
+        return {}
+
+def call_job(endpoint, payload, cache=False):
+    """Run a slow analysis as a backend job and wait for its result."""
+    # Deployments with FEATURE_JOBS=false answer /jobs with 503; call the endpoint directly there
+    if not backend_features().get("jobs", True):
+        return call_api(endpoint, payload, cache=cache)
+    try:
+        return get_client().run_job(endpoint, payload, cache=cache)
+    except APIError as e:
+        st.error(e.message)
+        return None
+
+def call_api_stream(endpoint, payload):
+    """Yield text chunks from a streaming (SSE) endpoint as they arrive."""
+    try:
+        yield from get_client().stream(endpoint, payload)
+    except APIError as e:
+        st.error(e.message)
+
+RESPONSE_STYLES = {"Detailed (prose)": "prose", "Compact (structured)": "structured"}
+
+def render_analysis(result):
+    """HTML for a budget/spending answer: prose as-is, structured replies as short lists."""
+    if not isinstance(result, dict):
+        return result
+    html = f"<b>{result.get('summary', '')}</b>"
+    if result.get("top_categories"):
+        html += "<br><br><b>Top categories</b><ul>" + "".join(
+            f"<li>{c['name']}: {c['comment']}</li>" for c in result["top_categories"]) + "</ul>"
+    if result.get("recommendations"):
+        html += "<b>Recommendations</b><ul>" + "".join(f"<li>{r}</li>" for r in result["recommendations"]) + "</ul>"
+    if result.get("savings_goal"):
+        verdict = result["savings_goal"]
+        html += f"<b>Savings goal:</b> {'✅ met' if verdict['met'] else '⚠️ not met'} — {verdict['comment']}"
+    if result.get("goals"):
+        html += "<b>Goals</b><ul>" + "".join(
+            f"<li>{'✅' if g['on_track'] else '⚠️'} {g['name']}: {g['comment']}</li>" for g in result["goals"]) + "</ul>"
+    return html
+
+# ========== MAIN APP ==========
+def main():
+    st.set_page_config(page_title="Personal Finance Chatbot", layout="wide", page_icon="🤖")
+    add_custom_css()
+
+    if "page" not in st.session_state: st.session_state.page = "home"
+    if "chat_history" not in st.session_state: st.session_state.chat_history = []
+    if "session_id" not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
+
+    # ---- SIDEBAR NAVIGATION ----
+    with st.sidebar:
+        st.title("💼 Navigation")
+        menu = {
+            "🏠 Home": "home",
+            "💬 Chat Assistant": "qa",
+            "📊 Budget Summary": "budget",
+            "🔍 Spending Insights": "spending",
+            "🧾 Financial Checkup": "checkup",
+            "📈 NLU Analysis": "nlu"
+        }
+        selected = st.radio("Choose Feature", list(menu.keys()))
+        st.session_state.page = menu[selected]
+        st.markdown("---")
+        st.info("**AI Finance Assistant**\nAsk questions, analyze budgets, and get insights!")
+
+    # ---- HOME ----
+    if st.session_state.page == "home":
+        st.title("🤖 Personal Finance Chatbot")
+        st.markdown("""
+        <div class="frosted-glass">
+            <h3 style='text-align:center;'>💡 Your Cyberpunk Finance Assistant</h3>
+            <p style='text-align:center;'>Ask questions, track spending, and analyze budgets with AI-driven insights.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # ---- CHAT ASSISTANT ----
+    elif st.session_state.page == "qa":
+        st.title("💬 Chat with Finance Assistant")
+        persona = st.selectbox("Select Persona", ["student", "professional"])
+
+        st.markdown("<div class='chat-container'>", unsafe_allow_html=True)
+        for msg in st.session_state.chat_history:
+            cls = "user-bubble" if msg["role"] == "user" else "bot-bubble"
+            st.markdown(f"<div class='{cls}'>{msg['content']}</div>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        user_input = st.text_input("Type your message:")
+        if st.button("Send"):
+            if user_input.strip():
+                st.session_state.chat_history.append({"role": "user", "content": user_input})
+                placeholder = st.empty()
+                placeholder.markdown("<div class='bot-bubble'>Thinking...</div>", unsafe_allow_html=True)
+                bot_reply = ""
+                payload = {"question": user_input, "persona": persona, "session_id": st.session_state.session_id}
+                for chunk in call_api_stream("generate", payload):
+                    bot_reply += chunk
+                    placeholder.markdown(f"<div class='bot-bubble'>{bot_reply}</div>", unsafe_allow_html=True)
+                st.session_state.chat_history.append(
+                    {"role": "bot", "content": bot_reply or "Sorry, couldn't process that."}
+                )
+                st.experimental_rerun()
+        if st.button("New conversation"):
+            st.session_state.chat_history = []
+            st.session_state.session_id = uuid.uuid4().hex
+            st.experimental_rerun()
+
+    # ---- BUDGET SUMMARY ----
+    elif st.session_state.page == "budget":
+        st.title("📊 Budget Summary Analysis")
+        persona = st.selectbox("Persona", ["student", "professional"])
+        income = st.number_input("Monthly Income ($)", min_value=0.0, step=100.0, value=3000.0)
+        savings_goal = st.number_input("Savings Goal ($)", min_value=0.0, step=50.0, value=500.0)
+
+        expenses = {}
+        for c in ["Rent", "Food", "Transportation", "Utilities", "Entertainment", "Shopping", "Healthcare"]:
+            expenses[c] = st.number_input(f"{c} ($)", min_value=0.0, step=10.0, value=0.0, key=f"budget_{c}")
+
+        style = RESPONSE_STYLES[st.radio("Response style", list(RESPONSE_STYLES), horizontal=True, key="budget_style")]
+        if st.button("Generate Budget Summary"):
+            payload = {"income": income, "savings_goal": savings_goal, "expenses": expenses, "persona": persona}
+            with st.spinner("📈 Analyzing..."):
+                res = call_job(f"budget-summary?format={style}", payload, cache=True)
+                if res:
+                    st.markdown(f"<div class='response-box'>{render_analysis(res.get('summary','No summary'))}</div>",
+                                unsafe_allow_html=True)
+
+    # ---- SPENDING INSIGHTS ----
+    elif st.session_state.page == "spending":
+        st.title("🔍 Spending Insights")
+        persona = st.selectbox("Persona", ["student", "professional"])
+        income = st.number_input("Monthly Income ($)", min_value=0.0, step=100.0, value=3000.0)
+
+        st.subheader("Financial Goals")
+        goals = []
+        for g in ["Emergency Fund", "Vacation", "Laptop"]:
+            amt = st.number_input(f"{g} ($)", min_value=0.0, step=50.0, key=f"goal_{g}")
+            if amt > 0:
+                goals.append({"name": g, "amount": amt})
+
+        st.subheader("Expenses")
+        expenses = {}
+        for e in ["Rent", "Food", "Transport", "Utilities", "Entertainment"]:
+            expenses[e] = st.number_input(f"{e} ($)", min_value=0.0, step=10.0, value=0.0, key=f"spend_{e}")
+
+        style = RESPONSE_STYLES[st.radio("Response style", list(RESPONSE_STYLES), horizontal=True, key="spending_style")]
+        if st.button("Analyze Spending"):
+            payload = {"income": income, "expenses": expenses, "goals": goals, "persona": persona}
+            with st.spinner("🔬 Analyzing..."):
+                res = call_job(f"spending-insights?format={style}", payload, cache=True)
+                if res:
+                    st.markdown(f"<div class='response-box'>{render_analysis(res.get('insights','No insights'))}</div>",
+                                unsafe_allow_html=True)
+
+    # ---- FINANCIAL CHECKUP (budget + spending at once) ----
+    elif st.session_state.page == "checkup":
+        st.title("🧾 Financial Checkup")
+        persona = st.selectbox("Persona", ["student", "professional"])
+        income = st.number_input("Monthly Income ($)", min_value=0.0, step=100.0, value=3000.0)
+        savings_goal = st.number_input("Savings Goal ($)", min_value=0.0, step=50.0, value=500.0)
+
+        st.subheader("Financial Goals")
+        goals = []
+        for g in ["Emergency Fund", "Vacation", "Laptop"]:
+            amt = st.number_input(f"{g} ($)", min_value=0.0, step=50.0, key=f"checkup_goal_{g}")
+            if amt > 0:
+                goals.append({"name": g, "amount": amt})
+
+        st.subheader("Expenses")
+        expenses = {}
+        for c in ["Rent", "Food", "Transportation", "Utilities", "Entertainment", "Shopping", "Healthcare"]:
+            expenses[c] = st.number_input(f"{c} ($)", min_value=0.0, step=10.0, value=0.0, key=f"checkup_{c}")
+
+        style = RESPONSE_STYLES[st.radio("Response style", list(RESPONSE_STYLES), horizontal=True, key="checkup_style")]
+        if st.button("Run Checkup"):
+            calls = {
+                "summary": (f"budget-summary?format={style}", {"income": income, "savings_goal": savings_goal,
+                                               "expenses": expenses, "persona": persona}),
+                "insights": (f"spending-insights?format={style}", {"income": income, "expenses": expenses,
+                                                   "goals": goals, "persona": persona}),
+            }
+            left, right = st.columns(2)
+            slots = {"summary": left.empty(), "insights": right.empty()}
+            titles = {"summary": "📊 Budget Summary", "insights": "🔍 Spending Insights"}
+            for name, slot in slots.items():
+                slot.markdown(f"<div class='response-box'><b>{titles[name]}</b><br>Analyzing...</div>",
+                              unsafe_allow_html=True)
+            # Both requests run at once; each column fills in as soon as its answer arrives
+            for name, res, error in get_client().post_many(calls, cache=True):
+                body = error.message if error else render_analysis(res.get(name, "No result"))
+                slots[name].markdown(f"<div class='response-box'><b>{titles[name]}</b><br>{body}</div>",
+                                     unsafe_allow_html=True)
+
+    # ---- NLU ANALYSIS ----
+    elif st.session_state.page == "nlu":
+        st.title("📈 Text Sentiment & Entity Analysis")
+        text = st.text_area("Enter text for analysis:")
+        if st.button("Analyze"):
+            if text.strip():
+                with st.spinner("Analyzing..."):
+                    res = call_api("nlu", {"text": text}, cache=True)
+                    if res:
+                        nlu = res.get("nlu", {})
+                        analysis = (
+                            f"<b>Sentiment:</b> {nlu.get('sentiment', 'neutral')}<br>"
+                            f"<b>Entities:</b> {', '.join(nlu.get('entities', [])) or 'None'}<br>"
+                            f"<b>Keywords:</b> {', '.join(nlu.get('keywords', [])) or 'None'}"
+                        )
+                        st.markdown(f"<div class='response-box'>{analysis}</div>", unsafe_allow_html=True)
+
+if __name__ == "__main__":
+    main()
+
+# cd C:\Users\adam\OneDrive\Desktop\personal-finance-chatbot\frontend\streamlit       
+#PS C:\Users\adam\OneDrive\Desktop\personal-finance-chatbot\frontend\streamlit> & c:/Users/adam/OneDrive/Desktop/personal-finance-chatbot/.venv/Scripts/Activate.ps1
 #(.venv) PS C:\Users\adam\OneDrive\Desktop\personal-finance-chatbot\frontend\streamlit> streamlit run app.py
\ No newline at end of file